@@ -0,0 +1,441 @@
+"""
+Daily sales rollups.
+
+    python -m backend.analytics update
+    python -m backend.analytics rebuild --tenant 2 --since 2025-01-01
+
+analytics_item_daily (tenant, day, item) and analytics_salesman_daily
+(tenant, day, salesman) hold per-day totals of live and archived
+quotations, days in UTC. The analytics endpoints only read these.
+
+update_rollups() works off the sync change stream: every write to a
+quotation or its lines bumps quotations.change_seq, and deletes and
+archive moves leave a tombstone. For each tenant it collects the days
+touched since that tenant's watermark (a cache_versions row) and
+recomputes just those days from the source tables. The app runs it every
+ANALYTICS_INTERVAL_SECONDS, and backend.purge runs it before hard
+deleting rows so deletions are always counted. `rebuild` recomputes
+every day in a range (backfill, or after changing the rollup logic).
+"""
+import argparse
+import os
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import delete, distinct, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from backend import models, sync
+from backend.money import to_money
+
+
+ANALYTICS_ENABLED = os.getenv("ANALYTICS_ENABLED", "1") != "0"
+ANALYTICS_INTERVAL_SECONDS = float(
+    os.getenv("ANALYTICS_INTERVAL_SECONDS", "300")
+)
+
+WATERMARK_NAME = "analytics_rollup"
+
+# (header, lines) pairs a day is computed from
+SOURCES = (
+    (models.Quotation, models.QuotationItem),
+    (models.ArchivedQuotation, models.ArchivedQuotationItem),
+)
+
+
+# =========================
+# RECOMPUTE ONE DAY
+# =========================
+def _day_range(day: date) -> tuple[datetime, datetime]:
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def rebuild_day(db: Session, tenant_id: int, day: date):
+    start, end = _day_range(day)
+    items: dict[int, dict] = {}
+    salesmen: dict[str, dict] = {}
+
+    for Q, QI in SOURCES:
+        in_day = [
+            Q.tenant_id == tenant_id,
+            Q.created_at >= start,
+            Q.created_at < end
+        ]
+        # Explicit, and the hook opted out below: crud's soft-delete hook
+        # only exists once backend.crud is imported, which the CLI doesn't
+        if Q is models.Quotation:
+            in_day.append(Q.deleted_at.is_(None))
+
+        for item_id, qty, revenue, quotations in db.execute(
+            select(
+                QI.item_id,
+                func.sum(QI.qty),
+                func.sum(QI.total),
+                func.count(distinct(QI.quotation_id))
+            )
+            .join(Q, Q.id == QI.quotation_id)
+            .where(*in_day)
+            .group_by(QI.item_id)
+            .execution_options(include_deleted=True)
+        ):
+            row = items.setdefault(item_id, {
+                "quantity": 0, "revenue": to_money(0), "quotations": 0
+            })
+            row["quantity"] += qty
+            row["revenue"] += to_money(revenue)
+            row["quotations"] += quotations
+
+        for name, quotations, subtotal, customers in db.execute(
+            select(
+                Q.salesman_name,
+                func.count(distinct(Q.id)),
+                func.sum(QI.total),
+                func.count(distinct(Q.customer_id))
+            )
+            .outerjoin(QI, QI.quotation_id == Q.id)
+            .where(*in_day)
+            .group_by(Q.salesman_name)
+            .execution_options(include_deleted=True)
+        ):
+            row = salesmen.setdefault(name, {
+                "quotations": 0, "subtotal": to_money(0), "customers": 0
+            })
+            row["quotations"] += quotations
+            row["subtotal"] += to_money(subtotal or 0)
+            row["customers"] += customers
+
+    for model, rows, key in (
+        (models.AnalyticsItemDaily, items, "item_id"),
+        (models.AnalyticsSalesmanDaily, salesmen, "salesman_name"),
+    ):
+        db.execute(
+            delete(model).where(model.tenant_id == tenant_id, model.day == day)
+        )
+        if rows:
+            db.execute(insert(model), [
+                {"tenant_id": tenant_id, "day": day, key: k, **values}
+                for k, values in rows.items()
+            ])
+
+
+# =========================
+# INCREMENTAL UPDATE
+# =========================
+def _tenant_ids(db: Session) -> list[int]:
+    return db.execute(select(models.Tenant.id)).scalars().all()
+
+
+def _day(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _days_touched(
+    db: Session, tenant_id: int, since: int, until: int
+) -> set[date]:
+    Q, A, T = models.Quotation, models.ArchivedQuotation, models.SyncTombstone
+
+    # (tenant_id, change_seq) indexes: range scans
+    touched = {
+        _day(created_at)
+        for created_at in db.execute(
+            select(Q.created_at)
+            .where(
+                Q.tenant_id == tenant_id,
+                Q.change_seq > since,
+                Q.change_seq <= until
+            )
+            .execution_options(include_deleted=True)
+        ).scalars()
+    }
+
+    # Archived (or purged) since: the row has left quotations
+    gone = db.execute(
+        select(T.entity_id).where(
+            T.tenant_id == tenant_id,
+            T.change_seq > since,
+            T.change_seq <= until,
+            T.entity_type == "quotation"
+        )
+    ).scalars().all()
+    if gone:
+        touched.update(
+            _day(created_at)
+            for created_at in db.execute(
+                select(A.created_at).where(A.id.in_(gone))
+            ).scalars()
+        )
+
+    return touched
+
+
+def _read_watermark(db: Session, tenant_id: int) -> int | None:
+    return db.execute(
+        text("SELECT version FROM cache_versions WHERE name = :name"),
+        {"name": sync.counter_name(WATERMARK_NAME, tenant_id)}
+    ).scalar()
+
+
+def _claim_watermark(
+    db: Session, tenant_id: int, since: int | None, until: int
+) -> bool:
+    """Move the watermark inside the caller's transaction. False if
+    another worker got there first (its row lock serializes us)."""
+    name = sync.counter_name(WATERMARK_NAME, tenant_id)
+    if since is None:
+        db.execute(
+            text("INSERT INTO cache_versions (name, version) VALUES (:name, :v)"),
+            {"name": name, "v": until}
+        )
+        return True
+    return db.execute(
+        text(
+            "UPDATE cache_versions SET version = :until "
+            "WHERE name = :name AND version = :since"
+        ),
+        {"name": name, "since": since, "until": until}
+    ).rowcount == 1
+
+
+def update_rollups(db: Session) -> int:
+    """Recompute the days touched since the last run, one transaction per
+    tenant. Returns their count."""
+    updated = 0
+    for tenant_id in _tenant_ids(db):
+        since = _read_watermark(db, tenant_id)
+        until = sync.current_watermark(db, tenant_id)
+        if since is not None and until <= since:
+            db.rollback()
+            continue
+
+        if not _claim_watermark(db, tenant_id, since, until):
+            db.rollback()
+            continue
+
+        days = _days_touched(db, tenant_id, since or 0, until)
+        for day in sorted(days):
+            rebuild_day(db, tenant_id, day)
+        db.commit()
+
+        updated += len(days)
+
+    return updated
+
+
+# =========================
+# REBUILD / BACKFILL
+# =========================
+def _days_with_data(db: Session, tenant_id: int, start, end) -> set[date]:
+    days = set()
+    for Q, _ in SOURCES:
+        query = select(func.date(Q.created_at)).distinct().where(
+            Q.tenant_id == tenant_id
+        )
+        if start:
+            query = query.where(Q.created_at >= start)
+        if end:
+            query = query.where(Q.created_at < end)
+        days.update(
+            date.fromisoformat(str(d)) for d in db.execute(query).scalars()
+            if d is not None
+        )
+
+    # Days with rollups but no quotations left must be cleared too
+    for model in (models.AnalyticsItemDaily, models.AnalyticsSalesmanDaily):
+        query = select(model.day).distinct().where(
+            model.tenant_id == tenant_id
+        )
+        if start:
+            query = query.where(model.day >= start.date())
+        if end:
+            query = query.where(model.day < end.date())
+        days.update(db.execute(query).scalars())
+
+    return days
+
+
+def rebuild(
+    db: Session,
+    tenant_id: int | None = None,
+    since: date | None = None,
+    until: date | None = None
+) -> int:
+    """Recompute every day in [since, until), one transaction per day."""
+    start = datetime.combine(since, time.min) if since else None
+    end = datetime.combine(until, time.min) if until else None
+
+    rebuilt = 0
+    tenants = [tenant_id] if tenant_id is not None else _tenant_ids(db)
+    for tenant in tenants:
+        # Everything up to here is covered: the incremental job can skip it
+        if since is None and until is None:
+            seq = sync.current_watermark(db, tenant)
+            if _claim_watermark(db, tenant, _read_watermark(db, tenant), seq):
+                db.commit()
+            else:
+                db.rollback()
+
+        for day in sorted(_days_with_data(db, tenant, start, end)):
+            rebuild_day(db, tenant, day)
+            db.commit()
+            rebuilt += 1
+
+    return rebuilt
+
+
+# =========================
+# QUERIES (endpoints)
+# =========================
+# Only rollup rows are read; the session's tenant filter applies.
+def _period(day: date, interval: str) -> date:
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+
+def top_items(
+    db: Session,
+    start: date,
+    end: date,
+    limit: int = 10,
+    by: str = "revenue"
+) -> list[dict]:
+    R = models.AnalyticsItemDaily
+    quantity = func.sum(R.quantity).label("quantity")
+    revenue = func.sum(R.revenue).label("revenue")
+    quotations = func.sum(R.quotations).label("quotations")
+
+    rows = db.execute(
+        select(R.item_id, quantity, revenue, quotations)
+        .where(R.day >= start, R.day <= end)
+        .group_by(R.item_id)
+        .order_by((quantity if by == "quantity" else revenue).desc(), R.item_id)
+        .limit(limit)
+    ).all()
+
+    names = dict(db.execute(
+        select(models.ItemMaster.id, models.ItemMaster.name)
+        .where(models.ItemMaster.id.in_([row.item_id for row in rows]))
+    ).all())
+
+    return [
+        {
+            "item_id": row.item_id,
+            "name": names.get(row.item_id),
+            "quantity": row.quantity,
+            "revenue": to_money(row.revenue),
+            "quotations": row.quotations,
+        }
+        for row in rows
+    ]
+
+
+def _average(subtotal, quotations):
+    return to_money(subtotal / quotations) if quotations else to_money(0)
+
+
+def quotation_value(
+    db: Session,
+    start: date,
+    end: date,
+    interval: str = "day"
+) -> list[dict]:
+    R = models.AnalyticsSalesmanDaily
+    periods: dict[date, dict] = {}
+
+    for day, quotations, subtotal in db.execute(
+        select(R.day, func.sum(R.quotations), func.sum(R.subtotal))
+        .where(R.day >= start, R.day <= end)
+        .group_by(R.day)
+    ):
+        row = periods.setdefault(_period(day, interval), {
+            "quotations": 0, "subtotal": to_money(0)
+        })
+        row["quotations"] += quotations
+        row["subtotal"] += to_money(subtotal)
+
+    return [
+        {
+            "period": period,
+            **row,
+            "average": _average(row["subtotal"], row["quotations"]),
+        }
+        for period, row in sorted(periods.items())
+    ]
+
+
+def salesman_trends(
+    db: Session,
+    start: date,
+    end: date,
+    interval: str = "week"
+) -> list[dict]:
+    """customers is only known per day (distinct customers of a week
+    aren't the sum of its days); it's None for weeks and months."""
+    R = models.AnalyticsSalesmanDaily
+    periods: dict[tuple[date, str], dict] = {}
+
+    for row in db.execute(
+        select(R.day, R.salesman_name, R.quotations, R.subtotal, R.customers)
+        .where(R.day >= start, R.day <= end)
+    ):
+        key = (_period(row.day, interval), row.salesman_name)
+        totals = periods.setdefault(key, {
+            "quotations": 0,
+            "subtotal": to_money(0),
+            # One row per (day, salesman): a day's count is exact
+            "customers": row.customers if interval == "day" else None,
+        })
+        totals["quotations"] += row.quotations
+        totals["subtotal"] += to_money(row.subtotal)
+
+    return [
+        {
+            "period": period,
+            "salesman_name": name,
+            **totals,
+            "average": _average(totals["subtotal"], totals["quotations"]),
+        }
+        for (period, name), totals in sorted(periods.items())
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quotation analytics rollups")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("update", help="recompute days changed since last run")
+
+    rebuild_cmd = commands.add_parser(
+        "rebuild", help="recompute every day (backfill)"
+    )
+    rebuild_cmd.add_argument("--tenant", type=int)
+    rebuild_cmd.add_argument(
+        "--since", type=date.fromisoformat, help="first day (ISO date)"
+    )
+    rebuild_cmd.add_argument(
+        "--until", type=date.fromisoformat, help="day after the last (ISO date)"
+    )
+
+    args = parser.parse_args()
+
+    from backend.database import SessionLocal, init_engine
+
+    init_engine()
+    db = SessionLocal()
+    try:
+        if args.command == "update":
+            days = update_rollups(db)
+        else:
+            days = rebuild(
+                db, tenant_id=args.tenant, since=args.since, until=args.until
+            )
+    finally:
+        db.close()
+
+    print(f"Recomputed {days} tenant-days")
+
+
+if __name__ == "__main__":
+    main()
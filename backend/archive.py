@@ -0,0 +1,180 @@
+"""
+Move old quotations out of the hot tables.
+
+    python -m backend.archive --before 2025-01-01
+    python -m backend.archive --before 2025-01-01 --export archive.ndjson.gz
+
+Rows older than the cutoff are copied into quotations_archive /
+quotation_items_archive with INSERT ... SELECT and then deleted from
+quotations / quotation_items, one batch per transaction. With --export
+each archived quotation is also appended to a gzip'd NDJSON file, once
+its batch has committed.
+"""
+import argparse
+import gzip
+import json
+from datetime import datetime
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from backend import models, search, sync
+
+
+QUOTATION_COLUMNS = [
+    "id",
+    "tenant_id",
+    "quote_no",
+    "customer_id",
+    "customer_name",
+    "customer_phone",
+    "salesman_name",
+    "tax",
+    "created_at",
+    "version",
+]
+
+ITEM_COLUMNS = ["id", "quotation_id", "item_id", "qty", "price", "total"]
+
+
+def _export_records(db: Session, ids: list[int]) -> list[str]:
+    quotations = db.execute(
+        select(*[getattr(models.Quotation, c) for c in QUOTATION_COLUMNS])
+        .where(models.Quotation.id.in_(ids))
+        .order_by(models.Quotation.id)
+    ).mappings().all()
+
+    lines: dict[int, list] = {}
+    for row in db.execute(
+        select(*[getattr(models.QuotationItem, c) for c in ITEM_COLUMNS])
+        .where(models.QuotationItem.quotation_id.in_(ids))
+    ).mappings():
+        lines.setdefault(row["quotation_id"], []).append(dict(row))
+
+    records = []
+    for q in quotations:
+        record = dict(q)
+        record["items"] = lines.get(q["id"], [])
+        records.append(json.dumps(record, default=str) + "\n")
+    return records
+
+
+def _append_export(export_path: str, records: list[str]):
+    # "at" appends a new gzip member; readers see one continuous stream
+    with gzip.open(export_path, "at", encoding="utf-8") as fh:
+        fh.writelines(records)
+
+
+def archive_quotations(
+    db: Session,
+    before: datetime,
+    batch_size: int = 500,
+    export_path: str | None = None
+) -> int:
+    moved = 0
+
+    while True:
+        rows = db.execute(
+            select(models.Quotation.id, models.Quotation.tenant_id)
+            .where(
+                models.Quotation.created_at < before,
+                # Soft-deleted rows are left for backend.purge
+                models.Quotation.deleted_at.is_(None)
+            )
+            .order_by(models.Quotation.id)
+            .limit(batch_size)
+            # Writers lock the header first (crud._claim_version): an edit
+            # in flight is skipped until a later run, one that starts
+            # after us waits, then finds the row gone
+            .with_for_update(skip_locked=True)
+        ).all()
+
+        if not rows:
+            break
+
+        ids = [row.id for row in rows]
+
+        records = _export_records(db, ids) if export_path else []
+
+        db.execute(
+            insert(models.ArchivedQuotation).from_select(
+                QUOTATION_COLUMNS,
+                select(
+                    *[getattr(models.Quotation, c) for c in QUOTATION_COLUMNS]
+                ).where(models.Quotation.id.in_(ids))
+            )
+        )
+        db.execute(
+            insert(models.ArchivedQuotationItem).from_select(
+                ITEM_COLUMNS,
+                select(
+                    *[getattr(models.QuotationItem, c) for c in ITEM_COLUMNS]
+                ).where(models.QuotationItem.quotation_id.in_(ids))
+            )
+        )
+
+        # Items first (no ORM cascade here)
+        db.execute(
+            delete(models.QuotationItem)
+            .where(models.QuotationItem.quotation_id.in_(ids))
+        )
+        db.execute(
+            delete(models.Quotation)
+            .where(models.Quotation.id.in_(ids))
+        )
+        search.remove_quotations(db, ids)
+        # Gone from GET /sync (clients drop their copies); still readable
+        # by id through the archive
+        for tenant_id in sorted({row.tenant_id for row in rows}):
+            sync.add_tombstones(
+                db,
+                "quotation",
+                [(row.id, row.tenant_id) for row in rows
+                 if row.tenant_id == tenant_id],
+                sync.next_change_seq(db, tenant_id)
+            )
+        db.commit()
+
+        # Only once committed: a failed batch is never in the export
+        if records:
+            _append_export(export_path, records)
+
+        moved += len(ids)
+
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old quotations")
+    parser.add_argument(
+        "--before",
+        required=True,
+        type=datetime.fromisoformat,
+        help="archive quotations created before this date (ISO format)"
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument(
+        "--export",
+        default=None,
+        help="also append archived quotations to this .ndjson.gz file"
+    )
+    args = parser.parse_args()
+
+    from backend.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        moved = archive_quotations(
+            db,
+            before=args.before,
+            batch_size=args.batch_size,
+            export_path=args.export
+        )
+    finally:
+        db.close()
+
+    print(f"Archived {moved} quotations")
+
+
+if __name__ == "__main__":
+    main()
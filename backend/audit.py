@@ -0,0 +1,342 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import event, inspect, insert
+from sqlalchemy.orm import Session
+
+from backend import models
+from backend.database import SessionLocal, TENANT_KEY, get_engine
+
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# CONFIG
+# =========================
+AUDIT_ENABLED = os.getenv("AUDIT_ENABLED", "1") != "0"
+AUDIT_QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "1"))
+
+AUDITED = {
+    models.ItemMaster: "item",
+    models.Quotation: "quotation",
+}
+
+ENTITY_TYPES = set(AUDITED.values())
+
+# Bookkeeping columns, not business changes
+SKIPPED_FIELDS = {"version", "change_seq"}
+
+PENDING_KEY = "audit_pending"
+ACTOR_KEY = "actor_id"
+
+
+def _jsonable(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _columns(obj) -> dict:
+    # Loaded values only: a deleted row can't be refreshed mid-flush
+    state = inspect(obj)
+    return {
+        attr.key: _jsonable(state.dict.get(attr.key))
+        for attr in state.mapper.column_attrs
+        if attr.key not in SKIPPED_FIELDS
+    }
+
+
+def _changed_columns(obj) -> dict:
+    """{field: [old, new]} for every column changed in this flush."""
+    state = inspect(obj)
+    changes = {}
+    for attr in state.mapper.column_attrs:
+        if attr.key in SKIPPED_FIELDS:
+            continue
+        history = state.attrs[attr.key].history
+        # No previous value → flag_modified() touch, not a real change
+        if not history.added or not history.deleted:
+            continue
+        old, new = history.deleted[0], history.added[0]
+        if old != new:
+            changes[attr.key] = [_jsonable(old), _jsonable(new)]
+    return changes
+
+
+# =========================
+# CAPTURE (session events)
+# =========================
+def set_actor(db: Session, user_id: int | None):
+    db.info[ACTOR_KEY] = user_id
+
+
+def record(
+    db: Session,
+    entity_type: str,
+    entity_id: int,
+    action: str,
+    changes: dict | None = None,
+    tenant_id: int | None = None
+):
+    """
+    Queue an audit event on the session; it is handed to the writer
+    only if the transaction commits. Use for bulk statements that the
+    session events can't see (INSERT ... SELECT, UPDATE ... WHERE).
+    tenant_id defaults to the session's tenant.
+    """
+    if tenant_id is None:
+        tenant_id = db.info.get(TENANT_KEY)
+    db.info.setdefault(PENDING_KEY, []).append({
+        "tenant_id": tenant_id,
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "action": action,
+        "actor_id": db.info.get(ACTOR_KEY),
+        "changes": changes,
+        "created_at": datetime.utcnow(),
+    })
+
+
+def _after_flush(db: Session, flush_context):
+    # Quotation lines are logged on their quotation
+    lines: dict[int, list] = {}
+
+    for obj in db.new:
+        entity_type = AUDITED.get(type(obj))
+        if entity_type:
+            record(
+                db, entity_type, obj.id, "create", _columns(obj),
+                tenant_id=obj.tenant_id
+            )
+        elif isinstance(obj, models.QuotationItem):
+            lines.setdefault(obj.quotation_id, []).append({
+                "item_id": obj.item_id,
+                "qty": obj.qty,
+                "price": _jsonable(obj.price),
+                "total": _jsonable(obj.total),
+            })
+
+    for obj in db.dirty:
+        entity_type = AUDITED.get(type(obj))
+        if entity_type and db.is_modified(obj):
+            changes = _changed_columns(obj)
+            if not changes:
+                continue
+            # Soft delete (deleted_at set) is a delete as far as history goes
+            soft_deleted = changes.get("deleted_at", [True])[0] is None
+            action = "delete" if soft_deleted else "update"
+            record(
+                db, entity_type, obj.id, action, changes,
+                tenant_id=obj.tenant_id
+            )
+
+    for obj in db.deleted:
+        entity_type = AUDITED.get(type(obj))
+        if entity_type:
+            record(
+                db, entity_type, obj.id, "delete", _columns(obj),
+                tenant_id=obj.tenant_id
+            )
+
+    # One event per quotation per transaction, however often it flushes
+    pending = db.info.get(PENDING_KEY, [])
+    for quotation_id, items in lines.items():
+        for entry in reversed(pending):
+            if entry["entity_type"] == "quotation" and \
+                    entry["entity_id"] == quotation_id and \
+                    entry["action"] in ("create", "update"):
+                changes = entry["changes"] = entry["changes"] or {}
+                changes.setdefault("items", []).extend(items)
+                break
+        else:
+            record(db, "quotation", quotation_id, "update", {"items": items})
+
+
+def _after_commit(db: Session):
+    pending = db.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+
+    if AUDIT_ENABLED:
+        audit_writer.enqueue(pending)
+
+
+def _after_transaction_end(db: Session, transaction):
+    # Root transaction rolled back → its events never happened
+    if transaction.parent is None:
+        db.info.pop(PENDING_KEY, None)
+
+
+event.listen(SessionLocal, "after_flush", _after_flush)
+event.listen(SessionLocal, "after_commit", _after_commit)
+event.listen(SessionLocal, "after_transaction_end", _after_transaction_end)
+
+
+# =========================
+# BACKGROUND WRITER
+# =========================
+class AuditWriter:
+    """
+    Buffers committed audit events in a bounded in-memory queue and
+    inserts them in batches from a daemon thread, so request handlers
+    never wait on the audit table.
+
+    - A batch is written when `batch_size` events are waiting or
+      `flush_seconds` have passed, whichever comes first.
+    - If the queue is full, new events are dropped and counted
+      (see stats()) rather than blocking the request.
+    - stop() drains everything still queued; it runs on app shutdown
+      and at interpreter exit.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        max_queue: int = AUDIT_QUEUE_MAX,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_seconds: float = AUDIT_FLUSH_SECONDS
+    ):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run,
+                name="audit-writer",
+                daemon=True
+            )
+            self._thread.start()
+
+    def enqueue(self, events: list[dict]):
+        self.start()
+        for entry in events:
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 1000 == 0:
+                    logger.warning(
+                        "Audit queue full, %s events dropped", self.dropped
+                    )
+
+    def flush(self):
+        """Block until everything queued so far has been written."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def stop(self, timeout: float = 10):
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None or not thread.is_alive():
+            return
+        # The sentinel may wait for space; the writer is draining anyway
+        self._queue.put(self._STOP)
+        thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def _run(self):
+        batch = []
+        deadline = None
+        stopping = False
+
+        while not stopping:
+            timeout = None
+            if deadline is not None:
+                timeout = max(0, deadline - time.monotonic())
+
+            try:
+                entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                entry = None
+
+            if entry is self._STOP:
+                stopping = True
+                self._queue.task_done()
+            elif entry is not None:
+                batch.append(entry)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_seconds
+
+            # On stop, also take whatever was queued before the sentinel
+            if stopping:
+                while True:
+                    try:
+                        entry = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if entry is not self._STOP:
+                        batch.append(entry)
+                    else:
+                        self._queue.task_done()
+
+            due = deadline is not None and time.monotonic() >= deadline
+            if batch and (len(batch) >= self.batch_size or due or stopping):
+                self._write(batch)
+                for _ in batch:
+                    self._queue.task_done()
+                batch = []
+                deadline = None
+
+    def _write(self, batch: list[dict]):
+        try:
+            with get_engine().begin() as conn:
+                conn.execute(insert(models.AuditLog), batch)
+            self.written += len(batch)
+        except Exception:
+            self.failed += len(batch)
+            logger.exception("Failed to write %s audit events", len(batch))
+
+
+audit_writer = AuditWriter()
+atexit.register(audit_writer.stop)
+
+
+# =========================
+# QUERY
+# =========================
+def get_history(
+    db: Session,
+    entity_type: str,
+    entity_id: int,
+    limit: int = 50,
+    before_id: int | None = None
+):
+    """Newest first; page with before_id = last id of the previous page."""
+    q = db.query(models.AuditLog).filter(
+        models.AuditLog.entity_type == entity_type,
+        models.AuditLog.entity_id == entity_id
+    )
+    if before_id is not None:
+        q = q.filter(models.AuditLog.id < before_id)
+    return q.order_by(models.AuditLog.id.desc()).limit(limit).all()
@@ -1,57 +1,102 @@
+import os
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-from jose import jwt, JWTError
-from passlib.context import CryptContext
+from functools import lru_cache
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
 from backend.database import get_db
-from backend import models, schemas
+from backend import lookups, models, profiling, schemas, tokens
+from backend.audit import set_actor
+from backend.tenancy import DEFAULT_TENANT_ID, set_tenant
 
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-
-# =========================
-# JWT CONFIG
-# =========================
-SECRET_KEY = "your_secret_key_change_it"  # move to .env in production
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
+# Operators: profiling (X-Profile header) and the /admin endpoints
+ADMIN_USERNAMES = {
+    name.strip()
+    for name in os.getenv("ADMIN_USERNAMES", "").split(",")
+    if name.strip()
+}
 
 
 # =========================
 # SECURITY
 # =========================
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl="auth/login",
+    auto_error=False
+)
+
+
+# passlib/bcrypt and jose are imported on first use, not at startup
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
-def create_token(data: dict) -> str:
-    to_encode = data.copy()
-    to_encode["exp"] = datetime.utcnow() + timedelta(
-        minutes=ACCESS_TOKEN_EXPIRE_MINUTES
+def credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired token",
+        headers={"WWW-Authenticate": "Bearer"},
     )
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_access_token(db: Session, token: str) -> dict:
+    from jose import JWTError
+
+    try:
+        payload = tokens.decode(token)
+    except JWTError:
+        raise credentials_exception()
+
+    # Tokens without a jti can't be revoked: not accepted
+    if payload.get("sub") is None or payload.get("jti") is None:
+        raise credentials_exception()
+
+    # Stream tickets (tokens.issue_stream_ticket) only open GET /events
+    if payload.get("typ") is not None:
+        raise credentials_exception()
+
+    if tokens.denylist.is_revoked(db, payload["jti"]):
+        raise credentials_exception()
+
+    return payload
 
 
 # =========================
 # REGISTER
 # =========================
+# With a token the new user joins the caller's tenant; without one,
+# the default tenant (new tenants: python -m backend.tenancy create).
 @router.post("/register", response_model=schemas.UserResponse)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+def register(
+    user: schemas.UserCreate,
+    token: str | None = Depends(optional_oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    tenant_id = DEFAULT_TENANT_ID
+    if token:
+        tenant_id = get_current_user(token, db).tenant_id
 
+    # Usernames are unique across tenants
     existing_user = (
         db.query(models.User)
         .filter(models.User.username == user.username)
+        .execution_options(all_tenants=True)
         .first()
     )
 
@@ -62,6 +107,7 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
         )
 
     new_user = models.User(
+        tenant_id=tenant_id,
         username=user.username,
         password=hash_password(user.password)
     )
@@ -94,12 +140,40 @@ def login(
             detail="Invalid credentials"
         )
 
-    access_token = create_token({"sub": str(user.id)})
+    return tokens.issue(db, user.id)
 
-    return {
-        "access_token": access_token,
-        "token_type": "bearer"
-    }
+
+# =========================
+# REFRESH (no password, no bcrypt)
+# =========================
+@router.post("/refresh")
+def refresh(
+    body: schemas.RefreshRequest,
+    db: Session = Depends(get_db)
+):
+    try:
+        return tokens.rotate(db, body.refresh_token)
+    except tokens.InvalidRefreshToken as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e)
+        )
+
+
+# =========================
+# LOGOUT
+# =========================
+# Ends the session: its refresh tokens stop working and its access
+# tokens are denylisted
+@router.post("/logout")
+def logout(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    payload = decode_access_token(db, token)
+    if payload.get("sid"):
+        tokens.revoke_session(db, payload["sid"])
+    return {"message": "Logged out"}
 
 
 # =========================
@@ -109,28 +183,36 @@ def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ):
+    return authenticate(db, decode_access_token(db, token))
 
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Invalid or expired token",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str | None = payload.get("sub")
+def authenticate(db: Session, payload: dict) -> models.User:
+    """The user behind verified token claims; scopes `db` to their tenant."""
+    user = lookups.user_by_id(db, int(payload["sub"]))
 
-        if user_id is None:
-            raise credentials_exception
+    if user is None:
+        raise credentials_exception()
 
-    except JWTError:
-        raise credentials_exception
+    # Same session as the endpoint (get_db is cached per request):
+    # from here on every query is limited to the user's tenant
+    set_actor(db, user.id)
+    set_tenant(db, user.tenant_id)
+    # Ties this thread to the request's profile (if any)
+    profiling.track()
 
-    user = db.query(models.User).filter(models.User.id == int(user_id)).first()
+    return user
+
+
+def is_admin(user: models.User) -> bool:
+    return user.username in ADMIN_USERNAMES
 
-    if user is None:
-        raise credentials_exception
 
+def require_admin(user: models.User = Depends(get_current_user)):
+    if not is_admin(user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin only"
+        )
     return user
 
 
@@ -174,6 +256,9 @@ def delete_user(
             detail="User not found"
         )
 
+    # Cut off their open sessions now, not when their tokens expire
+    tokens.revoke_user(db, user.id)
+
     db.delete(user)
     db.commit()
 
@@ -1,13 +1,21 @@
-import cloudinary
 import os
+from functools import lru_cache
 # from dotenv import load_dotenv
 
 # load_dotenv()  
 
 
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-    secure=True
-)
+# Imported on first upload, not at app startup (cloudinary + certifi are
+# a noticeable part of cold-start import time)
+@lru_cache(maxsize=1)
+def get_uploader():
+    import cloudinary
+    import cloudinary.uploader
+
+    cloudinary.config(
+        cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+        api_key=os.getenv("CLOUDINARY_API_KEY"),
+        api_secret=os.getenv("CLOUDINARY_API_SECRET"),
+        secure=True
+    )
+    return cloudinary.uploader
@@ -0,0 +1,49 @@
+from fastapi import HTTPException, Response, status
+
+
+# =========================
+# OPTIMISTIC CONCURRENCY
+# =========================
+class VersionConflict(Exception):
+    """The row changed since the client read it (If-Match mismatch)."""
+
+
+def etag_for(version: int) -> str:
+    return f'"{version}"'
+
+
+def set_etag(response: Response, version: int) -> None:
+    response.headers["ETag"] = etag_for(version)
+
+
+def parse_if_match(if_match: str | None) -> int | None:
+    """
+    Turn an If-Match header into the expected row version.
+    Returns None when no precondition was sent (or "*").
+    """
+    if if_match is None:
+        return None
+
+    value = if_match.strip()
+    if value == "*":
+        return None
+
+    # Accept weak tags and bare numbers too: W/"3", "3", 3
+    if value.startswith("W/"):
+        value = value[2:]
+    value = value.strip('"')
+
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid If-Match header"
+        )
+
+
+def precondition_failed() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="Resource was modified by someone else, reload and retry"
+    )
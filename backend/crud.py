@@ -1,30 +1,108 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, event, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload, with_loader_criteria
+from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy.orm.exc import StaleDataError
 from datetime import datetime
+import re
+import secrets
 
-from backend import models, schemas
+from backend import audit, lookups, models, schemas, search, sync, tenancy
+from backend.concurrency import VersionConflict
+from backend.database import SessionLocal
+from backend.item_cache import item_catalog
+from backend.money import line_total, to_money
+
+
+# =========================
+# SOFT DELETE FILTER
+# =========================
+# Every ORM SELECT (relationship loads included) only sees live
+# quotations. Opt out with .execution_options(include_deleted=True).
+_LIVE_QUOTATIONS = with_loader_criteria(
+    models.Quotation,
+    models.Quotation.deleted_at.is_(None),
+    include_aliases=True
+)
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _hide_deleted_quotations(state):
+    if (
+        state.is_select
+        and not state.is_column_load
+        and not state.is_relationship_load
+        and not state.execution_options.get("include_deleted", False)
+    ):
+        state.statement = state.statement.options(_LIVE_QUOTATIONS)
+
+
+# =========================
+# VERSION CHECK HELPERS
+# =========================
+def _check_version(obj, expected_version: int | None):
+    if expected_version is not None and obj.version != expected_version:
+        raise VersionConflict()
+
+
+def _claim_version(db: Session, obj):
+    """
+    Bump the row version right away (UPDATE ... WHERE version = :old).
+    A concurrent editor that already committed makes this fail fast,
+    before any child rows are touched.
+    """
+    try:
+        db.flush()
+    except StaleDataError:
+        db.rollback()
+        raise VersionConflict()
 
 
 # =========================
 # ITEM HELPERS
 # =========================
-def get_item_by_id(db: Session, item_id: int):
-    return db.query(models.ItemMaster).filter(
-        models.ItemMaster.id == item_id
-    ).first()
+# Reads are served from the in-process catalog (backend/item_cache.py);
+# misses still fall through to the database.
+def get_item_by_id(db: Session, item_id: int, cached: bool = True):
+    """cached=False: the database row (the version behind an ETag or
+    If-Match check; another worker's catalog may lag behind)."""
+    if cached:
+        item = item_catalog.get_by_id(db, item_id)
+        if item is not None:
+            return item
+
+    return lookups.item_by_id(db, item_id)
 
 
 def get_item_by_name(db: Session, name: str):
+    item = item_catalog.get_by_name(db, name)
+    if item is not None:
+        return item
+
+    # Case-insensitive equality, served by ix_item_master_tenant_lower_name
+    # (ILIKE can't use an index)
     return db.query(models.ItemMaster).filter(
-        models.ItemMaster.name.ilike(name)
+        func.lower(models.ItemMaster.name) == func.lower(name)
     ).first()
 
 
 def get_items(db: Session):
+    items = item_catalog.all(db)
+    if items is not None:
+        return items
+
     return db.query(models.ItemMaster).order_by(
         models.ItemMaster.name
     ).all()
 
 
+def _get_item_for_update(db: Session, item_id: int):
+    # Writes always start from the database row, never the cached copy
+    return db.query(models.ItemMaster).filter(
+        models.ItemMaster.id == item_id
+    ).populate_existing().first()
+
+
 def create_item(
     db: Session,
     name: str,
@@ -33,31 +111,137 @@ def create_item(
 ):
     item = models.ItemMaster(
         name=name,
-        unit_price=unit_price,
+        unit_price=to_money(unit_price),
         image=image
     )
     db.add(item)
+    # Change sequence row first, then the item cache row (one lock order)
+    db.flush()
+    cache_version = item_catalog.bump(db)
     db.commit()
     db.refresh(item)
+    item_catalog.put(item, cache_version)
     return item
 
 
+# =========================
+# CUSTOMERS
+# =========================
+def normalize_phone(phone: str | None) -> str | None:
+    """Digits only: "+91 98765-43210" → "919876543210"."""
+    if not phone:
+        return None
+    digits = re.sub(r"\D", "", phone)
+    return digits or None
+
+
+def customer_name_key(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+def get_or_create_customer(db: Session, name: str, phone: str | None):
+    """
+    One customer per normalized phone; phone-less customers are matched
+    on their normalized name. Safe against two requests creating the
+    same customer at once (unique phone, or unique name among phone-less
+    customers, + savepoint retry).
+    """
+    phone = normalize_phone(phone)
+    key = customer_name_key(name)
+
+    def lookup():
+        q = db.query(models.Customer)
+        if phone:
+            return q.filter(models.Customer.phone == phone).first()
+        return q.filter(
+            models.Customer.phone.is_(None),
+            models.Customer.name_key == key
+        ).first()
+
+    customer = lookup()
+    if customer:
+        return customer
+
+    customer = models.Customer(name=name.strip(), phone=phone, name_key=key)
+    try:
+        with db.begin_nested():
+            db.add(customer)
+    except IntegrityError:
+        customer = lookup()
+
+    return customer
+
+
+def get_customer_by_id(db: Session, customer_id: int):
+    return db.query(models.Customer).filter(
+        models.Customer.id == customer_id
+    ).first()
+
+
+def get_customer_quotations(
+    db: Session,
+    customer_id: int,
+    limit: int = 50,
+    offset: int = 0
+):
+    # Served by ix_quotations_customer_id_id
+    return (
+        db.query(models.Quotation)
+        .filter(models.Quotation.customer_id == customer_id)
+        .order_by(models.Quotation.id.desc())
+        .limit(limit)
+        .offset(offset)
+        .options(
+            selectinload(models.Quotation.items)
+            .selectinload(models.QuotationItem.item)
+        )
+        .all()
+    )
+
+
+def autocomplete_customers(db: Session, query: str, limit: int = 10):
+    """Prefix match on name, or on phone when the query is mostly digits."""
+    q = db.query(models.Customer)
+
+    digits = normalize_phone(query)
+    if digits and len(digits) >= len(query.strip()) // 2:
+        q = q.filter(models.Customer.phone.like(f"{digits}%"))
+    else:
+        key = customer_name_key(query)
+        if not key:
+            return []
+        escaped = key.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        q = q.filter(models.Customer.name_key.like(f"{escaped}%", escape="\\"))
+
+    return q.order_by(models.Customer.name_key).limit(limit).all()
+
+
 # =========================
 # CREATE QUOTATION
 # =========================
+def new_quote_no() -> str:
+    # Timestamp alone collides when two quotations land in the same second
+    return f"Q-{int(datetime.utcnow().timestamp())}-{secrets.token_hex(2).upper()}"
+
+
 def create_quotation(
     db: Session,
     data: schemas.QuotationCreate,
     image_map: dict
 ):
-    quote_no = f"Q-{int(datetime.utcnow().timestamp())}"
+    quote_no = new_quote_no()
+
+    customer = get_or_create_customer(
+        db, data.customer_name, data.customer_phone
+    )
 
     quotation = models.Quotation(
         quote_no=quote_no,
+        customer_id=customer.id,
         customer_name=data.customer_name,
         customer_phone=data.customer_phone,
         salesman_name=data.salesman_name,
-        tax=data.tax
+        tax=to_money(data.tax)
     )
     db.add(quotation)
     db.commit()
@@ -68,9 +252,9 @@ def create_quotation(
 
         # Calculate total safely
         item_total = (
-            q_item.total
+            to_money(q_item.total)
             if q_item.total is not None
-            else q_item.qty * q_item.price
+            else line_total(q_item.qty, q_item.price)
         )
 
         # EXISTING ITEM
@@ -94,11 +278,12 @@ def create_quotation(
             quotation_id=quotation.id,
             item_id=item.id,
             qty=q_item.qty,
-            price=q_item.price,
+            price=to_money(q_item.price),
             total=item_total
         )
         db.add(qi)
 
+    search.index_quotation(db, quotation.id)
     db.commit()
     db.refresh(quotation)
     return quotation
@@ -111,19 +296,36 @@ def update_quotation(
     db: Session,
     quotation_id: int,
     data: schemas.QuotationUpdate,
-    image_map: dict
+    image_map: dict,
+    expected_version: int | None = None
 ):
     quotation = get_quotation_by_id(db, quotation_id)
     if not quotation:
         return None
 
+    _check_version(quotation, expected_version)
+
     # Update header
     for field, value in data.dict(
         exclude_unset=True,
         exclude={"items"}
     ).items():
+        if field == "tax":
+            value = to_money(value)
         setattr(quotation, field, value)
 
+    if "customer_name" in data.model_fields_set or \
+            "customer_phone" in data.model_fields_set:
+        quotation.customer_id = get_or_create_customer(
+            db, quotation.customer_name, quotation.customer_phone
+        ).id
+
+    # Line edits count as a change too → always bump the header version
+    flag_modified(quotation, "quote_no")
+    _claim_version(db, quotation)
+
+    changed_items = []
+
     # Replace items
     if data.items is not None:
         db.query(models.QuotationItem).filter(
@@ -134,19 +336,23 @@ def update_quotation(
             image_path = image_map.get(index)
 
             item_total = (
-                q_item.total
+                to_money(q_item.total)
                 if q_item.total is not None
-                else q_item.qty * q_item.price
+                else line_total(q_item.qty, q_item.price)
             )
 
             if q_item.item_id:
-                item = get_item_by_id(db, q_item.item_id)
+                if q_item.replace_image and image_path:
+                    item = _get_item_for_update(db, q_item.item_id)
+                else:
+                    item = get_item_by_id(db, q_item.item_id)
                 if not item:
                     raise ValueError(f"Item ID {q_item.item_id} not found")
 
                 if q_item.replace_image and image_path:
                     item.image = image_path
-                    item.unit_price = q_item.price
+                    item.unit_price = to_money(q_item.price)
+                    changed_items.append(item)
 
             else:
                 item = get_item_by_name(db, q_item.item_name)
@@ -162,16 +368,461 @@ def update_quotation(
                 quotation_id=quotation.id,
                 item_id=item.id,
                 qty=q_item.qty,
-                price=q_item.price,
+                price=to_money(q_item.price),
                 total=item_total
             )
             db.add(qi)
 
+    search.index_quotation(db, quotation.id)
+    cache_version = item_catalog.bump(db) if changed_items else None
     db.commit()
     db.refresh(quotation)
+
+    for item in changed_items:
+        item_catalog.put(item, cache_version)
     return quotation
 
 
+# =========================
+# BULK CREATE (offline upload)
+# =========================
+def _validate_bulk_entry(entry: schemas.QuotationBulkEntry) -> str | None:
+    for q_item in entry.items:
+        if not q_item.item_id and not (q_item.item_name or "").strip():
+            return "Each item needs item_id or item_name"
+        if q_item.qty <= 0:
+            return "Item qty must be positive"
+        if q_item.price < 0:
+            return "Item price cannot be negative"
+    return None
+
+
+def _resolve_items(db: Session, entries) -> tuple[dict, dict]:
+    """Every item referenced by id or name, in one query."""
+    ids, names = set(), set()
+    for entry in entries:
+        for q_item in entry.items:
+            if q_item.item_id:
+                ids.add(q_item.item_id)
+            else:
+                names.add(q_item.item_name.strip().lower())
+
+    by_id, by_name = {}, {}
+    if ids or names:
+        rows = db.query(models.ItemMaster).filter(
+            (models.ItemMaster.id.in_(ids)) |
+            (func.lower(models.ItemMaster.name).in_(names))
+        ).all()
+        for item in rows:
+            by_id[item.id] = item
+            by_name[item.name.lower()] = item
+
+    return by_id, by_name
+
+
+def bulk_create_quotations(
+    db: Session,
+    entries: list[schemas.QuotationBulkEntry],
+    _retry: bool = True
+) -> list[dict]:
+    """
+    Create many quotations in one transaction with batched INSERTs.
+    Invalid entries are reported and skipped; client_ids that already
+    exist are returned as "existing" (idempotent retries).
+    """
+    results: dict[int, dict] = {}
+    valid = []
+    seen = set()
+
+    # Validate everything before writing anything
+    for index, entry in enumerate(entries):
+        error = _validate_bulk_entry(entry)
+        if error is None and entry.client_id in seen:
+            error = "Duplicate client_id in request"
+        seen.add(entry.client_id)
+
+        if error:
+            results[index] = {
+                "client_id": entry.client_id,
+                "status": "invalid",
+                "error": error,
+            }
+        else:
+            valid.append((index, entry))
+
+    # Already uploaded (deleted ones too: a retry must not resurrect them)
+    existing = {
+        row.client_id: row
+        for row in db.execute(
+            select(
+                models.Quotation.client_id,
+                models.Quotation.id,
+                models.Quotation.quote_no
+            )
+            .where(models.Quotation.client_id.in_(
+                [entry.client_id for _, entry in valid]
+            ))
+            .execution_options(include_deleted=True)
+        )
+    }
+
+    pending = []
+    for index, entry in valid:
+        row = existing.get(entry.client_id)
+        if row:
+            results[index] = {
+                "client_id": entry.client_id,
+                "status": "existing",
+                "id": row.id,
+                "quote_no": row.quote_no,
+            }
+        else:
+            pending.append((index, entry))
+
+    by_id, by_name = _resolve_items(db, [entry for _, entry in pending])
+
+    to_create = []
+    for index, entry in pending:
+        missing = [
+            q_item.item_id for q_item in entry.items
+            if q_item.item_id and q_item.item_id not in by_id
+        ]
+        if missing:
+            results[index] = {
+                "client_id": entry.client_id,
+                "status": "invalid",
+                "error": f"Item ID {missing[0]} not found",
+            }
+        else:
+            to_create.append((index, entry))
+
+    if not to_create:
+        return [results[i] for i in range(len(entries))]
+
+    try:
+        # Bulk statements skip the session hooks: set the tenant and the
+        # sync sequence number and write audit events here
+        tenant_id = tenancy.current_tenant(db)
+        seq = sync.next_change_seq(db)
+
+        # New items by name: one INSERT
+        new_items = {}
+        for _, entry in to_create:
+            for q_item in entry.items:
+                if q_item.item_id:
+                    continue
+                key = q_item.item_name.strip().lower()
+                if key not in by_name and key not in new_items:
+                    new_items[key] = {
+                        "tenant_id": tenant_id,
+                        "name": q_item.item_name.strip(),
+                        "unit_price": to_money(q_item.price),
+                        "version": 1,
+                        "change_seq": seq,
+                    }
+
+        cache_version = None
+        if new_items:
+            cache_version = item_catalog.bump(db)
+            for item_id, name in db.execute(
+                insert(models.ItemMaster).returning(
+                    models.ItemMaster.id, models.ItemMaster.name
+                ),
+                list(new_items.values())
+            ):
+                new_items[name.lower()]["id"] = item_id
+                by_name[name.lower()] = models.ItemMaster(**new_items[name.lower()])
+                audit.record(db, "item", item_id, "create", {
+                    "name": name,
+                    "unit_price": str(new_items[name.lower()]["unit_price"]),
+                })
+
+        customers = {}
+        headers = []
+        for _, entry in to_create:
+            key = (
+                normalize_phone(entry.customer_phone),
+                customer_name_key(entry.customer_name)
+            )
+            if key not in customers:
+                customers[key] = get_or_create_customer(
+                    db, entry.customer_name, entry.customer_phone
+                ).id
+
+            headers.append({
+                "tenant_id": tenant_id,
+                "quote_no": new_quote_no(),
+                "client_id": entry.client_id,
+                "customer_id": customers[key],
+                "customer_name": entry.customer_name,
+                "customer_phone": entry.customer_phone,
+                "salesman_name": entry.salesman_name,
+                "tax": to_money(entry.tax),
+                "version": 1,
+                "change_seq": seq,
+            })
+
+        # Headers: one INSERT ... RETURNING, matched back by client_id
+        ids = dict(db.execute(
+            insert(models.Quotation).returning(
+                models.Quotation.client_id, models.Quotation.id
+            ),
+            headers
+        ).all())
+
+        # Lines: one executemany
+        lines = [
+            {
+                "quotation_id": ids[entry.client_id],
+                "item_id": (
+                    q_item.item_id if q_item.item_id
+                    else by_name[q_item.item_name.strip().lower()].id
+                ),
+                "qty": q_item.qty,
+                "price": to_money(q_item.price),
+                "total": (
+                    to_money(q_item.total) if q_item.total is not None
+                    else line_total(q_item.qty, q_item.price)
+                ),
+            }
+            for _, entry in to_create
+            for q_item in entry.items
+        ]
+        if lines:
+            db.execute(insert(models.QuotationItem), lines)
+
+        created = []
+        for header, (index, entry) in zip(headers, to_create):
+            quotation_id = ids[entry.client_id]
+            created.append(
+                (index, entry.client_id, quotation_id, header["quote_no"])
+            )
+            audit.record(db, "quotation", quotation_id, "create", {
+                "client_id": entry.client_id,
+                "quote_no": header["quote_no"],
+                "customer_name": entry.customer_name,
+                "items": len(entry.items),
+            })
+
+        search.index_quotations(db, list(ids.values()))
+        db.commit()
+
+    except IntegrityError:
+        # Same client_id (or new item name) committed concurrently:
+        # start over once, the other request's rows now count as existing
+        db.rollback()
+        if not _retry:
+            raise
+        return bulk_create_quotations(db, entries, _retry=False)
+
+    for key in new_items:
+        item_catalog.put(by_name[key], cache_version)
+
+    for index, client_id, quotation_id, quote_no in created:
+        results[index] = {
+            "client_id": client_id,
+            "status": "created",
+            "id": quotation_id,
+            "quote_no": quote_no,
+        }
+
+    return [results[i] for i in range(len(entries))]
+
+
+# =========================
+# CLONE QUOTATION
+# =========================
+def _live(db: Session, source) -> list:
+    # INSERT ... SELECT bypasses the ORM filters; archive rows are never
+    # soft-deleted
+    conditions = []
+    tenant_id = tenancy.current_tenant(db)
+    if tenant_id is not None:
+        conditions.append(source.tenant_id == tenant_id)
+    if source is models.Quotation:
+        conditions.append(source.deleted_at.is_(None))
+    return conditions
+
+
+def clone_quotation(
+    db: Session,
+    quotation_id: int,
+    overrides: schemas.QuotationClone
+):
+    """
+    Copy a quotation (hot or archived) and all its lines with two
+    INSERT ... SELECT statements — no rows are loaded into Python.
+    Returns the new quotation id, or None if the source doesn't exist.
+    """
+    changes = overrides.model_dump(exclude_unset=True)
+    if "tax" in changes:
+        changes["tax"] = to_money(changes["tax"])
+
+    customer_changed = "customer_name" in changes or "customer_phone" in changes
+
+    for source, source_line in (
+        (models.Quotation, models.QuotationItem),
+        (models.ArchivedQuotation, models.ArchivedQuotationItem),
+    ):
+        header_columns = [
+            "tenant_id", "customer_id", "customer_name", "customer_phone",
+            "salesman_name", "tax"
+        ]
+
+        if customer_changed:
+            current = db.execute(
+                select(source.customer_name, source.customer_phone)
+                .where(source.id == quotation_id, *_live(db, source))
+            ).first()
+            if current is None:
+                continue
+            name = changes.get("customer_name", current.customer_name)
+            phone = changes.get("customer_phone", current.customer_phone)
+            changes["customer_id"] = get_or_create_customer(db, name, phone).id
+
+        new_id = db.execute(
+            insert(models.Quotation)
+            .from_select(
+                [
+                    "quote_no", "created_at", "version", "change_seq",
+                    *header_columns
+                ],
+                select(
+                    literal(new_quote_no()),
+                    literal(datetime.utcnow()),
+                    literal(1),
+                    literal(sync.next_change_seq(db)),
+                    *[
+                        literal(changes[c]) if c in changes
+                        else getattr(source, c)
+                        for c in header_columns
+                    ]
+                ).where(source.id == quotation_id, *_live(db, source))
+            )
+            .returning(models.Quotation.id)
+        ).scalar()
+
+        if new_id is not None:
+            break
+    else:
+        return None
+
+    line_columns = ["item_id", "qty", "price", "total"]
+    db.execute(
+        insert(models.QuotationItem).from_select(
+            ["quotation_id", *line_columns],
+            select(
+                literal(new_id),
+                *[getattr(source_line, c) for c in line_columns]
+            )
+            .where(source_line.quotation_id == quotation_id)
+            .order_by(source_line.id)
+        )
+    )
+
+    audit.record(db, "quotation", new_id, "create", {
+        "cloned_from": quotation_id,
+        **{k: str(v) if k == "tax" else v for k, v in changes.items()}
+    })
+    search.index_quotation(db, new_id)
+    db.commit()
+    return new_id
+
+
+# =========================
+# BULK REPRICING
+# =========================
+# Each quotation line keeps its own price snapshot, so only lines in
+# hot quotations matching the filter (and still at old_price) change.
+# Archived, deleted and out-of-filter quotations are never touched.
+def _reprice_line_filter(change, new_price, quotation_filter):
+    QI, Q = models.QuotationItem, models.Quotation
+
+    conditions = [QI.item_id == change.item_id]
+    if change.old_price is not None:
+        conditions.append(QI.price == to_money(change.old_price))
+    else:
+        conditions.append(QI.price != new_price)
+
+    # Bulk UPDATE bypasses the ORM filter → skip soft-deleted explicitly
+    header = [Q.deleted_at.is_(None)]
+    if quotation_filter.quotation_ids is not None:
+        header.append(Q.id.in_(quotation_filter.quotation_ids))
+    if quotation_filter.created_after is not None:
+        header.append(Q.created_at >= quotation_filter.created_after)
+    if quotation_filter.created_before is not None:
+        header.append(Q.created_at < quotation_filter.created_before)
+    if quotation_filter.salesman_name is not None:
+        header.append(Q.salesman_name == quotation_filter.salesman_name)
+
+    conditions.append(QI.quotation_id.in_(select(Q.id).where(*header)))
+    return conditions
+
+
+def reprice_items(db: Session, request: schemas.RepriceRequest):
+    QI, Q = models.QuotationItem, models.Quotation
+    results = []
+
+    for change in request.changes:
+        new_price = to_money(change.new_price)
+        conditions = _reprice_line_filter(change, new_price, request.filter)
+
+        lines, quotations, delta = db.execute(
+            select(
+                func.count(QI.id),
+                func.count(func.distinct(QI.quotation_id)),
+                func.coalesce(func.sum(QI.qty * new_price - QI.total), 0)
+            ).where(*conditions)
+        ).one()
+
+        results.append({
+            "item_id": change.item_id,
+            "new_price": new_price,
+            "lines": lines,
+            "quotations": quotations,
+            "amount_delta": to_money(delta),
+        })
+
+        if request.dry_run or not lines:
+            continue
+
+        # Batch by quotation so locks and transactions stay short
+        quotation_ids = db.execute(
+            select(QI.quotation_id).where(*conditions)
+            .distinct().order_by(QI.quotation_id)
+        ).scalars().all()
+
+        for start in range(0, len(quotation_ids), request.batch_size):
+            batch = quotation_ids[start:start + request.batch_size]
+
+            # Lines change → open editors must re-read (If-Match → 412)
+            # and sync clients must refetch. Headers first, like every
+            # other writer, so the archive job skips these quotations
+            db.execute(
+                update(Q)
+                .where(Q.id.in_(batch))
+                .values(
+                    version=Q.version + 1,
+                    change_seq=sync.next_change_seq(db)
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.execute(
+                update(QI)
+                .where(*conditions, QI.quotation_id.in_(batch))
+                .values(price=new_price, total=QI.qty * new_price)
+                .execution_options(synchronize_session=False)
+            )
+            for quotation_id in batch:
+                audit.record(db, "quotation", quotation_id, "reprice", {
+                    "item_id": change.item_id,
+                    "new_price": str(new_price),
+                })
+            db.commit()
+
+    return results
+
+
 # =========================
 # GET QUOTATIONS
 # =========================
@@ -184,9 +835,43 @@ def get_quotations(db: Session):
 
 
 def get_quotation_by_id(db: Session, quotation_id: int):
+    return lookups.quotation_by_id(db, quotation_id)
+
+
+def get_quotations_by_ids(db: Session, quotation_ids: list[int]):
+    """
+    Load many quotations with their lines and item masters in a fixed
+    number of queries (header + lines + items, per table), falling back
+    to the archive for ids that are not hot. Returns {id: quotation}.
+    """
+    ids = set(quotation_ids)
+    found = {}
+
+    for model, line_model in (
+        (models.Quotation, models.QuotationItem),
+        (models.ArchivedQuotation, models.ArchivedQuotationItem),
+    ):
+        missing = ids - found.keys()
+        if not missing:
+            break
+
+        rows = (
+            db.query(model)
+            .filter(model.id.in_(missing))
+            .options(
+                selectinload(model.items).selectinload(line_model.item)
+            )
+            .all()
+        )
+        found.update({q.id: q for q in rows})
+
+    return found
+
+
+def get_archived_quotation_by_id(db: Session, quotation_id: int):
     return (
-        db.query(models.Quotation)
-        .filter(models.Quotation.id == quotation_id)
+        db.query(models.ArchivedQuotation)
+        .filter(models.ArchivedQuotation.id == quotation_id)
         .first()
     )
 
@@ -199,13 +884,10 @@ def delete_quotation(db: Session, quotation_id: int):
     if not quotation:
         return None
 
-    # Delete quotation items first
-    db.query(models.QuotationItem).filter(
-        models.QuotationItem.quotation_id == quotation_id
-    ).delete()
-
-    # Now delete quotation
-    db.delete(quotation)
+    # Soft delete: one row update; lines are removed later by
+    # backend.purge in small batches. Bumps version → open editors 412.
+    quotation.deleted_at = datetime.utcnow()
+    search.remove_quotations(db, [quotation_id])
     db.commit()
     return True
 
@@ -213,20 +895,46 @@ def delete_quotation(db: Session, quotation_id: int):
 # DELETE ITEM
 # =========================
 def delete_item(db: Session, item_id: int):
-    item = get_item_by_id(db, item_id)
+    item = _get_item_for_update(db, item_id)
     if not item:
         return None
 
-    # Check if item is still used in quotation items
-    used = db.query(models.QuotationItem).filter(
-        models.QuotationItem.item_id == item_id
+    # Check if item is still used in live quotation items
+    # (ix_quotation_items_item_id → point lookup)
+    used = db.query(models.QuotationItem.id).join(
+        models.QuotationItem.quotation
+    ).filter(
+        models.QuotationItem.item_id == item_id,
+        models.Quotation.deleted_at.is_(None)
     ).first()
 
+    if not used:
+        used = db.query(models.ArchivedQuotationItem).filter(
+            models.ArchivedQuotationItem.item_id == item_id
+        ).first()
+
     if used:
         raise ValueError("Item used in quotation")
 
+    # Only soft-deleted quotations still point at it; drop those lines
+    # now rather than wait for the purger
+    db.execute(
+        delete(models.QuotationItem)
+        .where(models.QuotationItem.item_id == item_id)
+        .execution_options(synchronize_session=False)
+    )
+    tenant_id = item.tenant_id
     db.delete(item)
+    try:
+        db.flush()
+    except IntegrityError:
+        # A quotation took it since the check above: the foreign key
+        # (no lock here; it would invert the sequence → item lock order)
+        db.rollback()
+        raise ValueError("Item used in quotation")
+    cache_version = item_catalog.bump(db)
     db.commit()
+    item_catalog.evict(tenant_id, item_id, cache_version)
     return True
 
 # =========================
@@ -236,21 +944,30 @@ def update_item(
     db: Session,
     item_id: int,
     item_data: schemas.ItemUpdate,
-    image: str | None = None
+    image: str | None = None,
+    expected_version: int | None = None
 ):
-    item = get_item_by_id(db, item_id)
+    item = _get_item_for_update(db, item_id)
     if not item:
         return None
 
+    _check_version(item, expected_version)
+
+    renamed = item_data.name is not None and item_data.name != item.name
     if item_data.name is not None:
         item.name = item_data.name
 
     if item_data.unit_price is not None:
-        item.unit_price = item_data.unit_price
+        item.unit_price = to_money(item_data.unit_price)
 
     if image is not None:
         item.image = image   # ✅ Cloudinary URL
 
+    _claim_version(db, item)
+    if renamed:
+        search.reindex_item_quotations(db, item.id)
+    cache_version = item_catalog.bump(db)
     db.commit()
     db.refresh(item)
+    item_catalog.put(item, cache_version)
     return item
@@ -1,51 +1,180 @@
-from dotenv import load_dotenv
-load_dotenv()
-
 import os
-from sqlalchemy import create_engine, event
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
-# ❌ Never silently fallback in production
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL is not set")
+POOL_SIZE = 5
 
-engine_kwargs = {
-    "pool_pre_ping": True,
-    "pool_size": 5,
-    "max_overflow": 10,
-}
+# Session.info key holding the tenant of the request (backend/tenancy.py)
+TENANT_KEY = "tenant_id"
+
+
+def _parse_tenant_pools(value: str) -> dict[int, int]:
+    pools = {}
+    for part in value.split(","):
+        if part.strip():
+            tenant_id, _, size = part.partition(":")
+            pools[int(tenant_id)] = int(size or POOL_SIZE)
+    return pools
+
+
+# Tenants with a connection pool of their own: "2:5,7:3" (tenant:size).
+# A noisy tenant then waits on its own pool instead of everyone's.
+TENANT_POOLS = _parse_tenant_pools(os.getenv("TENANT_POOLS", ""))
 
-# PostgreSQL config (Render)
-if DATABASE_URL.startswith("postgresql"):
-    engine_kwargs["connect_args"] = {
-        "connect_timeout": 10
-    }
 
-# SQLite config (LOCAL ONLY)
-if DATABASE_URL.startswith("sqlite"):
-    engine_kwargs["connect_args"] = {"check_same_thread": False}
+class TenantSession(Session):
+    """Routes a session to its tenant's dedicated pool, if it has one."""
 
-engine = create_engine(DATABASE_URL, **engine_kwargs)
+    def get_bind(self, mapper=None, clause=None, **kw):
+        tenant_id = self.info.get(TENANT_KEY)
+        if tenant_id in TENANT_POOLS:
+            return get_tenant_engine(tenant_id)
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
 
-# Enable SQLite foreign keys (local dev only)
-if DATABASE_URL.startswith("sqlite"):
-    @event.listens_for(engine, "connect")
-    def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
-        cursor.close()
 
-SessionLocal = sessionmaker(
+class LazySessionmaker(sessionmaker):
+    """Starts the engine on the first session, whoever opens it (CLIs)."""
+
+    def __call__(self, **local_kw):
+        init_engine()
+        return super().__call__(**local_kw)
+
+
+# Bound by init_engine(): importing this module must not need
+# DATABASE_URL, a .env file or a database connection.
+SessionLocal = LazySessionmaker(
+    class_=TenantSession,
     autocommit=False,
     autoflush=False,
-    bind=engine,
 )
 
 Base = declarative_base()
 
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def _load_dotenv():
+    # python-dotenv is a local-dev convenience, not a runtime dependency
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+def _database_url() -> str:
+    _load_dotenv()
+    DATABASE_URL = os.getenv("DATABASE_URL")
+
+    # ❌ Never silently fallback in production
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL is not set")
+
+    return DATABASE_URL
+
+
+def _create_engine(DATABASE_URL: str, pool_size: int = POOL_SIZE):
+    engine_kwargs = {
+        "pool_pre_ping": True,
+        "pool_size": pool_size,
+        "max_overflow": 10,
+    }
+
+    # PostgreSQL config (Render)
+    if DATABASE_URL.startswith("postgresql"):
+        engine_kwargs["connect_args"] = {
+            "connect_timeout": 10
+        }
+
+    # SQLite config (LOCAL ONLY)
+    if DATABASE_URL.startswith("sqlite"):
+        engine_kwargs["connect_args"] = {"check_same_thread": False}
+
+    engine = create_engine(DATABASE_URL, **engine_kwargs)
+
+    # Enable SQLite foreign keys (local dev only)
+    if DATABASE_URL.startswith("sqlite"):
+        @event.listens_for(engine, "connect")
+        def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+
+    return engine
+
+
+def init_engine():
+    global _engine
+    if _engine is not None:
+        return _engine
+
+    with _engine_lock:
+        if _engine is not None:
+            return _engine
+
+        engine = _create_engine(_database_url())
+        SessionLocal.configure(bind=engine)
+        _engine = engine
+        return _engine
+
+
+_tenant_engines: dict[int, object] = {}
+
+
+def get_tenant_engine(tenant_id: int):
+    """Same database, separate pool (see TENANT_POOLS)."""
+    engine = _tenant_engines.get(tenant_id)
+    if engine is not None:
+        return engine
+
+    init_engine()
+    with _engine_lock:
+        if tenant_id not in _tenant_engines:
+            _tenant_engines[tenant_id] = _create_engine(
+                _database_url(), TENANT_POOLS[tenant_id]
+            )
+        return _tenant_engines[tenant_id]
+
+
+def dispose_engines():
+    if _engine is not None:
+        _engine.dispose()
+    for engine in _tenant_engines.values():
+        engine.dispose()
+
+
+def get_engine():
+    return init_engine()
+
+
+def __getattr__(name):
+    # Keeps `from backend.database import engine` working, lazily
+    if name == "engine":
+        return init_engine()
+    raise AttributeError(name)
+
+
+def warm_pool(size: int = POOL_SIZE):
+    """Open `size` pooled connections so first requests don't pay for it."""
+    engine = init_engine()
+
+    # Hold them all at once, otherwise the pool just reuses the first one
+    connections = []
+    try:
+        for _ in range(size):
+            conn = engine.connect()
+            conn.execute(text("SELECT 1"))
+            connections.append(conn)
+    finally:
+        for conn in connections:
+            conn.close()
+
+
 def get_db():
+    init_engine()
     db = SessionLocal()
     try:
         yield db
@@ -0,0 +1,429 @@
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from backend import audit, sync
+from backend.database import SessionLocal, get_engine
+
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# CONFIG
+# =========================
+EVENTS_ENABLED = os.getenv("EVENTS_ENABLED", "1") != "0"
+# Events kept for Last-Event-ID replay
+EVENTS_HISTORY = int(os.getenv("EVENTS_HISTORY", "1000"))
+# Undelivered events per client before it is disconnected
+EVENTS_CLIENT_QUEUE = int(os.getenv("EVENTS_CLIENT_QUEUE", "100"))
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+
+NOTIFY_CHANNEL = "app_changes"
+# Postgres caps a NOTIFY payload at 8000 bytes
+NOTIFY_BATCH = 50
+
+
+def _event(entry: dict) -> dict:
+    # Ids and action only: clients refetch what they need. tenant_id,
+    # seq and last route and number the event and are not sent (see
+    # stream()).
+    return {
+        "tenant_id": entry["tenant_id"],
+        "entity": entry["entity_type"],
+        "id": entry["entity_id"],
+        "action": entry["action"],
+    }
+
+
+# =========================
+# BROKER (per process)
+# =========================
+class Subscription:
+    def __init__(self, maxsize: int, tenant_id: int | None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.tenant_id = tenant_id
+        self.closed = False
+
+
+class EventBroker:
+    """
+    Fans committed changes out to the SSE clients of this process.
+
+    Events carry the tenant's change sequence number (backend/sync.py)
+    of the transaction that made them; the last event of a transaction
+    has it as its SSE id. Every worker receives the same events, so a
+    client can resume with Last-Event-ID on any of them.
+
+    Per tenant, `floor` is the sequence number above which this worker
+    has every event: the tenant's sequence when its first client
+    subscribed after the feed started, raised as `history` (a ring
+    buffer per tenant) drops old events. A client resuming from below
+    it gets a `reset` event (refetch everything) instead of a silent
+    gap. Clients only get their own tenant's events.
+
+    publish() is thread-safe; delivery happens on the event loop that
+    was attached at startup.
+    """
+
+    def __init__(
+        self,
+        history: int = EVENTS_HISTORY,
+        client_queue: int = EVENTS_CLIENT_QUEUE
+    ):
+        self.history = history
+        self.client_queue = client_queue
+
+        self._lock = threading.Lock()
+        # Every committed change reaches publish() (LISTEN is up)
+        self._live = False
+        self._floor: dict[int, int] = {}
+        self._history: dict[int, deque[tuple[int, dict]]] = {}
+        self._subscribers: set[Subscription] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop | None):
+        self._loop = loop
+
+    def set_live(self, live: bool):
+        """Feed (re)started or lost: what was missed is unknown."""
+        with self._lock:
+            self._live = live
+            self._floor.clear()
+
+    def publish(self, events: list[dict]):
+        with self._lock:
+            published = []
+            for data in events:
+                tenant_id = data["tenant_id"]
+                history = self._history.get(tenant_id)
+                if history is None:
+                    history = self._history[tenant_id] = deque()
+                if len(history) == self.history:
+                    dropped = history.popleft()[0]
+                    if tenant_id in self._floor:
+                        self._floor[tenant_id] = max(
+                            self._floor[tenant_id], dropped
+                        )
+                history.append((data["seq"], data))
+                published.append((data["seq"], data))
+
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._deliver, published)
+
+    def _deliver(self, published: list[tuple[int, dict]]):
+        for sub in list(self._subscribers):
+            for item in published:
+                if item[1]["tenant_id"] != sub.tenant_id:
+                    continue
+                try:
+                    sub.queue.put_nowait(item)
+                except asyncio.QueueFull:
+                    # Too slow: cut it off; it resumes via Last-Event-ID
+                    self._subscribers.discard(sub)
+                    sub.closed = True
+                    break
+
+    def subscribe(
+        self,
+        last_event_id: str | None,
+        tenant_id: int,
+        current_seq: int
+    ) -> tuple[Subscription, list[tuple[int, dict]] | None]:
+        """
+        current_seq: the tenant's change sequence, read before calling.
+        Returns (subscription, replay). replay is None when the client
+        has to reset, [] when it is up to date.
+        """
+        sub = Subscription(self.client_queue, tenant_id)
+
+        with self._lock:
+            self._subscribers.add(sub)
+            if self._live and tenant_id not in self._floor:
+                # Anything committed after current_seq reaches publish()
+                self._floor[tenant_id] = current_seq
+            replay = self._replay_after(last_event_id, tenant_id)
+
+        return sub, replay
+
+    def unsubscribe(self, sub: Subscription):
+        self._subscribers.discard(sub)
+
+    def _replay_after(self, last_event_id: str | None, tenant_id: int):
+        if not last_event_id:
+            return []
+
+        if not last_event_id.isdigit() or tenant_id not in self._floor:
+            return None
+
+        seq = int(last_event_id)
+        if seq < self._floor[tenant_id]:
+            return None
+
+        return [
+            item for item in self._history.get(tenant_id, ())
+            if item[0] > seq
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "live": self._live,
+            "tenants": len(self._history),
+            "subscribers": len(self._subscribers),
+        }
+
+
+broker = EventBroker()
+
+
+# =========================
+# PUBLISHING
+# =========================
+# Events are numbered and sent before the writing transaction commits,
+# on its own connection.
+# SQLite / single worker: into this process' broker after commit.
+# Postgres: NOTIFY, which the server delivers only if the transaction
+# commits; every worker (this one included) LISTENs and feeds its own
+# broker, so all clients see all writes.
+PENDING_KEY = "events_pending"
+
+
+def _numbered(db: Session, pending: list[dict]) -> list[dict]:
+    """
+    Every audited write bumps its tenant's change sequence (sync's
+    flush hook, or the bulk statements themselves) and holds the
+    counter until commit, so its current value numbers this transaction.
+    """
+    events = [_event(entry) for entry in pending if entry["tenant_id"]]
+    seqs = {
+        tenant_id: sync.current_watermark(db, tenant_id)
+        for tenant_id in sorted({data["tenant_id"] for data in events})
+    }
+    for data in events:
+        data["seq"] = seqs[data["tenant_id"]]
+        data["last"] = False
+    for data in reversed(events):
+        if seqs.pop(data["tenant_id"], None) is not None:
+            data["last"] = True
+    return events
+
+
+def _notify(conn, events: list[dict]):
+    for start in range(0, len(events), NOTIFY_BATCH):
+        conn.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {
+                "channel": NOTIFY_CHANNEL,
+                "payload": json.dumps(events[start:start + NOTIFY_BATCH]),
+            }
+        )
+
+
+def _before_commit(db: Session):
+    if not EVENTS_ENABLED:
+        return
+
+    # Commit flushes after this hook: flush now so its changes count
+    db.flush()
+    pending = db.info.get(audit.PENDING_KEY)
+    if not pending:
+        return
+
+    events = _numbered(db, pending)
+    if not events:
+        return
+
+    conn = db.connection()
+    if conn.dialect.name == "postgresql":
+        _notify(conn, events)
+    else:
+        db.info[PENDING_KEY] = events
+
+
+def _after_commit(db: Session):
+    events = db.info.pop(PENDING_KEY, None)
+    if events:
+        broker.publish(events)
+
+
+def _after_transaction_end(db: Session, transaction):
+    if transaction.parent is None:
+        db.info.pop(PENDING_KEY, None)
+
+
+event.listen(SessionLocal, "before_commit", _before_commit)
+event.listen(SessionLocal, "after_commit", _after_commit)
+event.listen(SessionLocal, "after_transaction_end", _after_transaction_end)
+
+
+class PgNotifyListener:
+    """LISTEN on a dedicated connection from a daemon thread."""
+
+    def __init__(self, target: EventBroker, channel: str = NOTIFY_CHANNEL):
+        self.target = target
+        self.channel = channel
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="pg-notify-listener",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout)
+
+    def _run(self):
+        delay = 1
+        while not self._stop.is_set():
+            try:
+                self._listen()
+                delay = 1
+            except Exception as e:
+                logger.warning(
+                    "LISTEN %s failed, retrying in %ss: %s",
+                    self.channel, delay, e
+                )
+                self._stop.wait(delay)
+                delay = min(delay * 2, 30)
+
+    def _listen(self):
+        # Taken out of the pool for good: it sits in LISTEN forever
+        raw = get_engine().raw_connection()
+        # Before detach(): it drops the pool record driver_connection reads
+        conn = raw.driver_connection
+        raw.detach()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {self.channel}")
+            self.target.set_live(True)
+
+            while not self._stop.is_set():
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        self.target.publish(json.loads(notify.payload))
+                    except (ValueError, KeyError, TypeError) as e:
+                        # Not ours (a NOTIFY sent by hand): skip it
+                        logger.warning("Bad %s payload: %s", self.channel, e)
+        finally:
+            # Notifications sent until the next LISTEN are lost
+            self.target.set_live(False)
+            conn.close()
+
+
+pg_listener = PgNotifyListener(broker)
+
+
+def start(loop: asyncio.AbstractEventLoop):
+    broker.attach_loop(loop)
+    if not EVENTS_ENABLED:
+        return
+    if get_engine().dialect.name == "postgresql":
+        pg_listener.start()
+    else:
+        broker.set_live(True)
+
+
+def stop():
+    pg_listener.stop()
+    broker.set_live(False)
+    broker.attach_loop(None)
+
+
+# =========================
+# SSE FORMAT
+# =========================
+def format_event(event_id: str | None, name: str, data) -> str:
+    # No id: EventSource keeps the last one (mid-transaction)
+    id_line = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{id_line}event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+def _format_change(seq: int, data: dict) -> str:
+    public = {
+        k: v for k, v in data.items() if k not in ("tenant_id", "seq", "last")
+    }
+    return format_event(str(seq) if data["last"] else None, "change", public)
+
+
+async def stream(
+    last_event_id: str | None,
+    is_disconnected,
+    tenant_id: int,
+    current_seq: int,
+    expires_at: float | None = None,
+    is_revoked=None
+):
+    """
+    expires_at (epoch seconds) and is_revoked (async, polled every
+    keepalive interval) bound the stream to the token that opened it:
+    an `expired` event, then the stream ends (open a new one).
+    """
+    sub, replay = broker.subscribe(last_event_id, tenant_id, current_seq)
+    replayed_seq = 0
+    try:
+        # Tell EventSource how soon to reconnect
+        yield "retry: 3000\n\n"
+
+        if replay is None:
+            yield format_event(str(current_seq), "reset", {})
+        else:
+            for seq, data in replay:
+                yield _format_change(seq, data)
+                replayed_seq = seq
+
+        last_sent = checked_at = time.monotonic()
+        while not (sub.closed and sub.queue.empty()):
+            expired = expires_at is not None and time.time() >= expires_at
+            if (
+                not expired
+                and is_revoked is not None
+                and time.monotonic() - checked_at >= EVENTS_KEEPALIVE_SECONDS
+            ):
+                checked_at = time.monotonic()
+                expired = await is_revoked()
+            if expired:
+                yield format_event(None, "expired", {})
+                return
+
+            try:
+                seq, data = await asyncio.wait_for(sub.queue.get(), timeout=1)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                if time.monotonic() - last_sent >= EVENTS_KEEPALIVE_SECONDS:
+                    yield ": keepalive\n\n"
+                    last_sent = time.monotonic()
+                continue
+
+            # Published while we were subscribing → already replayed
+            if seq <= replayed_seq:
+                continue
+
+            yield _format_change(seq, data)
+            last_sent = time.monotonic()
+    finally:
+        broker.unsubscribe(sub)
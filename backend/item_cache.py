@@ -0,0 +1,340 @@
+import os
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from backend import models
+from backend.database import TENANT_KEY
+
+
+# =========================
+# CONFIG
+# =========================
+ITEM_CACHE_ENABLED = os.getenv("ITEM_CACHE_ENABLED", "1") != "0"
+ITEM_CACHE_MAX_ITEMS = int(os.getenv("ITEM_CACHE_MAX_ITEMS", "5000"))
+ITEM_CACHE_CHECK_SECONDS = float(os.getenv("ITEM_CACHE_CHECK_SECONDS", "5"))
+
+CACHE_NAME = "item_master"
+
+
+def normalize_name(name: str) -> str:
+    return name.strip().lower()
+
+
+def _snapshot(item) -> models.ItemMaster:
+    """Detached, read-only copy of an item row (safe to share)."""
+    copy = models.ItemMaster(
+        id=item.id,
+        tenant_id=item.tenant_id,
+        name=item.name,
+        unit_price=item.unit_price,
+        image=item.image,
+        version=item.version
+    )
+    make_transient_to_detached(copy)
+    return copy
+
+
+def _attach(db: Session, snap: models.ItemMaster):
+    # Never let a cached copy overwrite a row this session already holds
+    existing = db.identity_map.get(
+        db.identity_key(models.ItemMaster, snap.id)
+    )
+    if existing is not None:
+        return existing
+    return db.merge(snap, load=False)
+
+
+# =========================
+# ITEM CATALOG CACHE
+# =========================
+class ItemCatalogCache:
+    """
+    Per-process copy of one tenant's item_master rows.
+
+    - Loaded once, then served from memory by id and normalized name.
+    - crud writes go through put()/evict() after commit (write-through).
+    - Other workers' writes are picked up by comparing the shared
+      counter in cache_versions at most every `check_seconds`.
+    - If the table outgrows `max_items` the cache switches itself off
+      and every lookup goes straight to the database.
+
+    Lookups hand out db.merge(snapshot, load=False) so callers still get
+    a normal session-bound ItemMaster without a SELECT. Writers should
+    load rows fresh (crud does) and rely on version_id_col as the guard.
+    """
+
+    def __init__(
+        self,
+        tenant_id: int,
+        max_items: int = ITEM_CACHE_MAX_ITEMS,
+        check_seconds: float = ITEM_CACHE_CHECK_SECONDS,
+        enabled: bool = ITEM_CACHE_ENABLED
+    ):
+        self.tenant_id = tenant_id
+        # Own counter: other tenants' writes don't invalidate this copy
+        self.name = f"{CACHE_NAME}:{tenant_id}"
+        self.max_items = max_items
+        self.check_seconds = check_seconds
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._by_id: dict[int, models.ItemMaster] = {}
+        self._by_name: dict[str, int] = {}
+        self._sorted: list[models.ItemMaster] | None = None
+        self._loaded = False
+        self._oversized = False
+        self._version = 0
+        self._checked_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    # -------------------------
+    # shared version counter
+    # -------------------------
+    def _read_version(self, db: Session) -> int:
+        version = db.execute(
+            text("SELECT version FROM cache_versions WHERE name = :name"),
+            {"name": self.name}
+        ).scalar()
+        return version or 0
+
+    def bump(self, db: Session) -> int:
+        """Bump the shared counter inside the caller's transaction."""
+        result = db.execute(
+            text(
+                "UPDATE cache_versions SET version = version + 1 "
+                "WHERE name = :name"
+            ),
+            {"name": self.name}
+        )
+        if result.rowcount == 0:
+            db.add(models.CacheVersion(name=self.name, version=1))
+            db.flush()
+            return 1
+        return self._read_version(db)
+
+    # -------------------------
+    # loading
+    # -------------------------
+    def _usable(self, db: Session) -> bool:
+        if not self.enabled:
+            return False
+
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < self.check_seconds:
+            return not self._oversized
+
+        with self._lock:
+            if self._loaded and now - self._checked_at < self.check_seconds:
+                return not self._oversized
+
+            version = self._read_version(db)
+            if not self._loaded or version != self._version:
+                if self._loaded:
+                    self.invalidations += 1
+                self._load(db, version)
+            self._checked_at = now
+
+        return not self._oversized
+
+    def _load(self, db: Session, version: int):
+        rows = db.query(
+            models.ItemMaster.id,
+            models.ItemMaster.tenant_id,
+            models.ItemMaster.name,
+            models.ItemMaster.unit_price,
+            models.ItemMaster.image,
+            models.ItemMaster.version
+        ).filter(
+            models.ItemMaster.tenant_id == self.tenant_id
+        ).limit(self.max_items + 1).all()
+
+        self.loads += 1
+        self._by_id.clear()
+        self._by_name.clear()
+        self._sorted = None
+        self._version = version
+        self._loaded = True
+        self._oversized = len(rows) > self.max_items
+
+        if self._oversized:
+            return
+
+        for row in sorted(rows, key=lambda r: r.id):
+            self._store(_snapshot(row))
+
+    def _store(self, snap: models.ItemMaster):
+        old = self._by_id.get(snap.id)
+        if old is not None:
+            key = normalize_name(old.name)
+            if self._by_name.get(key) == old.id:
+                del self._by_name[key]
+
+        self._by_id[snap.id] = snap
+        self._by_name.setdefault(normalize_name(snap.name), snap.id)
+        self._sorted = None
+
+    # -------------------------
+    # lookups
+    # -------------------------
+    def get_by_id(self, db: Session, item_id: int):
+        if not self._usable(db):
+            return None
+
+        snap = self._by_id.get(item_id)
+        if snap is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return _attach(db, snap)
+
+    def get_by_name(self, db: Session, name: str):
+        if not self._usable(db):
+            return None
+
+        item_id = self._by_name.get(normalize_name(name))
+        if item_id is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return _attach(db, self._by_id[item_id])
+
+    def all(self, db: Session):
+        if not self._usable(db):
+            return None
+
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(
+                    self._by_id.values(), key=lambda i: i.name
+                )
+            snaps = self._sorted
+
+        self.hits += 1
+        return [_attach(db, snap) for snap in snaps]
+
+    # -------------------------
+    # write-through
+    # -------------------------
+    def _accept(self, version: int) -> bool:
+        # Only follow our own bump (several rows may share one bump); if
+        # another worker slipped in between, reload on the next lookup.
+        if version == self._version:
+            return True
+        if version == self._version + 1:
+            self._version = version
+            return True
+        self._loaded = False
+        return False
+
+    def put(self, item, version: int):
+        if not self.enabled or not self._loaded or self._oversized:
+            return
+        with self._lock:
+            if self._accept(version):
+                self._store(_snapshot(item))
+                if len(self._by_id) > self.max_items:
+                    self._loaded = False
+
+    def evict(self, item_id: int, version: int):
+        if not self.enabled or not self._loaded or self._oversized:
+            return
+        with self._lock:
+            if self._accept(version):
+                snap = self._by_id.pop(item_id, None)
+                if snap is not None:
+                    key = normalize_name(snap.name)
+                    if self._by_name.get(key) == item_id:
+                        del self._by_name[key]
+                    self._sorted = None
+
+    def clear(self):
+        with self._lock:
+            self._loaded = False
+
+    # -------------------------
+    # metrics
+    # -------------------------
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "tenant_id": self.tenant_id,
+            "enabled": self.enabled,
+            "loaded": self._loaded,
+            "oversized": self._oversized,
+            "size": len(self._by_id),
+            "max_items": self.max_items,
+            "version": self._version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "loads": self.loads,
+            "invalidations": self.invalidations,
+        }
+
+
+class TenantItemCatalog:
+    """
+    One ItemCatalogCache per tenant, picked from the session's tenant.
+    Sessions without a tenant (scripts) bypass the cache.
+    """
+
+    def __init__(self, **cache_kwargs):
+        self.cache_kwargs = cache_kwargs
+        self._lock = threading.Lock()
+        self._caches: dict[int, ItemCatalogCache] = {}
+
+    def for_tenant(self, tenant_id: int) -> ItemCatalogCache:
+        cache = self._caches.get(tenant_id)
+        if cache is None:
+            with self._lock:
+                cache = self._caches.setdefault(
+                    tenant_id, ItemCatalogCache(tenant_id, **self.cache_kwargs)
+                )
+        return cache
+
+    def _cache(self, db: Session) -> ItemCatalogCache | None:
+        tenant_id = db.info.get(TENANT_KEY)
+        return None if tenant_id is None else self.for_tenant(tenant_id)
+
+    def bump(self, db: Session) -> int | None:
+        cache = self._cache(db)
+        return cache.bump(db) if cache else None
+
+    def get_by_id(self, db: Session, item_id: int):
+        cache = self._cache(db)
+        return cache.get_by_id(db, item_id) if cache else None
+
+    def get_by_name(self, db: Session, name: str):
+        cache = self._cache(db)
+        return cache.get_by_name(db, name) if cache else None
+
+    def all(self, db: Session):
+        cache = self._cache(db)
+        return cache.all(db) if cache else None
+
+    def put(self, item, version: int | None):
+        if version is not None:
+            self.for_tenant(item.tenant_id).put(item, version)
+
+    def evict(self, tenant_id: int, item_id: int, version: int | None):
+        if version is not None:
+            self.for_tenant(tenant_id).evict(item_id, version)
+
+    def clear(self):
+        for cache in list(self._caches.values()):
+            cache.clear()
+
+    def stats(self, tenant_id: int) -> dict:
+        return self.for_tenant(tenant_id).stats()
+
+
+item_catalog = TenantItemCatalog()
@@ -0,0 +1,89 @@
+"""
+Primary key lookups on the request path.
+
+auth.get_current_user, crud.get_item_by_id and crud.get_quotation_by_id
+run on almost every request. Their SELECTs are built once here with a
+bound id, so a call only computes the statement's cache key and reuses
+the engine's compiled SQL instead of building a Query each time
+(benchmarks/hot_queries.py measures the difference).
+
+On Postgres (PG_PREPARED_STATEMENTS, on by default) every pooled
+connection PREPAREs each lookup the first time it runs it and sends
+EXECUTE from then on, so the server skips parsing and planning too.
+The names are remembered in the connection's pool info, which lives
+and dies with the DBAPI connection. A prepared statement is tied to
+one server connection: turn this off behind a transaction-pooling
+proxy (PgBouncer) that hands out a different one per transaction.
+
+The ORM hooks can't reach into EXECUTE, so the prepared SQL carries
+the tenant and soft-delete filters itself.
+"""
+import os
+
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.orm import Session
+
+from backend import models
+from backend.database import TENANT_KEY
+
+
+PG_PREPARED_STATEMENTS = os.getenv("PG_PREPARED_STATEMENTS", "1") != "0"
+
+# Connection.info key: names PREPAREd on that connection
+PREPARED_KEY = "prepared_statements"
+
+
+class Lookup:
+    def __init__(self, name: str, model, live_only: bool = False):
+        self.name = name
+        self.model = model
+        self.live_only = live_only
+
+        # Tenant and soft-delete filters come from the session hooks
+        self.statement = select(model).where(model.id == bindparam("id"))
+
+        # Filters are in the prepared SQL: skip the hooks
+        self.execute_statement = (
+            select(model)
+            .from_statement(text(f"EXECUTE {name}(:id, :tenant_id)"))
+            .execution_options(all_tenants=True, include_deleted=True)
+        )
+
+    def prepare_sql(self, dialect) -> str:
+        quote = dialect.identifier_preparer.quote
+        table = self.model.__table__
+        columns = ", ".join(quote(column.name) for column in table.columns)
+
+        # No tenant on the session (auth lookup): any tenant
+        where = "id = $1 AND ($2::integer IS NULL OR tenant_id = $2)"
+        if self.live_only:
+            where += " AND deleted_at IS NULL"
+
+        return (
+            f"PREPARE {self.name} (integer, integer) AS "
+            f"SELECT {columns} FROM {quote(table.name)} WHERE {where}"
+        )
+
+    def __call__(self, db: Session, id: int):
+        conn = db.connection()
+
+        if PG_PREPARED_STATEMENTS and conn.dialect.name == "postgresql":
+            prepared = conn.info.setdefault(PREPARED_KEY, set())
+            # Not transactional: survives a rollback of this transaction
+            if self.name not in prepared:
+                conn.exec_driver_sql(self.prepare_sql(conn.dialect))
+                prepared.add(self.name)
+
+            return db.execute(
+                self.execute_statement,
+                {"id": id, "tenant_id": db.info.get(TENANT_KEY)}
+            ).scalar_one_or_none()
+
+        return db.execute(self.statement, {"id": id}).scalar_one_or_none()
+
+
+user_by_id = Lookup("lookup_user_by_id", models.User)
+item_by_id = Lookup("lookup_item_by_id", models.ItemMaster)
+quotation_by_id = Lookup(
+    "lookup_quotation_by_id", models.Quotation, live_only=True
+)
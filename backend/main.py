@@ -1,15 +1,167 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer
+from starlette.concurrency import run_in_threadpool
 
-from backend.database import Base, engine
-from backend.routers import items, quotations
-from backend import auth
+from backend.database import (
+    SessionLocal,
+    dispose_engines,
+    init_engine,
+    warm_pool
+)
+from backend.routers import (
+    admin,
+    analytics,
+    audit,
+    customers,
+    events,
+    items,
+    quotations,
+    sync
+)
+from backend import auth, tokens
+from backend import analytics as rollups
+from backend import events as change_events
+from backend.audit import audit_writer
+from backend.purge import (
+    PURGE_ENABLED,
+    PURGE_INTERVAL_SECONDS,
+    prune_tombstones,
+    purge_deleted_quotations
+)
+from backend.profiling import ProfilingMiddleware
+from backend.rate_limit import RateLimitMiddleware
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# LIFESPAN (lazy startup)
+# =========================
+# The engine is created here, not at import, and the pool is warmed in
+# the background so the process can bind its port immediately.
+# /ready reports 503 until warm-up has succeeded.
+async def _warm_up(app: FastAPI):
+    delay = 1
+    while True:
+        try:
+            await run_in_threadpool(warm_pool)
+            app.state.ready = True
+            return
+        except Exception as e:
+            logger.warning("Pool warm-up failed, retrying in %ss: %s", delay, e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+
+def _purge_once():
+    db = SessionLocal()
+    try:
+        prune_tombstones(db)
+        tokens.prune_expired(db)
+        return purge_deleted_quotations(db)
+    finally:
+        db.close()
+
+
+async def _purge_loop():
+    # Soft-deleted quotations are hard-deleted here, off the request path
+    while True:
+        await asyncio.sleep(PURGE_INTERVAL_SECONDS)
+        try:
+            purged = await run_in_threadpool(_purge_once)
+            if purged:
+                logger.info("Purged %s deleted quotations", purged)
+        except Exception as e:
+            logger.warning("Purge failed: %s", e)
+
+
+def _rollup_once():
+    db = SessionLocal()
+    try:
+        return rollups.update_rollups(db)
+    finally:
+        db.close()
+
+
+async def _rollup_loop():
+    # Analytics rollups follow writes with a delay, off the request path
+    while True:
+        await asyncio.sleep(rollups.ANALYTICS_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(_rollup_once)
+        except Exception as e:
+            logger.warning("Analytics rollup failed: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    init_engine()
+    tokens.init_keys()
+    warm_up = asyncio.create_task(_warm_up(app))
+    audit_writer.start()
+    change_events.start(asyncio.get_running_loop())
+    purger = asyncio.create_task(_purge_loop()) if PURGE_ENABLED else None
+    roller = (
+        asyncio.create_task(_rollup_loop()) if rollups.ANALYTICS_ENABLED else None
+    )
+
+    yield
+
+    if roller:
+        roller.cancel()
+    if purger:
+        purger.cancel()
+    warm_up.cancel()
+    app.state.ready = False
+    await run_in_threadpool(change_events.stop)
+    # Write out buffered audit events before the pool goes away
+    await run_in_threadpool(audit_writer.stop)
+    dispose_engines()
+
+
 # ✅ CREATE APP ONLY ONCE
-app = FastAPI(title="Quotation API")
+app = FastAPI(title="Quotation API", lifespan=lifespan)
+
+# =========================
+# VALIDATION ERRORS
+# =========================
+# Same 422 body as FastAPI's, minus the echoed input: a rejected NaN or
+# Infinity can't be written back as JSON (that turned the 422 into a 500).
+@app.exception_handler(RequestValidationError)
+async def validation_error(request: Request, exc: RequestValidationError):
+    errors = [
+        {key: value for key, value in error.items() if key != "input"}
+        for error in exc.errors()
+    ]
+    return JSONResponse(
+        status_code=422,
+        content={"detail": jsonable_encoder(errors)}
+    )
+
+
+# =========================
+# PROFILING
+# =========================
+# Innermost: rate-limited requests are never profiled.
+app.add_middleware(ProfilingMiddleware)
+
+# =========================
+# RATE LIMITING
+# =========================
+# Added before CORS so CORS stays outermost and 429s still carry
+# Access-Control-* headers.
+app.add_middleware(RateLimitMiddleware)
 
 # =========================
 # CORS
@@ -42,6 +194,12 @@ app.add_middleware(
 app.include_router(auth.router)
 app.include_router(items.router)
 app.include_router(quotations.router)
+app.include_router(customers.router)
+app.include_router(audit.router)
+app.include_router(events.router)
+app.include_router(sync.router)
+app.include_router(analytics.router)
+app.include_router(admin.router)
 
 # =========================
 # ROOT
@@ -50,6 +208,13 @@ app.include_router(quotations.router)
 def root():
     return {"message": "Quotation API running"}
 
+@app.get("/ready")
+def ready(response: Response):
+    if not getattr(app.state, "ready", False):
+        response.status_code = 503
+        return {"ready": False}
+    return {"ready": True}
+
 @app.get("/cors-test")
 def cors_test():
     return {"cors": "working"}
@@ -1,12 +1,32 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import (
+    BigInteger, Column, Date, Integer, String, ForeignKey, DateTime, Index,
+    JSON, UniqueConstraint, func, text
+)
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 from backend.database import Base
-from passlib.context import CryptContext
+from backend.money import MONEY, sum_money
 from pydantic import BaseModel
 from typing import List, Optional
 
+# =========================
+# TENANT
+# =========================
+# One branch. Every tenant-owned table carries tenant_id and every query
+# is filtered on it (backend/tenancy.py), so indexes lead with tenant_id.
+class Tenant(Base):
+    __tablename__ = "tenants"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+def tenant_column():
+    return Column(Integer, ForeignKey("tenants.id"), nullable=False)
+
+
 # =========================
 # ITEM MASTER
 # =========================
@@ -14,9 +34,30 @@ class ItemMaster(Base):
     __tablename__ = "item_master"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, unique=True, nullable=False)
-    unit_price = Column(Float, nullable=False)
+    tenant_id = tenant_column()
+    name = Column(String, nullable=False)
+    unit_price = Column(MONEY, nullable=False)
     image = Column(String, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Position in the tenant's change stream (backend/sync.py)
+    change_seq = Column(BigInteger, nullable=True)
+
+    # ✅ OPTIMISTIC LOCKING (UPDATE ... WHERE version = :old)
+    __mapper_args__ = {"version_id_col": version}
+
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "name", name="uq_item_master_tenant_name"),
+        # Lookups by name are case-insensitive (crud.get_item_by_name)
+        Index(
+            "ix_item_master_tenant_lower_name",
+            "tenant_id", func.lower(name)
+        ),
+        # GET /sync: keyset on (change_seq, id) within the tenant
+        Index(
+            "ix_item_master_tenant_change_seq",
+            "tenant_id", "change_seq", "id"
+        ),
+    )
 
     # ❌ NO CASCADE HERE
     quotation_items = relationship(
@@ -25,6 +66,47 @@ class ItemMaster(Base):
     )
 
 
+# =========================
+# CUSTOMER
+# =========================
+class Customer(Base):
+    __tablename__ = "customers"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = tenant_column()
+    name = Column(String, nullable=False)
+    # Digits only (see crud.normalize_phone); one row per phone per tenant
+    phone = Column(String, nullable=True)
+    # Lowercased, whitespace-collapsed name for dedupe of phone-less customers + autocomplete
+    name_key = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    quotations = relationship("Quotation", back_populates="customer")
+
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "phone", name="uq_customers_tenant_phone"),
+        # Phone-less customers: one per name (NULLs never collide above)
+        Index(
+            "uq_customers_tenant_name_key_no_phone",
+            "tenant_id", "name_key",
+            unique=True,
+            postgresql_where=text("phone IS NULL"),
+            sqlite_where=text("phone IS NULL")
+        ),
+        # text_pattern_ops → LIKE 'prefix%' can use the index on Postgres
+        Index(
+            "ix_customers_tenant_name_key",
+            "tenant_id", "name_key",
+            postgresql_ops={"name_key": "text_pattern_ops"}
+        ),
+        Index(
+            "ix_customers_tenant_phone_pattern",
+            "tenant_id", "phone",
+            postgresql_ops={"phone": "text_pattern_ops"}
+        ),
+    )
+
+
 # =========================
 # QUOTATION
 # =========================
@@ -32,12 +114,68 @@ class Quotation(Base):
     __tablename__ = "quotations"
 
     id = Column(Integer, primary_key=True, index=True)
-    quote_no = Column(String, unique=True, index=True)
+    tenant_id = tenant_column()
+    quote_no = Column(String)
+    # Name/phone stay on the row as typed; customer_id links the history
+    customer_id = Column(
+        Integer,
+        ForeignKey("customers.id"),
+        nullable=True
+    )
     customer_name = Column(String, nullable=False)
     customer_phone = Column(String, nullable=True)
     salesman_name = Column(String, nullable=False)
-    tax = Column(Float, default=0)
+    tax = Column(MONEY, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Idempotency key for offline uploads (POST /quotations/bulk)
+    client_id = Column(String(64), nullable=True)
+    # Soft delete: set by crud.delete_quotation, rows removed by backend.purge
+    deleted_at = Column(DateTime, nullable=True)
+    # Position in the tenant's change stream (backend/sync.py); bumped when
+    # the header or any of its lines change
+    change_seq = Column(BigInteger, nullable=True)
+
+    # ✅ OPTIMISTIC LOCKING (UPDATE ... WHERE version = :old)
+    __mapper_args__ = {"version_id_col": version}
+
+    __table_args__ = (
+        Index(
+            "ix_quotations_tenant_quote_no",
+            "tenant_id", "quote_no",
+            unique=True
+        ),
+        UniqueConstraint(
+            "tenant_id", "client_id",
+            name="uq_quotations_tenant_client_id"
+        ),
+        Index("ix_quotations_tenant_created_at", "tenant_id", "created_at"),
+        # Customer history: WHERE customer_id = ? ORDER BY id DESC
+        Index(
+            "ix_quotations_tenant_customer_id_id",
+            "tenant_id", "customer_id", "id"
+        ),
+        # Live rows only (what every default query reads)
+        Index(
+            "ix_quotations_tenant_live_id",
+            "tenant_id", "id",
+            postgresql_where=text("deleted_at IS NULL"),
+            sqlite_where=text("deleted_at IS NULL")
+        ),
+        Index(
+            "ix_quotations_tenant_change_seq",
+            "tenant_id", "change_seq", "id"
+        ),
+        # Purger (all tenants): WHERE deleted_at < :cutoff, tiny since rows don't stay
+        Index(
+            "ix_quotations_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+            sqlite_where=text("deleted_at IS NOT NULL")
+        ),
+    )
+
+    customer = relationship("Customer", back_populates="quotations")
 
     # ✅ DELETE QUOTATION → DELETE ITEMS
     items = relationship(
@@ -47,6 +185,10 @@ class Quotation(Base):
         passive_deletes=True
     )
 
+    @property
+    def subtotal(self):
+        return sum_money(line.total for line in self.items)
+
 
 # =========================
 # QUOTATION ITEMS
@@ -60,30 +202,246 @@ class QuotationItem(Base):
     quotation_id = Column(
         Integer,
         ForeignKey("quotations.id", ondelete="CASCADE"),
-        nullable=False
+        nullable=False,
+        index=True
     )
 
     # ❌ DO NOT CASCADE FROM ITEM
+    # Indexed: delete_item's "still in use?" check is a point lookup
     item_id = Column(
         Integer,
         ForeignKey("item_master.id"),
-        nullable=False
+        nullable=False,
+        index=True
     )
 
     qty = Column(Integer, nullable=False)
-    price = Column(Float, nullable=False)
-    total = Column(Float, nullable=False)
+    price = Column(MONEY, nullable=False)
+    total = Column(MONEY, nullable=False)
 
     quotation = relationship("Quotation", back_populates="items")
     item = relationship("ItemMaster", back_populates="quotation_items")
 
+
+# =========================
+# ARCHIVED QUOTATIONS (COLD STORAGE)
+# =========================
+# Same shape as quotations / quotation_items. Rows are moved here by
+# `python -m backend.archive` so the hot tables stay small.
+class ArchivedQuotation(Base):
+    __tablename__ = "quotations_archive"
+
+    id = Column(Integer, primary_key=True)
+    tenant_id = tenant_column()
+    quote_no = Column(String)
+    customer_id = Column(
+        Integer,
+        ForeignKey("customers.id"),
+        nullable=True
+    )
+    customer_name = Column(String, nullable=False)
+    customer_phone = Column(String, nullable=True)
+    salesman_name = Column(String, nullable=False)
+    tax = Column(MONEY, default=0)
+    created_at = Column(DateTime)
+    version = Column(Integer, nullable=False, default=1)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index(
+            "ix_quotations_archive_tenant_quote_no",
+            "tenant_id", "quote_no",
+            unique=True
+        ),
+        Index(
+            "ix_quotations_archive_tenant_customer_id",
+            "tenant_id", "customer_id"
+        ),
+        Index(
+            "ix_quotations_archive_tenant_created_at",
+            "tenant_id", "created_at"
+        ),
+    )
+
+    # Lets QuotationResponse tell hot and archived rows apart
+    archived = True
+
+    items = relationship(
+        "ArchivedQuotationItem",
+        back_populates="quotation",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
+    @property
+    def subtotal(self):
+        return sum_money(line.total for line in self.items)
+
+
+class ArchivedQuotationItem(Base):
+    __tablename__ = "quotation_items_archive"
+
+    id = Column(Integer, primary_key=True)
+
+    quotation_id = Column(
+        Integer,
+        ForeignKey("quotations_archive.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    # ❌ DO NOT CASCADE FROM ITEM (archived lines still block item delete)
+    item_id = Column(
+        Integer,
+        ForeignKey("item_master.id"),
+        nullable=False,
+        index=True
+    )
+
+    qty = Column(Integer, nullable=False)
+    price = Column(MONEY, nullable=False)
+    total = Column(MONEY, nullable=False)
+
+    quotation = relationship("ArchivedQuotation", back_populates="items")
+    item = relationship("ItemMaster")
+
 class User(Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True, index=True)
+    tenant_id = tenant_column()
+    # Unique across tenants: login doesn't know the tenant yet
     username = Column(String, unique=True, nullable=False)
     password = Column(String, nullable=False)
 
+    __table_args__ = (
+        Index("ix_users_tenant_id", "tenant_id", "id"),
+    )
+
+
+# =========================
+# AUTH SESSIONS
+# =========================
+# One row per refresh token (backend/tokens.py). Rotation revokes the
+# old row and adds a new one to the same session; presenting a revoked
+# token again revokes the whole session.
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    session_id = Column(String(32), nullable=False, index=True)
+    # sha256 of the token: the token itself is never stored
+    token_hash = Column(String(64), unique=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    # Access token issued alongside, denylisted when the session ends
+    access_jti = Column(String(32), nullable=False)
+    access_expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    revoked_at = Column(DateTime, nullable=True)
+
+
+# Revoked access tokens, kept until they would have expired anyway
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+# =========================
+# CACHE VERSIONS
+# =========================
+# One counter per cached table, bumped in the same transaction as the
+# write so every worker can tell its in-process copy is stale.
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# =========================
+# SYNC TOMBSTONES
+# =========================
+# Deleted (or archived) rows for GET /sync, pruned after a retention
+# period by backend.purge.
+class SyncTombstone(Base):
+    __tablename__ = "sync_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(Integer, nullable=False)
+    entity_type = Column(String(32), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    change_seq = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index(
+            "ix_sync_tombstones_tenant_change_seq",
+            "tenant_id", "change_seq", "id"
+        ),
+    )
+
+
+# =========================
+# AUDIT LOG (append-only)
+# =========================
+# Written by the background writer in backend/audit.py, never updated.
+# No FKs: history must outlive deleted items, quotations and users.
+class AuditLog(Base):
+    __tablename__ = "audit_log"
+
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(Integer, nullable=True)
+    entity_type = Column(String(32), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    action = Column(String(16), nullable=False)
+    actor_id = Column(Integer, nullable=True)
+    changes = Column(JSON, nullable=True)
+    # When the change was made, not when the row was written
+    created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_audit_log_tenant_entity",
+            "tenant_id", "entity_type", "entity_id", "id"
+        ),
+    )
+
+
+# =========================
+# ANALYTICS ROLLUPS
+# =========================
+# Per-day totals of live + archived quotations, maintained by
+# backend/analytics.py. The primary key (tenant_id, day, ...) serves the
+# date range reads of the analytics endpoints.
+class AnalyticsItemDaily(Base):
+    __tablename__ = "analytics_item_daily"
+
+    tenant_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    item_id = Column(Integer, primary_key=True)
+    quantity = Column(BigInteger, nullable=False)
+    revenue = Column(MONEY, nullable=False)
+    quotations = Column(Integer, nullable=False)
+
+
+class AnalyticsSalesmanDaily(Base):
+    __tablename__ = "analytics_salesman_daily"
+
+    tenant_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    salesman_name = Column(String, primary_key=True)
+    quotations = Column(Integer, nullable=False)
+    # Sum of line totals (before tax)
+    subtotal = Column(MONEY, nullable=False)
+    customers = Column(Integer, nullable=False)
 
 
 
@@ -0,0 +1,43 @@
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterable
+
+from sqlalchemy import Numeric
+
+
+# =========================
+# MONEY
+# =========================
+# All prices, taxes and totals are stored as NUMERIC(12, 2) and handled
+# as Decimal in Python, so qty * price never picks up float drift.
+MONEY = Numeric(12, 2)
+
+CENT = Decimal("0.01")
+
+# Largest amount a NUMERIC(12, 2) column holds
+MAX_MONEY = Decimal("9999999999.99")
+
+
+def to_money(value) -> Decimal | None:
+    if value is None:
+        return None
+    if not isinstance(value, Decimal):
+        # str() first: Decimal(0.1) would keep the binary float error
+        value = Decimal(str(value))
+    if not value.is_finite():
+        # NaN would quantize to NaN, Infinity raises InvalidOperation
+        raise ValueError(f"Amount must be a finite number, got {value}")
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def line_total(qty: int, price) -> Decimal:
+    return to_money(to_money(price) * qty)
+
+
+def to_cents(value) -> int:
+    return int(to_money(value) * 100)
+
+
+def sum_money(values: Iterable) -> Decimal:
+    """Exact sum: add integer cents, convert back once at the end."""
+    cents = sum(to_cents(v) for v in values if v is not None)
+    return Decimal(cents).scaleb(-2)
@@ -0,0 +1,451 @@
+"""
+Per-request profiling.
+
+    curl -H "Authorization: Bearer ..." -H "X-Profile: 1" -X POST .../quotations/
+    GET /admin/profiles                # newest first
+    GET /admin/profiles/{id}           # speedscope file (speedscope.app)
+    GET /admin/profiles/{id}/sql       # ordered SQL timeline
+
+A request is profiled when an admin (auth.ADMIN_USERNAMES) sends
+X-Profile: 1, or at random with probability PROFILE_SAMPLE_RATE. The
+response then carries X-Profile-Id. While the request runs:
+
+- a sampler thread records the Python stack of the pool threads serving
+  it every PROFILE_INTERVAL_MS (threads are tied to the request by its
+  SQL and auth calls; samples outside backend/ code count as idle),
+- every SQL statement and COMMIT is recorded with its start offset,
+  duration and the driver's row count (psycopg2 reports it for SELECTs
+  too, SQLite doesn't). Only the statement text, never the parameters.
+
+Everything goes into one speedscope file in PROFILE_DIR: one evented
+profile per thread plus an "SQL" profile with one frame per statement,
+all on the same time axis. The newest PROFILE_KEEP requests are kept.
+Async code on the event loop (middleware, SSE) is not sampled.
+
+Recording stops when an event stream (SSE) starts, and after
+PROFILE_MAX_SAMPLES samples or PROFILE_MAX_STATEMENTS statements
+(the profile is then marked truncated), so long streamed responses
+don't grow it without bound.
+"""
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+
+# =========================
+# CONFIG
+# =========================
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "1") != "0"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+PROFILE_DIR = os.getenv("PROFILE_DIR") or os.path.join(
+    tempfile.gettempdir(), "quotation-profiles"
+)
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+# Per request (5000 samples: 10 s at the default interval)
+PROFILE_MAX_SAMPLES = int(os.getenv("PROFILE_MAX_SAMPLES", "5000"))
+PROFILE_MAX_STATEMENTS = int(os.getenv("PROFILE_MAX_STATEMENTS", "5000"))
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_current: ContextVar["Profile | None"] = ContextVar("profile", default=None)
+
+
+class Profile:
+    def __init__(self, method: str, path: str, sampled: bool):
+        self.id = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.sampled = sampled
+        self.status = None
+        self.truncated = False
+        self.created_at = datetime.utcnow()
+        self.start = time.perf_counter()
+        self.end = None
+
+        # thread id -> [(perf_counter, stack)], stack = ((name, file, line), ...)
+        self.samples: dict[int, list] = {}
+        self.sample_count = 0
+        self.sql: list[dict] = []
+        self.commit_started = None
+
+    def offset_ms(self, t: float) -> float:
+        return round((t - self.start) * 1000, 3)
+
+    def add_statement(self, statement: str, started: float, rows=None,
+                      executemany: bool = False):
+        if self.end is not None:
+            return
+        if len(self.sql) >= PROFILE_MAX_STATEMENTS:
+            self.truncated = True
+            return
+        self.sql.append({
+            "start_ms": self.offset_ms(started),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            "statement": statement,
+            "rows": rows,
+            "executemany": executemany,
+        })
+
+
+# =========================
+# SAMPLER
+# =========================
+_lock = threading.Lock()
+_active: set[Profile] = set()
+_bound: dict[int, Profile] = {}
+_wake = threading.Event()
+_thread: threading.Thread | None = None
+
+
+def track() -> Profile | None:
+    """Bind the calling thread to the current request's profile (if any)."""
+    profile = _current.get()
+    tid = threading.get_ident()
+    if _bound.get(tid) is not profile:
+        with _lock:
+            if profile is None:
+                _bound.pop(tid, None)
+            elif profile in _active:
+                _bound[tid] = profile
+    return profile
+
+
+def _stack(frame) -> tuple:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def _sample_loop():
+    interval = PROFILE_INTERVAL_MS / 1000
+    while True:
+        _wake.wait()
+        time.sleep(interval)
+
+        now = time.perf_counter()
+        frames = sys._current_frames()
+        with _lock:
+            bound = list(_bound.items())
+
+        for tid, profile in bound:
+            frame = frames.get(tid)
+            if frame is None or profile.end is not None:
+                continue
+            if profile.sample_count >= PROFILE_MAX_SAMPLES:
+                profile.truncated = True
+                continue
+            stack = _stack(frame)
+            # Pool thread waiting for work: idle, not request time
+            if not any(f[1].startswith(BACKEND_DIR) for f in stack):
+                stack = ()
+            profile.samples.setdefault(tid, []).append((now, stack))
+            profile.sample_count += 1
+
+
+def _start(profile: Profile):
+    global _thread
+    with _lock:
+        _active.add(profile)
+        if _thread is None:
+            _thread = threading.Thread(
+                target=_sample_loop, name="profiler", daemon=True
+            )
+            _thread.start()
+        _wake.set()
+
+
+def _stop(profile: Profile):
+    if profile.end is not None:
+        return
+    with _lock:
+        _active.discard(profile)
+        for tid in [t for t, p in _bound.items() if p is profile]:
+            del _bound[tid]
+        if not _active:
+            _wake.clear()
+    profile.end = time.perf_counter()
+
+
+# =========================
+# SQL TIMELINE
+# =========================
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    if track() is not None:
+        conn.info["profile_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    started = conn.info.pop("profile_started", None)
+    profile = _current.get()
+    if started is None or profile is None:
+        return
+    rows = cursor.rowcount if cursor.rowcount >= 0 else None
+    profile.add_statement(statement, started, rows, executemany)
+
+
+def _commit(conn):
+    profile = _current.get()
+    if profile is not None:
+        profile.commit_started = time.perf_counter()
+
+
+def _after_commit(db):
+    profile = _current.get()
+    if profile is not None and profile.commit_started is not None:
+        profile.add_statement("COMMIT", profile.commit_started)
+        profile.commit_started = None
+
+
+if PROFILING_ENABLED:
+    from backend.database import SessionLocal
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "commit", _commit)
+    event.listen(SessionLocal, "after_commit", _after_commit)
+
+
+# =========================
+# SPEEDSCOPE EXPORT
+# =========================
+def _evented(profile: Profile, name: str, spans, frame_index) -> dict:
+    """spans: [(t, stack)] in time order; () closes everything."""
+    events = []
+    open_stack: tuple = ()
+
+    for t, stack in spans:
+        common = 0
+        while (
+            common < min(len(open_stack), len(stack))
+            and open_stack[common] == stack[common]
+        ):
+            common += 1
+        at = profile.offset_ms(t)
+        for frame in reversed(open_stack[common:]):
+            events.append({"type": "C", "frame": frame_index(frame), "at": at})
+        for frame in stack[common:]:
+            events.append({"type": "O", "frame": frame_index(frame), "at": at})
+        open_stack = stack
+
+    end = profile.offset_ms(profile.end)
+    for frame in reversed(open_stack):
+        events.append({"type": "C", "frame": frame_index(frame), "at": end})
+
+    return {
+        "type": "evented",
+        "name": name,
+        "unit": "milliseconds",
+        "startValue": 0,
+        "endValue": end,
+        "events": events,
+    }
+
+
+def to_speedscope(profile: Profile) -> dict:
+    frames = []
+    index = {}
+
+    def frame_index(frame) -> int:
+        if frame not in index:
+            name, file, line = frame
+            index[frame] = len(frames)
+            frames.append({"name": name, "file": file, "line": line})
+        return index[frame]
+
+    profiles = [
+        _evented(profile, f"Python (thread {tid})", samples, frame_index)
+        for tid, samples in profile.samples.items()
+    ]
+
+    # One frame per statement, open for exactly its duration
+    sql_spans = []
+    for n, stmt in enumerate(profile.sql):
+        label = " ".join(stmt["statement"].split())[:200]
+        frame = (f"#{n + 1} {label}", "SQL", 0)
+        started = profile.start + stmt["start_ms"] / 1000
+        sql_spans.append((started, (frame,)))
+        sql_spans.append((started + stmt["duration_ms"] / 1000, ()))
+    # Statements from two threads of one request may overlap
+    sql_spans.sort(key=lambda span: span[0])
+    profiles.append(_evented(profile, "SQL", sql_spans, frame_index))
+
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": f"{profile.method} {profile.path} {profile.id}",
+        "exporter": "backend.profiling",
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": profiles,
+    }
+
+
+def summary(profile: Profile) -> dict:
+    return {
+        "id": profile.id,
+        "method": profile.method,
+        "path": profile.path,
+        "status": profile.status,
+        "sampled": profile.sampled,
+        "created_at": profile.created_at.isoformat(),
+        "duration_ms": profile.offset_ms(profile.end),
+        "statements": len(profile.sql),
+        "sql_ms": round(sum(s["duration_ms"] for s in profile.sql), 3),
+        "truncated": profile.truncated,
+    }
+
+
+# =========================
+# STORAGE
+# =========================
+def _path(profile_id: str, kind: str) -> str:
+    return os.path.join(PROFILE_DIR, f"{profile_id}.{kind}.json")
+
+
+def save(profile: Profile):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+
+    with open(_path(profile.id, "speedscope"), "w") as f:
+        json.dump(to_speedscope(profile), f)
+    with open(_path(profile.id, "sql"), "w") as f:
+        json.dump({**summary(profile), "sql": profile.sql}, f)
+
+    for old in list_ids()[PROFILE_KEEP:]:
+        for kind in ("speedscope", "sql"):
+            try:
+                os.remove(_path(old, kind))
+            except FileNotFoundError:
+                pass
+
+
+def list_ids() -> list[str]:
+    """Newest first."""
+    try:
+        names = os.listdir(PROFILE_DIR)
+    except FileNotFoundError:
+        return []
+    ids = [n[:-len(".sql.json")] for n in names if n.endswith(".sql.json")]
+    return sorted(ids, key=lambda i: int(i.split("-")[0]), reverse=True)
+
+
+def artifact_path(profile_id: str, kind: str) -> str | None:
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = _path(profile_id, kind)
+    return path if os.path.exists(path) else None
+
+
+def load_sql(profile_id: str) -> dict | None:
+    path = artifact_path(profile_id, "sql")
+    if path is None:
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+# =========================
+# MIDDLEWARE
+# =========================
+def _is_admin(token: str) -> bool:
+    # Imported here: auth imports this module
+    from fastapi import HTTPException
+
+    from backend import auth
+    from backend.database import SessionLocal
+
+    # Own short-lived session, as for the SSE endpoint
+    db = SessionLocal()
+    try:
+        return auth.is_admin(auth.get_current_user(token, db))
+    except HTTPException:
+        return False
+    finally:
+        db.close()
+
+
+def _is_event_stream(message) -> bool:
+    return any(
+        name.lower() == b"content-type"
+        and value.startswith(b"text/event-stream")
+        for name, value in message.get("headers", [])
+    )
+
+
+class ProfilingMiddleware:
+    """
+    Plain ASGI middleware like RateLimitMiddleware. An X-Profile request
+    is authenticated first (one user lookup) and profiled only if the
+    caller is an admin; anyone else's request runs as usual.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILING_ENABLED:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        authorization = headers.get(b"authorization", b"")
+        requested = (
+            headers.get(PROFILE_HEADER) == b"1"
+            and authorization[:7].lower() == b"bearer "
+        )
+        if requested:
+            requested = await run_in_threadpool(
+                _is_admin, authorization[7:].decode("latin-1")
+            )
+        sampled = (
+            not requested
+            and PROFILE_SAMPLE_RATE > 0
+            and random.random() < PROFILE_SAMPLE_RATE
+        )
+        if not (requested or sampled):
+            return await self.app(scope, receive, send)
+
+        profile = Profile(scope["method"], scope["path"], sampled)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                # Open-ended: profile up to the start of the stream
+                if _is_event_stream(message):
+                    _stop(profile)
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"x-profile-id", profile.id.encode()),
+                    ],
+                }
+            await send(message)
+
+        token = _current.set(profile)
+        _start(profile)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _stop(profile)
+            _current.reset(token)
+            await run_in_threadpool(save, profile)
@@ -0,0 +1,152 @@
+"""
+Hard-delete soft-deleted quotations.
+
+    python -m backend.purge
+    python -m backend.purge --grace-seconds 0 --batch-size 200
+
+crud.delete_quotation only sets deleted_at. This removes those rows once
+they are older than the grace period: lines first, in chunks of
+`batch_size` rows, then the headers, one short transaction per chunk so
+no single delete holds locks for long. Sync tombstones older than
+SYNC_TOMBSTONE_DAYS are pruned the same way. The app also runs it
+periodically in the background (see PURGE_INTERVAL_SECONDS).
+"""
+import argparse
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from backend import analytics, models, sync
+
+
+PURGE_ENABLED = os.getenv("PURGE_ENABLED", "1") != "0"
+PURGE_INTERVAL_SECONDS = float(os.getenv("PURGE_INTERVAL_SECONDS", "300"))
+# Deleted rows stay this long (sync clients, audit lookups, mistakes)
+PURGE_GRACE_SECONDS = float(os.getenv("PURGE_GRACE_SECONDS", "3600"))
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "500"))
+# Offline clients must sync at least this often to avoid a full reset
+SYNC_TOMBSTONE_DAYS = float(os.getenv("SYNC_TOMBSTONE_DAYS", "30"))
+
+
+def purge_deleted_quotations(
+    db: Session,
+    grace_seconds: float = PURGE_GRACE_SECONDS,
+    batch_size: int = PURGE_BATCH_SIZE
+) -> int:
+    Q, QI = models.Quotation, models.QuotationItem
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    purged = 0
+
+    # The rollups find a deleted quotation's day through its row: let
+    # them see the deletion before the row is gone
+    if analytics.ANALYTICS_ENABLED:
+        analytics.update_rollups(db)
+
+    while True:
+        ids = db.execute(
+            select(Q.id)
+            .where(Q.deleted_at.is_not(None), Q.deleted_at < cutoff)
+            .order_by(Q.id)
+            .limit(batch_size)
+            .execution_options(include_deleted=True)
+        ).scalars().all()
+
+        if not ids:
+            break
+
+        # Lines in chunks: one big quotation must not mean one big DELETE
+        while True:
+            line_ids = db.execute(
+                select(QI.id)
+                .where(QI.quotation_id.in_(ids))
+                .limit(batch_size)
+            ).scalars().all()
+            if not line_ids:
+                break
+            db.execute(delete(QI).where(QI.id.in_(line_ids)))
+            db.commit()
+
+        db.execute(
+            delete(Q)
+            .where(Q.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+        purged += len(ids)
+
+    return purged
+
+
+def prune_tombstones(
+    db: Session,
+    retention_days: float = SYNC_TOMBSTONE_DAYS,
+    batch_size: int = PURGE_BATCH_SIZE
+) -> int:
+    """
+    Drop old sync tombstones. Watermarks older than the newest dropped
+    one can no longer be served, so that becomes the sync horizon
+    (clients behind it are told to reset).
+    """
+    T = models.SyncTombstone
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    pruned = 0
+
+    while True:
+        rows = db.execute(
+            select(T.id, T.tenant_id, T.change_seq)
+            .where(T.deleted_at < cutoff)
+            .order_by(T.id)
+            .limit(batch_size)
+        ).all()
+
+        if not rows:
+            break
+
+        horizons = {}
+        for _, tenant_id, seq in rows:
+            horizons[tenant_id] = max(seq, horizons.get(tenant_id, 0))
+        for tenant_id in sorted(horizons):
+            sync.raise_horizon(db, tenant_id, horizons[tenant_id])
+        db.execute(delete(T).where(T.id.in_([row.id for row in rows])))
+        db.commit()
+
+        pruned += len(rows)
+
+    return pruned
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Purge soft-deleted quotations"
+    )
+    parser.add_argument(
+        "--grace-seconds",
+        type=float,
+        default=PURGE_GRACE_SECONDS,
+        help="only purge rows deleted at least this long ago"
+    )
+    parser.add_argument("--batch-size", type=int, default=PURGE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    from backend.database import SessionLocal, init_engine
+
+    init_engine()
+    db = SessionLocal()
+    try:
+        purged = purge_deleted_quotations(
+            db,
+            grace_seconds=args.grace_seconds,
+            batch_size=args.batch_size
+        )
+        pruned = prune_tombstones(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+
+    print(f"Purged {purged} quotations, {pruned} sync tombstones")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+# =========================
+# CONFIG
+# =========================
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+
+# Buckets kept in memory before the least recently used ones are dropped
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+
+# Proxies in front of the app that append to X-Forwarded-For (Render: 1).
+# The client is the hop the outermost of them appended; anything left of
+# it was sent by the client and can't be trusted. 0 = ignore the header.
+TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", "1"))
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    per_minute: float        # sustained refill rate
+    burst: int               # bucket size
+    max_concurrent: int      # in-flight requests per client
+
+
+# Budgets are per route *and* per client (JWT sub, else IP)
+RATE_LIMITS: dict[tuple[str, str], RateLimit] = {
+    # bcrypt verify on every attempt
+    ("POST", "/auth/login"): RateLimit(per_minute=10, burst=5, max_concurrent=2),
+    ("POST", "/auth/register"): RateLimit(per_minute=5, burst=3, max_concurrent=1),
+    # Cloudinary fan-out + several commits
+    ("POST", "/quotations/"): RateLimit(per_minute=30, burst=10, max_concurrent=2),
+    # Up to 200 quotations per request
+    ("POST", "/quotations/bulk"): RateLimit(per_minute=10, burst=5, max_concurrent=1),
+    ("POST", "/items/"): RateLimit(per_minute=30, burst=10, max_concurrent=2),
+    # Rewrites lines across the whole tenant
+    ("POST", "/quotations/reprice"): RateLimit(per_minute=6, burst=2, max_concurrent=1),
+    # Up to 100 quotations with lines and items
+    ("POST", "/quotations/batch-get"): RateLimit(per_minute=60, burst=20, max_concurrent=2),
+}
+
+# Routes with a path param before the end, written like the route
+RATE_LIMIT_ROUTES: dict[tuple[str, str], RateLimit] = {
+    # INSERT ... SELECT of the header and every line
+    ("POST", "/quotations/{quotation_id}/clone"): RateLimit(per_minute=30, burst=10, max_concurrent=2),
+}
+
+# Prefix rules for routes with path params (e.g. PATCH /quotations/{id})
+RATE_LIMIT_PREFIXES: dict[tuple[str, str], RateLimit] = {
+    ("PATCH", "/quotations/"): RateLimit(per_minute=60, burst=10, max_concurrent=2),
+    ("PATCH", "/items/"): RateLimit(per_minute=60, burst=10, max_concurrent=2),
+}
+
+
+def _route_pattern(route: str) -> re.Pattern:
+    # "{param}" matches one path segment
+    segments = [
+        "[^/]+" if part.startswith("{") else re.escape(part)
+        for part in route.split("/")
+    ]
+    return re.compile("^" + "/".join(segments) + "$")
+
+
+_ROUTE_PATTERNS = [
+    (method, route, _route_pattern(route), limit)
+    for (method, route), limit in RATE_LIMIT_ROUTES.items()
+]
+
+
+def find_limit(method: str, path: str) -> tuple[str, RateLimit] | None:
+    limit = RATE_LIMITS.get((method, path))
+    if limit:
+        return f"{method} {path}", limit
+
+    for m, route, pattern, limit in _ROUTE_PATTERNS:
+        if m == method and pattern.match(path):
+            return f"{m} {route}", limit
+
+    for (m, prefix), limit in RATE_LIMIT_PREFIXES.items():
+        if m == method and path.startswith(prefix) and path != prefix:
+            return f"{m} {prefix}*", limit
+
+    return None
+
+
+# =========================
+# STORES
+# =========================
+class BucketStore(ABC):
+    """
+    Backend for token buckets and in-flight counters.
+    Swap in a shared implementation (e.g. Redis) with set_store() to
+    enforce budgets across workers.
+    """
+
+    @abstractmethod
+    def take(self, key: str, limit: RateLimit) -> float:
+        """Consume one token; return 0 if allowed, else seconds to wait."""
+
+    @abstractmethod
+    def acquire(self, key: str, limit: RateLimit) -> bool:
+        """Start a request; False if the client has too many in flight."""
+
+    @abstractmethod
+    def release(self, key: str) -> None:
+        """End a request started by acquire()."""
+
+
+class MemoryBucketStore(BucketStore):
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._inflight: dict[str, int] = {}
+
+    def take(self, key: str, limit: RateLimit) -> float:
+        rate = limit.per_minute / 60.0
+        now = time.monotonic()
+
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit.burst, now))
+            tokens = min(limit.burst, tokens + (now - updated) * rate)
+
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        return wait
+
+    def acquire(self, key: str, limit: RateLimit) -> bool:
+        with self._lock:
+            current = self._inflight.get(key, 0)
+            if current >= limit.max_concurrent:
+                return False
+            self._inflight[key] = current + 1
+            return True
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            current = self._inflight.get(key, 0) - 1
+            if current > 0:
+                self._inflight[key] = current
+            else:
+                self._inflight.pop(key, None)
+
+
+_store: BucketStore = MemoryBucketStore()
+
+
+def set_store(store: BucketStore) -> None:
+    global _store
+    _store = store
+
+
+# =========================
+# CLIENT KEY
+# =========================
+def client_key(scope) -> str:
+    headers = dict(scope.get("headers") or [])
+
+    auth_header = headers.get(b"authorization", b"").decode("latin-1")
+    if auth_header.lower().startswith("bearer "):
+        from jose import JWTError
+
+        from backend.tokens import decode
+
+        try:
+            payload = decode(auth_header[7:])
+            if payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except JWTError:
+            pass
+
+    # ❌ Never the first hop: the client sets it (a fresh one per request
+    # would get a fresh bucket)
+    forwarded = headers.get(b"x-forwarded-for")
+    if forwarded and TRUSTED_PROXY_COUNT > 0:
+        hops = [h.strip() for h in forwarded.decode("latin-1").split(",")]
+        if len(hops) >= TRUSTED_PROXY_COUNT and hops[-TRUSTED_PROXY_COUNT]:
+            return "ip:" + hops[-TRUSTED_PROXY_COUNT]
+
+    client = scope.get("client")
+    return f"ip:{client[0]}" if client else "ip:unknown"
+
+
+# =========================
+# MIDDLEWARE
+# =========================
+async def _reject(send, retry_after: float, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """
+    Plain ASGI middleware so requests are shed before the body is read:
+    FastAPI parses multipart forms (and spools uploads) before any
+    dependency runs, which is too late to protect the worker.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED:
+            return await self.app(scope, receive, send)
+
+        match = find_limit(scope["method"], scope["path"])
+        if match is None:
+            return await self.app(scope, receive, send)
+
+        route, limit = match
+        key = f"{route}|{client_key(scope)}"
+
+        wait = _store.take(key, limit)
+        if wait > 0:
+            return await _reject(send, wait, "Too many requests")
+
+        if not _store.acquire(key, limit):
+            return await _reject(send, 1, "Too many concurrent requests")
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _store.release(key)
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from backend import profiling
+from backend.auth import require_admin
+
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+# =========================
+# REQUEST PROFILES (Admin)
+# =========================
+# Recorded by backend.profiling (X-Profile: 1 or PROFILE_SAMPLE_RATE).
+# Files live on this instance's disk.
+@router.get("/profiles")
+def list_profiles(user=Depends(require_admin)):
+    return [
+        {k: v for k, v in profile.items() if k != "sql"}
+        for profile in map(profiling.load_sql, profiling.list_ids())
+        if profile is not None
+    ]
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, user=Depends(require_admin)):
+    """speedscope file: open it at https://www.speedscope.app"""
+    path = profiling.artifact_path(profile_id, "speedscope")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(
+        path,
+        media_type="application/json",
+        filename=f"{profile_id}.speedscope.json"
+    )
+
+
+@router.get("/profiles/{profile_id}/sql")
+def get_profile_sql(profile_id: str, user=Depends(require_admin)):
+    profile = profiling.load_sql(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
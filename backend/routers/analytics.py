@@ -0,0 +1,71 @@
+from datetime import date, datetime, timedelta
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from backend.database import get_db
+from backend import analytics, schemas
+from backend.auth import get_current_user
+
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+# Longest range one request may read (rows are per day)
+MAX_RANGE_DAYS = 3 * 366
+
+
+def _range(start: date | None, end: date | None) -> tuple[date, date]:
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start is after end")
+    if (end - start).days > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail="Date range too long")
+    return start, end
+
+
+# =========================
+# ANALYTICS (Protected)
+# =========================
+# Read from the daily rollups only (backend/analytics.py), which trail
+# writes by up to ANALYTICS_INTERVAL_SECONDS. Days are UTC, both ends
+# inclusive; the default range is the last 30 days.
+@router.get("/items/top", response_model=List[schemas.TopItem])
+def top_items(
+    start: date | None = None,
+    end: date | None = None,
+    limit: int = Query(10, ge=1, le=100),
+    by: Literal["revenue", "quantity"] = "revenue",
+    db: Session = Depends(get_db),
+    user: str = Depends(get_current_user)
+):
+    start, end = _range(start, end)
+    return analytics.top_items(db, start, end, limit=limit, by=by)
+
+
+@router.get(
+    "/quotations/value",
+    response_model=List[schemas.QuotationValuePoint]
+)
+def quotation_value(
+    start: date | None = None,
+    end: date | None = None,
+    interval: Literal["day", "week", "month"] = "day",
+    db: Session = Depends(get_db),
+    user: str = Depends(get_current_user)
+):
+    start, end = _range(start, end)
+    return analytics.quotation_value(db, start, end, interval=interval)
+
+
+@router.get("/salesmen", response_model=List[schemas.SalesmanTrendPoint])
+def salesman_trends(
+    start: date | None = None,
+    end: date | None = None,
+    interval: Literal["day", "week", "month"] = "week",
+    db: Session = Depends(get_db),
+    user: str = Depends(get_current_user)
+):
+    start, end = _range(start, end)
+    return analytics.salesman_trends(db, start, end, interval=interval)
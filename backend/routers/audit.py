@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List
+
+from backend.database import get_db
+from backend import audit, schemas
+from backend.auth import get_current_user
+
+
+router = APIRouter(prefix="/audit", tags=["Audit"])
+
+
+# =========================
+# WRITER STATS (Protected)
+# =========================
+@router.get("/stats")
+def audit_stats(user: str = Depends(get_current_user)):
+    return audit.audit_writer.stats()
+
+
+# =========================
+# ENTITY HISTORY (Protected)
+# =========================
+# Events are written in the background, so the newest change may take
+# up to AUDIT_FLUSH_SECONDS to show up here.
+@router.get(
+    "/{entity_type}/{entity_id}",
+    response_model=List[schemas.AuditEntry]
+)
+def get_history(
+    entity_type: str,
+    entity_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    before_id: int | None = Query(None, ge=1),
+    db: Session = Depends(get_db),
+    user: str = Depends(get_current_user)
+):
+    if entity_type not in audit.ENTITY_TYPES:
+        raise HTTPException(status_code=404, detail="Unknown entity type")
+
+    return audit.get_history(
+        db, entity_type, entity_id, limit=limit, before_id=before_id
+    )
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List
+
+from backend.database import get_db
+from backend import crud, schemas
+from backend.auth import get_current_user
+
+
+router = APIRouter(prefix="/customers", tags=["Customers"])
+
+
+# =========================
+# AUTOCOMPLETE (Protected)
+# =========================
+# Prefix match on name or phone; declared before /{customer_id}
+@router.get("/autocomplete", response_model=List[schemas.CustomerResponse])
+def autocomplete_customers(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    user: str = Depends(get_current_user)
+):
+    return crud.autocomplete_customers(db, q, limit=limit)
+
+
+# =========================
+# GET BY ID (Protected)
+# =========================
+@router.get("/{customer_id}", response_model=schemas.CustomerResponse)
+def get_customer(
+    customer_id: int,
+    db: Session = Depends(get_db),
+    user: str = Depends(get_current_user)
+):
+    customer = crud.get_customer_by_id(db, customer_id)
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return customer
+
+
+# =========================
+# QUOTATION HISTORY (Protected)
+# =========================
+@router.get(
+    "/{customer_id}/quotations",
+    response_model=schemas.CustomerQuotationsResponse
+)
+def get_customer_quotations(
+    customer_id: int,
+    limit: int = Query(50, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    user: str = Depends(get_current_user)
+):
+    customer = crud.get_customer_by_id(db, customer_id)
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    return {
+        "customer": customer,
+        "limit": limit,
+        "offset": offset,
+        "results": crud.get_customer_quotations(
+            db, customer_id, limit=limit, offset=offset
+        )
+    }
@@ -0,0 +1,123 @@
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    status
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from backend import events, sync, tokens
+from backend.auth import (
+    authenticate,
+    credentials_exception,
+    decode_access_token,
+    get_current_user,
+    oauth2_scheme
+)
+from backend.database import SessionLocal, get_db
+
+
+router = APIRouter(tags=["Events"])
+
+
+def _authenticate(token: str | None, ticket: str | None) -> tuple:
+    """
+    The user's tenant, its current change sequence and the access
+    token's claims (the stream ends with that token).
+    """
+    # Own short-lived session: a stream must not hold a pooled
+    # connection (get_db would keep one for the whole stream)
+    db = SessionLocal()
+    try:
+        if ticket:
+            try:
+                payload = tokens.redeem_stream_ticket(db, ticket)
+            except tokens.InvalidStreamTicket:
+                raise credentials_exception()
+        else:
+            payload = decode_access_token(db, token)
+
+        tenant_id = authenticate(db, payload).tenant_id
+        return tenant_id, sync.current_watermark(db, tenant_id), payload
+    finally:
+        db.close()
+
+
+def _is_revoked(jti: str) -> bool:
+    # In-memory denylist; it reads the database at most every
+    # REVOCATION_CHECK_SECONDS
+    db = SessionLocal()
+    try:
+        return tokens.denylist.is_revoked(db, jti)
+    finally:
+        db.close()
+
+
+# =========================
+# CHANGE FEED (Protected, SSE)
+# =========================
+# Events: `change` {"entity", "id", "action"}, `reset` (refetch all) and
+# `expired` (the access token expired or was revoked: the stream ends),
+# for the caller's tenant only.
+# EventSource can't send headers: get a ticket from POST /events/ticket
+# and pass ?ticket=... Access tokens never go in the URL (it is logged).
+@router.post("/events/ticket")
+def stream_ticket(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    payload = decode_access_token(db, token)
+    authenticate(db, payload)
+    return tokens.issue_stream_ticket(payload)
+
+
+@router.get("/events")
+async def stream_events(
+    request: Request,
+    authorization: str | None = Header(None),
+    ticket: str | None = Query(None),
+    last_event_id: str | None = Header(None),
+    last_id: str | None = Query(None, alias="lastEventId")
+):
+    token = None
+    if authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not (token or ticket):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    tenant_id, current_seq, payload = await run_in_threadpool(
+        _authenticate, token, ticket
+    )
+
+    async def is_revoked():
+        return await run_in_threadpool(_is_revoked, payload["jti"])
+
+    return StreamingResponse(
+        events.stream(
+            last_event_id or last_id,
+            request.is_disconnected,
+            tenant_id,
+            current_seq,
+            expires_at=payload["exp"],
+            is_revoked=is_revoked
+        ),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Render / nginx: don't buffer the stream
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
+@router.get("/events/stats")
+def event_stats(user: str = Depends(get_current_user)):
+    return events.broker.stats()
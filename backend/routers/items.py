@@ -4,16 +4,24 @@ from fastapi import (
     UploadFile,
     File,
     Form,
-    HTTPException
+    Header,
+    HTTPException,
+    Response
 )
 from sqlalchemy.orm import Session
 
 from backend.database import get_db
 from backend import crud, schemas
+from backend.concurrency import (
+    VersionConflict,
+    parse_if_match,
+    precondition_failed,
+    set_etag
+)
 from backend.auth import get_current_user   # ✅ PROTECTION
+from backend.item_cache import item_catalog
 
-import cloudinary.uploader
-import backend.cloudinary_config
+from backend.cloudinary_config import get_uploader
 
 
 router = APIRouter(
@@ -28,7 +36,10 @@ router = APIRouter(
 @router.post("/", response_model=schemas.Item)
 def create_item(
     name: str = Form(...),
-    unit_price: float = Form(...),
+    unit_price: float = Form(
+        ..., allow_inf_nan=False,
+        ge=-schemas.MONEY_LIMIT, le=schemas.MONEY_LIMIT
+    ),
     image: UploadFile | None = File(None),
     db: Session = Depends(get_db),
     user: str = Depends(get_current_user)     # ✅ TOKEN REQUIRED
@@ -37,7 +48,7 @@ def create_item(
 
     if image:
         try:
-            result = cloudinary.uploader.upload(
+            result = get_uploader().upload(
                 image.file,
                 folder="quotation/items"
             )
@@ -67,18 +78,31 @@ def get_items(
     return crud.get_items(db)
 
 
+# =========================
+# CATALOG CACHE STATS (PROTECTED)
+# =========================
+@router.get("/cache-stats")
+def get_cache_stats(
+    user: str = Depends(get_current_user)      # ✅ TOKEN REQUIRED
+):
+    return item_catalog.stats(user.tenant_id)
+
+
 # =========================
 # GET SINGLE ITEM (PROTECTED)
 # =========================
 @router.get("/{item_id}", response_model=schemas.Item)
 def get_item(
     item_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     user: str = Depends(get_current_user)      # ✅ TOKEN REQUIRED
 ):
-    item = crud.get_item_by_id(db, item_id)
+    # Database row, not the catalog: the ETag must be current
+    item = crud.get_item_by_id(db, item_id, cached=False)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
+    set_etag(response, item.version)
     return item
 
 
@@ -88,17 +112,30 @@ def get_item(
 @router.patch("/{item_id}", response_model=schemas.Item)
 def update_item(
     item_id: int,
+    response: Response,
     name: str | None = Form(None),
-    unit_price: float | None = Form(None),
+    unit_price: float | None = Form(
+        None, allow_inf_nan=False,
+        ge=-schemas.MONEY_LIMIT, le=schemas.MONEY_LIMIT
+    ),
     image: UploadFile | None = File(None),
+    if_match: str | None = Header(None),
     db: Session = Depends(get_db),
     user: str = Depends(get_current_user)      # ✅ TOKEN REQUIRED
 ):
+    expected_version = parse_if_match(if_match)
+
+    # Fail before uploading anything if the client is already stale
+    if expected_version is not None:
+        current = crud.get_item_by_id(db, item_id, cached=False)
+        if current and current.version != expected_version:
+            raise precondition_failed()
+
     image_url = None
 
     if image:
         try:
-            result = cloudinary.uploader.upload(
+            result = get_uploader().upload(
                 image.file,
                 folder="quotation/items"
             )
@@ -109,19 +146,24 @@ def update_item(
                 detail=f"Cloudinary upload failed: {e}"
             )
 
-    item = crud.update_item(
-        db=db,
-        item_id=item_id,
-        item_data=schemas.ItemUpdate(
-            name=name,
-            unit_price=unit_price
-        ),
-        image=image_url
-    )
+    try:
+        item = crud.update_item(
+            db=db,
+            item_id=item_id,
+            item_data=schemas.ItemUpdate(
+                name=name,
+                unit_price=unit_price
+            ),
+            image=image_url,
+            expected_version=expected_version
+        )
+    except VersionConflict:
+        raise precondition_failed()
 
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
+    set_etag(response, item.version)
     return item
 
 
@@ -1,21 +1,33 @@
 from fastapi import (
     APIRouter,
     Depends,
-    UploadFile,
-    File,
-    Form,
-    HTTPException
+    Header,
+    HTTPException,
+    Query,
+    Response
 )
 from sqlalchemy.orm import Session
-import json
+from starlette.datastructures import FormData
 from typing import List, Dict
 
-import cloudinary.uploader
-import backend.cloudinary_config
+from backend.cloudinary_config import get_uploader
 
 from backend.database import get_db
-from backend import crud, schemas
-from backend.auth import get_current_user
+from backend import crud, schemas, search
+from backend.money import line_total
+from backend.auth import get_current_user, require_admin
+from backend.concurrency import (
+    VersionConflict,
+    parse_if_match,
+    precondition_failed,
+    set_etag
+)
+from backend.uploads import (
+    QUOTATION_FORM_OPENAPI,
+    form_images,
+    form_payload,
+    quotation_form
+)
 
 
 router = APIRouter(prefix="/quotations", tags=["Quotations"])
@@ -24,17 +36,20 @@ router = APIRouter(prefix="/quotations", tags=["Quotations"])
 # =========================
 # CREATE QUOTATION  (Protected)
 # =========================
-@router.post("/", response_model=schemas.QuotationResponse)
+# Body is parsed by quotation_form (size/count limits, 413 early).
+# `user` comes first so unauthenticated uploads are never read.
+@router.post(
+    "/",
+    response_model=schemas.QuotationResponse,
+    openapi_extra=QUOTATION_FORM_OPENAPI
+)
 def create_quotation(
-    data: str = Form(...),
-    images: List[UploadFile] | None = File(None),
-    db: Session = Depends(get_db),
-    user: str = Depends(get_current_user)
+    user: str = Depends(get_current_user),
+    form: FormData = Depends(quotation_form),
+    db: Session = Depends(get_db)
 ):
-    try:
-        payload = schemas.QuotationCreate(**json.loads(data))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid data JSON: {e}")
+    payload = form_payload(form, schemas.QuotationCreate)
+    images = form_images(form)
 
     image_map: Dict[int, str] = {}
     image_index = 0
@@ -47,7 +62,7 @@ def create_quotation(
                     break  # prevent IndexError
 
                 try:
-                    result = cloudinary.uploader.upload(
+                    result = get_uploader().upload(
                         images[image_index].file,
                         folder="quotation/items",
                         timeout=30
@@ -63,7 +78,7 @@ def create_quotation(
     # Calculate totals
     for item in payload.items:
         if item.total is None:
-            item.total = item.qty * item.price
+            item.total = line_total(item.qty, item.price)
 
     try:
         return crud.create_quotation(db, payload, image_map)
@@ -72,18 +87,51 @@ def create_quotation(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# =========================
+# BULK CREATE (Protected)
+# =========================
+# Offline devices upload their queue in one request. JSON only: new
+# items are created by name without images.
+@router.post("/bulk", response_model=schemas.QuotationBulkResponse)
+def bulk_create_quotations(
+    body: schemas.QuotationBulkCreate,
+    db: Session = Depends(get_db),
+    user: str = Depends(get_current_user)
+):
+    try:
+        results = crud.bulk_create_quotations(db, body.quotations)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"results": results}
+
+
 # =========================
 # UPDATE (Protected)
 # =========================
-@router.patch("/{quotation_id}", response_model=schemas.QuotationResponse)
+@router.patch(
+    "/{quotation_id}",
+    response_model=schemas.QuotationResponse,
+    openapi_extra=QUOTATION_FORM_OPENAPI
+)
 def update_quotation(
     quotation_id: int,
-    data: str = Form(...),
-    images: List[UploadFile] | None = File(None),
-    db: Session = Depends(get_db),
-    user: str = Depends(get_current_user)
+    response: Response,
+    if_match: str | None = Header(None),
+    user: str = Depends(get_current_user),
+    form: FormData = Depends(quotation_form),
+    db: Session = Depends(get_db)
 ):
-    payload = schemas.QuotationUpdate(**json.loads(data))
+    payload = form_payload(form, schemas.QuotationUpdate)
+    images = form_images(form)
+    expected_version = parse_if_match(if_match)
+
+    # Fail before uploading anything if the client is already stale
+    if expected_version is not None:
+        current = crud.get_quotation_by_id(db, quotation_id)
+        if current and current.version != expected_version:
+            raise precondition_failed()
 
     image_map: Dict[int, str] = {}
     image_index = 0
@@ -91,21 +139,63 @@ def update_quotation(
     if images and payload.items:
         for idx, item in enumerate(payload.items):
             if not item.item_id:
-                result = cloudinary.uploader.upload(
+                result = get_uploader().upload(
                     images[image_index].file,
                     folder="quotation/items"
                 )
                 image_map[idx] = result["secure_url"]
                 image_index += 1
 
-    quotation = crud.update_quotation(db, quotation_id, payload, image_map)
+    try:
+        quotation = crud.update_quotation(
+            db, quotation_id, payload, image_map,
+            expected_version=expected_version
+        )
+    except VersionConflict:
+        raise precondition_failed()
 
     if not quotation:
         raise HTTPException(status_code=404, detail="Quotation not found")
 
+    set_etag(response, quotation.version)
     return quotation
 
 
+# =========================
+# BULK REPRICE (Admin)
+# =========================
+# Rewrites lines across every quotation of the tenant
+@router.post("/reprice", response_model=schemas.RepriceResponse)
+def reprice_quotations(
+    request: schemas.RepriceRequest,
+    db: Session = Depends(get_db),
+    user: str = Depends(require_admin)
+):
+    results = crud.reprice_items(db, request)
+    return {"dry_run": request.dry_run, "results": results}
+
+
+# =========================
+# CLONE (Protected)
+# =========================
+@router.post(
+    "/{quotation_id}/clone",
+    response_model=schemas.QuotationResponse
+)
+def clone_quotation(
+    quotation_id: int,
+    overrides: schemas.QuotationClone | None = None,
+    db: Session = Depends(get_db),
+    user: str = Depends(get_current_user)
+):
+    new_id = crud.clone_quotation(
+        db, quotation_id, overrides or schemas.QuotationClone()
+    )
+    if new_id is None:
+        raise HTTPException(status_code=404, detail="Quotation not found")
+    return crud.get_quotation_by_id(db, new_id)
+
+
 # =========================
 # GET ALL (Protected)
 # =========================
@@ -117,18 +207,70 @@ def get_quotations(
     return crud.get_quotations(db)
 
 
+# =========================
+# SEARCH (Protected)
+# =========================
+# Declared before /{quotation_id} so "search" isn't parsed as an id
+@router.get("/search", response_model=schemas.QuotationSearchResponse)
+def search_quotations(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    user: str = Depends(get_current_user)
+):
+    ids = search.search_quotation_ids(db, q, limit=limit, offset=offset)
+    found = crud.get_quotations_by_ids(db, ids)
+
+    return {
+        "query": q,
+        "limit": limit,
+        "offset": offset,
+        "results": [found[i] for i in ids if i in found]
+    }
+
+
+# =========================
+# BATCH GET (Protected)
+# =========================
+@router.post("/batch-get", response_model=schemas.QuotationBatchResponse)
+def batch_get_quotations(
+    body: schemas.QuotationBatchGet,
+    db: Session = Depends(get_db),
+    user: str = Depends(get_current_user)
+):
+    found = crud.get_quotations_by_ids(db, body.ids)
+
+    # Same order as requested; unknown ids get found=false
+    return {
+        "results": [
+            {
+                "id": quotation_id,
+                "found": quotation_id in found,
+                "quotation": found.get(quotation_id)
+            }
+            for quotation_id in body.ids
+        ]
+    }
+
+
 # =========================
 # GET BY ID (Protected)
 # =========================
 @router.get("/{quotation_id}", response_model=schemas.QuotationResponse)
 def get_quotation(
     quotation_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     user: str = Depends(get_current_user)
 ):
     quotation = crud.get_quotation_by_id(db, quotation_id)
+    if not quotation:
+        # Old quotations live in the archive tables
+        quotation = crud.get_archived_quotation_by_id(db, quotation_id)
     if not quotation:
         raise HTTPException(status_code=404, detail="Quotation not found")
+    set_etag(response, quotation.version)
     return quotation
 
 
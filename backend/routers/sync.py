@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from backend.database import get_db
+from backend import crud, models, schemas, sync
+from backend.auth import get_current_user
+
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+
+# =========================
+# DELTA SYNC (Protected)
+# =========================
+# Offline clients: GET /sync, then keep calling with ?since=<next>
+# until has_more is false; store that last `next` as the watermark.
+@router.get("/", response_model=schemas.SyncResponse)
+def get_changes(
+    since: str | None = Query(None, max_length=64),
+    limit: int = Query(500, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    user: str = Depends(get_current_user)
+):
+    try:
+        page = sync.get_changes(db, since, limit=limit)
+    except sync.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if page["reset"]:
+        return {"reset": True}
+
+    items = []
+    if page["item_ids"]:
+        items = db.query(models.ItemMaster).filter(
+            models.ItemMaster.id.in_(page["item_ids"])
+        ).all()
+
+    found = crud.get_quotations_by_ids(db, page["quotation_ids"])
+
+    return {
+        "has_more": page["has_more"],
+        "next": page["next"],
+        "items": items,
+        "quotations": [
+            found[i] for i in page["quotation_ids"] if i in found
+        ],
+        "deleted": page["deleted"],
+    }
@@ -1,6 +1,20 @@
-from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime
+from pydantic import BaseModel, Field, model_validator
+from typing import Annotated, List, Optional
+from datetime import date, datetime
+
+from backend.money import MAX_MONEY
+
+
+# =========================
+# MONEY INPUTS
+# =========================
+# Finite and within NUMERIC(12, 2): NaN/Infinity or 1e15 are a 422 here,
+# not a 500 from quantize() or the database.
+MONEY_LIMIT = float(MAX_MONEY)
+
+Money = Annotated[
+    float, Field(allow_inf_nan=False, ge=-MONEY_LIMIT, le=MONEY_LIMIT)
+]
 
 
 # =========================
@@ -8,7 +22,7 @@ from datetime import datetime
 # =========================
 class ItemBase(BaseModel):
     name: str
-    unit_price: float
+    unit_price: Money
 
 
 class ItemCreate(ItemBase):
@@ -17,12 +31,13 @@ class ItemCreate(ItemBase):
 
 class ItemUpdate(BaseModel):
     name: Optional[str] = None
-    unit_price: Optional[float] = None
+    unit_price: Optional[Money] = None
 
 
 class Item(ItemBase):
     id: int
     image: Optional[str] = None
+    version: int
 
     model_config = {
         "from_attributes": True
@@ -36,10 +51,17 @@ class QuotationItemAuto(BaseModel):
     item_id: Optional[int] = None
     item_name: Optional[str] = None
     qty: int
-    price: float
-    total: Optional[float] = None
+    price: Money
+    total: Optional[Money] = None
     replace_image: Optional[bool] = False
 
+    @model_validator(mode="after")
+    def total_fits(self):
+        # The computed qty * price has to fit the column as well
+        if self.total is None and abs(self.qty * self.price) > MONEY_LIMIT:
+            raise ValueError("Line total is out of range")
+        return self
+
 
 # =========================
 # QUOTATION CREATE
@@ -48,10 +70,39 @@ class QuotationCreate(BaseModel):
     customer_name: str
     customer_phone: Optional[str] = None
     salesman_name: str
-    tax: float = 0
+    tax: Money = 0
     items: List[QuotationItemAuto]
 
 
+# =========================
+# BULK CREATE (offline upload)
+# =========================
+MAX_BULK_QUOTATIONS = 200
+
+
+class QuotationBulkEntry(QuotationCreate):
+    # Generated on the device; resending the same id never duplicates
+    client_id: str = Field(..., min_length=1, max_length=64)
+
+
+class QuotationBulkCreate(BaseModel):
+    quotations: List[QuotationBulkEntry] = Field(
+        ..., max_length=MAX_BULK_QUOTATIONS
+    )
+
+
+class QuotationBulkResult(BaseModel):
+    client_id: str
+    status: str  # created | existing | invalid
+    id: Optional[int] = None
+    quote_no: Optional[str] = None
+    error: Optional[str] = None
+
+
+class QuotationBulkResponse(BaseModel):
+    results: List[QuotationBulkResult]
+
+
 # =========================
 # QUOTATION UPDATE
 # =========================
@@ -59,10 +110,20 @@ class QuotationUpdate(BaseModel):
     customer_name: Optional[str] = None
     customer_phone: Optional[str] = None
     salesman_name: Optional[str] = None
-    tax: Optional[float] = None
+    tax: Optional[Money] = None
     items: Optional[List[QuotationItemAuto]] = None
 
 
+# =========================
+# QUOTATION CLONE (header overrides)
+# =========================
+class QuotationClone(BaseModel):
+    customer_name: Optional[str] = None
+    customer_phone: Optional[str] = None
+    salesman_name: Optional[str] = None
+    tax: Optional[Money] = None
+
+
 # =========================
 # RESPONSE SCHEMAS
 # =========================
@@ -81,11 +142,15 @@ class QuotationItemResponse(BaseModel):
 class QuotationResponse(BaseModel):
     id: int
     quote_no: str
+    customer_id: Optional[int] = None
     customer_name: str
     customer_phone: Optional[str]
     salesman_name: str
     tax: float
     created_at: datetime
+    version: int
+    archived: bool = False
+    subtotal: float
     items: List[QuotationItemResponse]
 
     model_config = {
@@ -93,6 +158,158 @@ class QuotationResponse(BaseModel):
     }
 
 
+# =========================
+# BULK REPRICING
+# =========================
+class ItemPriceChange(BaseModel):
+    item_id: int
+    new_price: Money
+    # Only lines still at this price are repriced (None → any other price)
+    old_price: Optional[Money] = None
+
+
+class RepriceFilter(BaseModel):
+    quotation_ids: Optional[List[int]] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    salesman_name: Optional[str] = None
+
+
+class RepriceRequest(BaseModel):
+    changes: List[ItemPriceChange] = Field(..., min_length=1, max_length=500)
+    filter: RepriceFilter = RepriceFilter()
+    dry_run: bool = False
+    batch_size: int = Field(500, ge=1, le=5000)
+
+
+class RepriceResult(BaseModel):
+    item_id: int
+    new_price: float
+    lines: int
+    quotations: int
+    amount_delta: float
+
+
+class RepriceResponse(BaseModel):
+    dry_run: bool
+    results: List[RepriceResult]
+
+
+# =========================
+# SEARCH
+# =========================
+class QuotationSearchResponse(BaseModel):
+    query: str
+    limit: int
+    offset: int
+    results: List[QuotationResponse]
+
+
+# =========================
+# BATCH GET
+# =========================
+MAX_BATCH_GET = 100
+
+
+class QuotationBatchGet(BaseModel):
+    ids: List[int] = Field(..., max_length=MAX_BATCH_GET)
+
+
+class QuotationBatchResult(BaseModel):
+    id: int
+    found: bool
+    quotation: Optional[QuotationResponse] = None
+
+
+class QuotationBatchResponse(BaseModel):
+    results: List[QuotationBatchResult]
+
+
+# =========================
+# CUSTOMERS
+# =========================
+class CustomerResponse(BaseModel):
+    id: int
+    name: str
+    phone: Optional[str]
+    created_at: datetime
+
+    model_config = {
+        "from_attributes": True
+    }
+
+
+class CustomerQuotationsResponse(BaseModel):
+    customer: CustomerResponse
+    limit: int
+    offset: int
+    results: List[QuotationResponse]
+
+
+# =========================
+# SYNC
+# =========================
+class SyncTombstone(BaseModel):
+    entity: str
+    id: int
+
+
+class SyncResponse(BaseModel):
+    # True → the watermark is too old; drop local data and sync from scratch
+    reset: bool = False
+    has_more: bool = False
+    # Pass back as ?since= (store it once has_more is false)
+    next: Optional[str] = None
+    items: List[Item] = []
+    quotations: List[QuotationResponse] = []
+    deleted: List[SyncTombstone] = []
+
+
+# =========================
+# AUDIT LOG
+# =========================
+class AuditEntry(BaseModel):
+    id: int
+    entity_type: str
+    entity_id: int
+    action: str
+    actor_id: Optional[int]
+    changes: Optional[dict]
+    created_at: datetime
+
+    model_config = {
+        "from_attributes": True
+    }
+
+
+# =========================
+# ANALYTICS
+# =========================
+class TopItem(BaseModel):
+    item_id: int
+    name: Optional[str]
+    quantity: int
+    revenue: float
+    quotations: int
+
+
+class QuotationValuePoint(BaseModel):
+    period: date
+    quotations: int
+    subtotal: float
+    average: float
+
+
+class SalesmanTrendPoint(BaseModel):
+    period: date
+    salesman_name: str
+    quotations: int
+    subtotal: float
+    average: float
+    # Distinct customers; daily points only
+    customers: Optional[int]
+
+
 class UserCreate(BaseModel):
     username: str
     password: str
@@ -100,8 +317,13 @@ class UserCreate(BaseModel):
 
 class UserResponse(BaseModel):
     id: int
+    tenant_id: int
     username: str
 
     model_config = {
         "from_attributes": True
     }
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
@@ -0,0 +1,203 @@
+import re
+
+from sqlalchemy import DDL, bindparam, event, or_, text
+from sqlalchemy.orm import Session
+
+from backend import models
+from backend.database import TENANT_KEY
+
+
+# =========================
+# SCHEMA
+# =========================
+# Postgres: tsvector column on quotations + GIN index.
+# SQLite:   FTS5 table keyed by quotation id (rowid).
+# Both are created on metadata.create_all and by the Alembic migration.
+PG_SEARCH_DDL = [
+    "ALTER TABLE quotations ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE INDEX IF NOT EXISTS ix_quotations_search_vector "
+    "ON quotations USING gin (search_vector)",
+]
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS quotations_fts USING fts5("
+    "quote_no, customer_name, customer_phone, salesman_name, item_names)",
+]
+
+for statement in PG_SEARCH_DDL:
+    event.listen(
+        models.Quotation.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="postgresql")
+    )
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(
+        models.Quotation.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="sqlite")
+    )
+
+
+# =========================
+# INDEX MAINTENANCE
+# =========================
+# Item names are pulled with SQL so the document is right even after
+# update_quotation's bulk delete + reinsert of lines.
+PG_REINDEX = """
+UPDATE quotations AS q SET search_vector =
+    setweight(to_tsvector('simple', coalesce(q.quote_no, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(q.customer_name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(q.customer_phone, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(q.salesman_name, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce((
+        SELECT string_agg(im.name, ' ')
+        FROM quotation_items qi
+        JOIN item_master im ON im.id = qi.item_id
+        WHERE qi.quotation_id = q.id
+    ), '')), 'C')
+WHERE q.id IN ({ids})
+"""
+
+SQLITE_DELETE = "DELETE FROM quotations_fts WHERE rowid IN ({ids})"
+
+SQLITE_INSERT = """
+INSERT INTO quotations_fts (
+    rowid, quote_no, customer_name, customer_phone, salesman_name, item_names
+)
+SELECT
+    q.id,
+    coalesce(q.quote_no, ''),
+    q.customer_name,
+    coalesce(q.customer_phone, ''),
+    q.salesman_name,
+    coalesce((
+        SELECT group_concat(im.name, ' ')
+        FROM quotation_items qi
+        JOIN item_master im ON im.id = qi.item_id
+        WHERE qi.quotation_id = q.id
+    ), '')
+FROM quotations q
+WHERE q.id IN ({ids})
+"""
+
+IDS_BY_ID = ":quotation_id"
+IDS_BY_ITEM = (
+    "SELECT quotation_id FROM quotation_items WHERE item_id = :item_id"
+)
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def _reindex(db: Session, ids_sql: str, params: dict):
+    db.flush()
+    dialect = _dialect(db)
+
+    if dialect == "postgresql":
+        db.execute(text(PG_REINDEX.format(ids=ids_sql)), params)
+
+    elif dialect == "sqlite":
+        db.execute(text(SQLITE_DELETE.format(ids=ids_sql)), params)
+        db.execute(text(SQLITE_INSERT.format(ids=ids_sql)), params)
+
+
+def index_quotation(db: Session, quotation_id: int):
+    """Refresh one quotation's search document (call before commit)."""
+    _reindex(db, IDS_BY_ID, {"quotation_id": quotation_id})
+
+
+def index_quotations(db: Session, quotation_ids: list[int]):
+    """Same as index_quotation for many rows in one pass."""
+    if quotation_ids:
+        ids_sql = ", ".join(str(int(i)) for i in quotation_ids)
+        _reindex(db, ids_sql, {})
+
+
+def reindex_item_quotations(db: Session, item_id: int):
+    """An item was renamed → refresh every quotation that uses it."""
+    _reindex(db, IDS_BY_ITEM, {"item_id": item_id})
+
+
+def remove_quotations(db: Session, quotation_ids: list[int]):
+    # Postgres keeps the vector on the row itself, nothing to do
+    if not quotation_ids or _dialect(db) != "sqlite":
+        return
+    db.execute(
+        text("DELETE FROM quotations_fts WHERE rowid IN :ids").bindparams(
+            bindparam("ids", expanding=True)
+        ),
+        {"ids": list(quotation_ids)}
+    )
+
+
+# =========================
+# QUERY
+# =========================
+def _terms(query: str) -> list[str]:
+    return re.findall(r"\w+", query.lower())
+
+
+def search_quotation_ids(
+    db: Session,
+    query: str,
+    limit: int = 20,
+    offset: int = 0
+) -> list[int]:
+    """Quotation ids best match first (prefix match on every term)."""
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    dialect = _dialect(db)
+    params = {"limit": limit, "offset": offset}
+
+    # Raw SQL: the ORM tenant filter doesn't apply, add it here
+    tenant_id = db.info.get(TENANT_KEY)
+    tenant_sql = ""
+    if tenant_id is not None:
+        params["tenant_id"] = tenant_id
+        tenant_sql = "AND tenant_id = :tenant_id"
+
+    if dialect == "postgresql":
+        params["q"] = " & ".join(f"{t}:*" for t in terms)
+        rows = db.execute(text(f"""
+            SELECT id FROM quotations,
+                   to_tsquery('simple', :q) AS query
+            WHERE search_vector @@ query AND deleted_at IS NULL
+            {tenant_sql}
+            ORDER BY ts_rank(search_vector, query) DESC, id DESC
+            LIMIT :limit OFFSET :offset
+        """), params)
+        return [row[0] for row in rows]
+
+    if dialect == "sqlite":
+        params["q"] = " ".join(f'"{t}"*' for t in terms)
+        tenant_join = ""
+        if tenant_sql:
+            tenant_join = (
+                "JOIN quotations ON quotations.id = quotations_fts.rowid"
+            )
+        rows = db.execute(text(f"""
+            SELECT quotations_fts.rowid FROM quotations_fts
+            {tenant_join}
+            WHERE quotations_fts MATCH :q
+            {tenant_sql}
+            ORDER BY quotations_fts.rank, quotations_fts.rowid DESC
+            LIMIT :limit OFFSET :offset
+        """), params)
+        return [row[0] for row in rows]
+
+    # Other databases: unindexed substring match on the header only
+    q = db.query(models.Quotation.id)
+    for term in terms:
+        pattern = f"%{term}%"
+        q = q.filter(or_(
+            models.Quotation.quote_no.ilike(pattern),
+            models.Quotation.customer_name.ilike(pattern),
+            models.Quotation.customer_phone.ilike(pattern),
+            models.Quotation.salesman_name.ilike(pattern)
+        ))
+    rows = q.order_by(models.Quotation.id.desc()).limit(limit).offset(offset)
+    return [row[0] for row in rows]
@@ -0,0 +1,318 @@
+from datetime import datetime
+
+from sqlalchemy import event, insert, inspect, select, text, tuple_, update
+from sqlalchemy.orm import Session
+
+from backend import models
+from backend.database import TENANT_KEY, SessionLocal
+
+
+# =========================
+# CHANGE SEQUENCE
+# =========================
+# One counter per tenant (cache_versions row "change_seq:<tenant_id>")
+# bumped inside the writing transaction. The row lock is held until
+# commit, so a tenant's sequence numbers become visible in commit order:
+# once a reader sees N, nothing below N can still appear. Every row of a
+# tenant written in one flush shares its number. (A database sequence
+# hands numbers out in start order, not commit order, so a reader could
+# move past a slower transaction's rows.)
+#
+# Lock order: a writer takes its counter row before any other
+# cache_versions row (the item cache version, see crud), and a flush
+# spanning tenants takes their counters by tenant id.
+SEQ_NAME = "change_seq"
+# Lowest watermark that can still be served (tombstones below are gone)
+HORIZON_NAME = "sync_horizon"
+
+# Stream order within one sequence number
+ITEM, QUOTATION, TOMBSTONE = 0, 1, 2
+
+
+def _read_counter(conn, name: str) -> int | None:
+    return conn.execute(
+        text("SELECT version FROM cache_versions WHERE name = :name"),
+        {"name": name}
+    ).scalar()
+
+
+def counter_name(name: str, tenant_id: int) -> str:
+    return f"{name}:{tenant_id}"
+
+
+def _tenant(db: Session, tenant_id: int | None) -> int:
+    if tenant_id is None:
+        tenant_id = db.info.get(TENANT_KEY)
+    if tenant_id is None:
+        raise ValueError("Change sequence needs a tenant")
+    return tenant_id
+
+
+def next_change_seq(db: Session, tenant_id: int | None = None) -> int:
+    """Defaults to the session's tenant."""
+    name = counter_name(SEQ_NAME, _tenant(db, tenant_id))
+    conn = db.connection()
+    result = conn.execute(
+        text(
+            "UPDATE cache_versions SET version = version + 1 "
+            "WHERE name = :name"
+        ),
+        {"name": name}
+    )
+    if result.rowcount == 0:
+        conn.execute(
+            text("INSERT INTO cache_versions (name, version) VALUES (:name, 1)"),
+            {"name": name}
+        )
+        return 1
+    return _read_counter(conn, name)
+
+
+def raise_horizon(db: Session, tenant_id: int, seq: int):
+    name = counter_name(HORIZON_NAME, tenant_id)
+    conn = db.connection()
+    result = conn.execute(
+        text(
+            "UPDATE cache_versions SET version = :seq "
+            "WHERE name = :name AND version < :seq"
+        ),
+        {"name": name, "seq": seq}
+    )
+    if result.rowcount == 0 and _read_counter(conn, name) is None:
+        conn.execute(
+            text("INSERT INTO cache_versions (name, version) VALUES (:name, :seq)"),
+            {"name": name, "seq": seq}
+        )
+
+
+def add_tombstones(
+    db: Session,
+    entity_type: str,
+    rows: list[tuple[int, int]],
+    seq: int
+):
+    """rows: (entity_id, tenant_id) pairs."""
+    if not rows:
+        return
+    now = datetime.utcnow()
+    db.connection().execute(
+        insert(models.SyncTombstone),
+        [
+            {
+                "tenant_id": tenant_id,
+                "entity_type": entity_type,
+                "entity_id": entity_id,
+                "change_seq": seq,
+                "deleted_at": now,
+            }
+            for entity_id, tenant_id in rows
+        ]
+    )
+
+
+def _line_quotation_id(line):
+    if line.quotation_id is not None:
+        return line.quotation_id
+    return line.quotation.id if line.quotation is not None else None
+
+
+def _soft_deleted(obj) -> bool:
+    history = inspect(obj).attrs.deleted_at.history
+    return bool(history.added) and history.added[0] is not None
+
+
+def _header_tenants(db: Session, ids: set[int]) -> dict[int, int]:
+    tenant_id = db.info.get(TENANT_KEY)
+    if tenant_id is not None:
+        return dict.fromkeys(ids, tenant_id)
+    # Job session (no tenant): look the headers up
+    table = models.Quotation.__table__
+    return dict(db.connection().execute(
+        select(table.c.id, table.c.tenant_id).where(table.c.id.in_(ids))
+    ).all())
+
+
+def _before_flush(db: Session, flush_context, instances):
+    touched = []
+    deleted_items = []
+    line_quotation_ids = set()
+
+    for obj in db.new:
+        if isinstance(obj, (models.ItemMaster, models.Quotation)):
+            touched.append(obj)
+        elif isinstance(obj, models.QuotationItem):
+            line_quotation_ids.add(_line_quotation_id(obj))
+
+    for obj in db.dirty:
+        if isinstance(obj, (models.ItemMaster, models.Quotation)):
+            if db.is_modified(obj, include_collections=False):
+                touched.append(obj)
+        elif isinstance(obj, models.QuotationItem):
+            line_quotation_ids.add(_line_quotation_id(obj))
+
+    for obj in db.deleted:
+        if isinstance(obj, models.ItemMaster):
+            deleted_items.append((obj.id, obj.tenant_id))
+        elif isinstance(obj, models.QuotationItem):
+            line_quotation_ids.add(_line_quotation_id(obj))
+
+    if not (touched or deleted_items or line_quotation_ids):
+        return
+
+    # New rows may not be stamped yet (tenancy's hook can run after this)
+    session_tenant = db.info.get(TENANT_KEY)
+
+    def tenant_of(obj):
+        return obj.tenant_id if obj.tenant_id is not None else session_tenant
+
+    # Lines changed without the header: bump the header directly so the
+    # row version (optimistic lock) is left alone
+    header_ids = line_quotation_ids - {
+        obj.id for obj in touched if isinstance(obj, models.Quotation)
+    }
+    header_ids.discard(None)
+    header_tenants = _header_tenants(db, header_ids) if header_ids else {}
+
+    tenants = {tenant_of(obj) for obj in touched}
+    tenants.update(tenant_id for _, tenant_id in deleted_items)
+    tenants.update(header_tenants.values())
+    # No tenant anywhere: the insert fails on tenant_id anyway
+    tenants.discard(None)
+    seqs = {
+        tenant_id: next_change_seq(db, tenant_id)
+        for tenant_id in sorted(tenants)
+    }
+
+    for obj in touched:
+        obj.change_seq = seqs.get(tenant_of(obj))
+
+    for tenant_id, seq in seqs.items():
+        ids = [i for i, t in header_tenants.items() if t == tenant_id]
+        if ids:
+            db.connection().execute(
+                update(models.Quotation)
+                .where(models.Quotation.id.in_(ids))
+                .values(change_seq=seq)
+            )
+
+        add_tombstones(db, "item", [
+            row for row in deleted_items if row[1] == tenant_id
+        ], seq)
+        add_tombstones(db, "quotation", [
+            (obj.id, obj.tenant_id) for obj in touched
+            if isinstance(obj, models.Quotation)
+            and obj.tenant_id == tenant_id and _soft_deleted(obj)
+        ], seq)
+
+
+event.listen(SessionLocal, "before_flush", _before_flush)
+
+
+# =========================
+# QUERY (GET /sync)
+# =========================
+# Cursor: "<seq>" once caught up, "<seq>:<kind>:<id>:<base>" mid-run.
+# Paging is keyset on (change_seq, kind, id) so a page may end in the
+# middle of one sequence number without skipping or repeating rows.
+# <base> is the watermark the run started from ("" for a full sync):
+# only that is checked against the horizon.
+class InvalidCursor(ValueError):
+    pass
+
+
+def parse_cursor(
+    cursor: str | None
+) -> tuple[tuple[int, int, int], int | None]:
+    """Returns ((seq, kind, id), base watermark or None for full sync)."""
+    if not cursor:
+        return (0, TOMBSTONE, 0), None
+    parts = cursor.split(":")
+    try:
+        if len(parts) == 1:
+            # Plain watermark: everything at this seq was already seen
+            seq = int(parts[0])
+            return (seq, TOMBSTONE, 2 ** 63 - 1), seq
+        if len(parts) == 4:
+            seq, kind, row_id = (int(p) for p in parts[:3])
+            base = int(parts[3]) if parts[3] else None
+            return (seq, kind, row_id), base
+    except ValueError:
+        pass
+    raise InvalidCursor(f"Invalid cursor: {cursor}")
+
+
+def _after(seq_col, id_col, kind: int, cursor: tuple[int, int, int]):
+    # Single range conditions (row values, no OR) so the
+    # (tenant_id, change_seq, id) indexes are range scans
+    seq, cursor_kind, row_id = cursor
+    if kind > cursor_kind:
+        return seq_col >= seq
+    if kind == cursor_kind:
+        return tuple_(seq_col, id_col) > tuple_(seq, row_id)
+    return seq_col > seq
+
+
+def get_changes(db: Session, cursor: str | None, limit: int = 500) -> dict:
+    """
+    One page of the change stream after `cursor`. At most `limit` rows
+    are read from each source, so memory stays bounded however far
+    behind the client is.
+    """
+    position, base = parse_cursor(cursor)
+
+    horizon = _read_counter(
+        db.connection(), counter_name(HORIZON_NAME, _tenant(db, None))
+    ) or 0
+    if base is not None and base < horizon:
+        return {"reset": True}
+
+    Item, Q, T = models.ItemMaster, models.Quotation, models.SyncTombstone
+
+    # Soft-deleted quotations are filtered by crud's ORM hook; they are
+    # reported through their tombstone instead
+    rows = []
+    for kind, seq_col, id_col, extra in (
+        (ITEM, Item.change_seq, Item.id, ()),
+        (QUOTATION, Q.change_seq, Q.id, ()),
+        (TOMBSTONE, T.change_seq, T.id, (T.entity_type, T.entity_id)),
+    ):
+        rows.extend(
+            (row[0], kind, row[1], row[2:])
+            for row in db.execute(
+                select(seq_col, id_col, *extra)
+                .where(_after(seq_col, id_col, kind, position))
+                .order_by(seq_col, id_col)
+                .limit(limit + 1)
+            )
+        )
+
+    rows.sort(key=lambda r: r[:3])
+    has_more = len(rows) > limit
+    page = rows[:limit]
+
+    if has_more:
+        last = page[-1]
+        run_base = "" if base is None else base
+        next_cursor = f"{last[0]}:{last[1]}:{last[2]}:{run_base}"
+    elif page:
+        next_cursor = str(page[-1][0])
+    else:
+        next_cursor = str(position[0])
+
+    return {
+        "reset": False,
+        "has_more": has_more,
+        "next": next_cursor,
+        "item_ids": [r[2] for r in page if r[1] == ITEM],
+        "quotation_ids": [r[2] for r in page if r[1] == QUOTATION],
+        "deleted": [
+            {"entity": r[3][0], "id": r[3][1]}
+            for r in page if r[1] == TOMBSTONE
+        ],
+    }
+
+
+def current_watermark(db: Session, tenant_id: int | None = None) -> int:
+    return _read_counter(
+        db.connection(), counter_name(SEQ_NAME, _tenant(db, tenant_id))
+    ) or 0
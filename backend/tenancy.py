@@ -0,0 +1,168 @@
+"""
+Tenant (branch) isolation.
+
+    python -m backend.tenancy create "North Branch" --username alice --password secret
+
+auth.get_current_user puts the user's tenant on the session; from then
+on every ORM SELECT / UPDATE / DELETE on a tenant-owned model is limited
+to that tenant and new rows are stamped with it. Sessions without a
+tenant (purge, archive, migrations, CLI tools) see every tenant; a
+single query can opt out with .execution_options(all_tenants=True).
+
+Core INSERT ... SELECT and text() SQL are not covered: callers add the
+tenant themselves (see crud.clone_quotation, search.py).
+"""
+import argparse
+import os
+from functools import lru_cache
+
+from sqlalchemy import DDL, event
+from sqlalchemy.orm import Session, with_loader_criteria
+
+from backend import models, sync
+from backend.database import SessionLocal, TENANT_KEY, TENANT_POOLS
+
+
+# Existing data and open registration land here (created with the table)
+DEFAULT_TENANT_ID = int(os.getenv("DEFAULT_TENANT_ID", "1"))
+
+TENANT_SCOPED = (
+    models.ItemMaster,
+    models.Customer,
+    models.Quotation,
+    models.ArchivedQuotation,
+    models.User,
+    models.SyncTombstone,
+    models.AuditLog,
+    models.AnalyticsItemDaily,
+    models.AnalyticsSalesmanDaily,
+)
+
+event.listen(
+    models.Tenant.__table__,
+    "after_create",
+    DDL("INSERT INTO tenants (name) VALUES ('default')")
+)
+
+
+def set_tenant(db: Session, tenant_id: int):
+    switching = tenant_id != db.info.get(TENANT_KEY)
+    db.info[TENANT_KEY] = tenant_id
+
+    # Dedicated pool: end the transaction the auth lookup opened on the
+    # shared pool so the request holds only its own tenant's connection
+    if switching and tenant_id in TENANT_POOLS and db.in_transaction():
+        db.commit()
+
+
+def current_tenant(db: Session) -> int | None:
+    return db.info.get(TENANT_KEY)
+
+
+# =========================
+# QUERY FILTER
+# =========================
+# Built once per tenant: constructing the criteria was most of the
+# per-query CPU. The tenant id is a bound value in the statement cache
+# key, so every tenant shares one compiled statement.
+@lru_cache(maxsize=None)
+def _tenant_criteria(tenant_id: int) -> tuple:
+    return tuple(
+        with_loader_criteria(
+            model,
+            model.tenant_id == tenant_id,
+            include_aliases=True
+        )
+        for model in TENANT_SCOPED
+    )
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _scope_to_tenant(state):
+    tenant_id = state.session.info.get(TENANT_KEY)
+    if tenant_id is None:
+        return
+
+    # Relationship / deferred loads follow from an already scoped parent
+    if (
+        (state.is_select or state.is_update or state.is_delete)
+        and not state.is_column_load
+        and not state.is_relationship_load
+        and not state.execution_options.get("all_tenants", False)
+    ):
+        state.statement = state.statement.options(
+            *_tenant_criteria(tenant_id)
+        )
+
+
+def _stamp_new_rows(db: Session, flush_context, instances):
+    tenant_id = db.info.get(TENANT_KEY)
+    if tenant_id is None:
+        return
+    for obj in db.new:
+        if isinstance(obj, TENANT_SCOPED) and obj.tenant_id is None:
+            obj.tenant_id = tenant_id
+
+
+event.listen(SessionLocal, "before_flush", _stamp_new_rows)
+
+
+# =========================
+# ADMIN
+# =========================
+def create_tenant(
+    db: Session,
+    name: str,
+    username: str,
+    password_hash: str
+) -> models.Tenant:
+    """New tenant plus its first user (who can register colleagues)."""
+    tenant = models.Tenant(name=name)
+    db.add(tenant)
+    db.flush()
+    db.add(models.User(
+        tenant_id=tenant.id,
+        username=username,
+        password=password_hash
+    ))
+    # Its change sequence (backend.sync): first writers don't race to
+    # insert the row
+    db.add(models.CacheVersion(
+        name=sync.counter_name(sync.SEQ_NAME, tenant.id),
+        version=0
+    ))
+    db.commit()
+    return tenant
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage tenants")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="create a tenant")
+    create.add_argument("name")
+    create.add_argument("--username", required=True)
+    create.add_argument("--password", required=True)
+
+    args = parser.parse_args()
+
+    from backend.auth import hash_password
+    from backend.database import init_engine
+
+    init_engine()
+    db = SessionLocal()
+    try:
+        tenant_id = create_tenant(
+            db,
+            name=args.name,
+            username=args.username,
+            password_hash=hash_password(args.password)
+        ).id
+    finally:
+        db.close()
+
+    print(f"Created tenant {tenant_id} ({args.name})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""
+Access and refresh tokens.
+
+Access tokens are short-lived JWTs carrying the user (sub), a token id
+(jti) and the login session (sid). Refresh tokens are random strings
+stored only as a sha256 hash: refreshing looks the row up, revokes it
+and issues a new pair in the same session, so it never touches bcrypt.
+A refresh token presented a second time has leaked; the whole session
+is revoked.
+
+Revoking a session (logout, user deleted, reuse) puts its live access
+tokens in revoked_tokens until they would have expired. Every worker
+keeps those jtis in memory (`denylist`) and reloads them when the shared
+counter in cache_versions moves, checked at most every
+REVOCATION_CHECK_SECONDS.
+"""
+import hashlib
+import logging
+import os
+import secrets
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend import models
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# CONFIG
+# =========================
+_DEV_SECRET_KEY = "your_secret_key_change_it"
+# Local development only: run without JWT_SECRET_KEY
+ALLOW_DEV_SECRET_KEY = os.getenv("ALLOW_DEV_SECRET_KEY", "0") == "1"
+
+ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+
+ACCESS_TOKEN_EXPIRE_MINUTES = float(
+    os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15")
+)
+REFRESH_TOKEN_EXPIRE_DAYS = float(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+REVOCATION_CHECK_SECONDS = float(os.getenv("REVOCATION_CHECK_SECONDS", "5"))
+# GET /events tickets: single-use, redeemed within this many seconds
+STREAM_TICKET_SECONDS = float(os.getenv("STREAM_TICKET_SECONDS", "30"))
+
+# Set by init_keys(): read after .env is loaded (database.init_engine)
+SECRET_KEY = None
+# Asymmetric algorithms (RS256, ES256): SECRET_KEY is the private key
+VERIFY_KEY = None
+
+DENYLIST_NAME = "revoked_tokens"
+
+
+class InvalidRefreshToken(ValueError):
+    pass
+
+
+class InvalidStreamTicket(ValueError):
+    pass
+
+
+# =========================
+# JWT
+# =========================
+def init_keys():
+    """Called at startup (and on first use): fails without a key."""
+    global SECRET_KEY, VERIFY_KEY
+    if SECRET_KEY is not None:
+        return
+
+    secret_key = os.getenv("JWT_SECRET_KEY")
+
+    # ❌ Never silently fallback in production
+    if not secret_key:
+        if not ALLOW_DEV_SECRET_KEY:
+            raise RuntimeError("JWT_SECRET_KEY is not set")
+        logger.warning("JWT_SECRET_KEY is not set, using the development key")
+        secret_key = _DEV_SECRET_KEY
+
+    VERIFY_KEY = os.getenv("JWT_PUBLIC_KEY") or secret_key
+    SECRET_KEY = secret_key
+
+
+def encode(claims: dict) -> str:
+    from jose import jwt
+
+    init_keys()
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode(token: str) -> dict:
+    """Raises jose.JWTError when the token is invalid or expired."""
+    from jose import jwt
+
+    init_keys()
+    return jwt.decode(token, VERIFY_KEY, algorithms=[ALGORITHM])
+
+
+# =========================
+# DENYLIST
+# =========================
+class Denylist:
+    """
+    Per-process copy of revoked_tokens: jti -> expiry. Only unexpired
+    entries are kept, so it stays as small as the number of sessions
+    revoked within one access token lifetime.
+    """
+
+    def __init__(self, check_seconds: float = REVOCATION_CHECK_SECONDS):
+        self.check_seconds = check_seconds
+
+        self._lock = threading.Lock()
+        self._expires: dict[str, datetime] = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    def _read_version(self, db: Session) -> int:
+        version = db.execute(
+            text("SELECT version FROM cache_versions WHERE name = :name"),
+            {"name": DENYLIST_NAME}
+        ).scalar()
+        return version or 0
+
+    def bump(self, db: Session):
+        """Bump the shared counter inside the caller's transaction."""
+        result = db.execute(
+            text(
+                "UPDATE cache_versions SET version = version + 1 "
+                "WHERE name = :name"
+            ),
+            {"name": DENYLIST_NAME}
+        )
+        if result.rowcount == 0:
+            db.add(models.CacheVersion(name=DENYLIST_NAME, version=1))
+            db.flush()
+
+    def _refresh(self, db: Session):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_seconds:
+            return
+
+        with self._lock:
+            if now - self._checked_at < self.check_seconds:
+                return
+
+            version = self._read_version(db)
+            if version != self._version:
+                rows = db.execute(
+                    select(models.RevokedToken.jti, models.RevokedToken.expires_at)
+                    .where(models.RevokedToken.expires_at > datetime.utcnow())
+                ).all()
+                self._expires = dict(rows)
+                self._version = version
+            self._checked_at = now
+
+    def add(self, entries: dict[str, datetime]):
+        """Write-through after commit: this worker sees it immediately."""
+        now = datetime.utcnow()
+        with self._lock:
+            expires = {
+                jti: expires_at
+                for jti, expires_at in self._expires.items()
+                if expires_at > now
+            }
+            expires.update(entries)
+            self._expires = expires
+
+    def is_revoked(self, db: Session, jti: str) -> bool:
+        self._refresh(db)
+        return jti in self._expires
+
+    def __len__(self):
+        return len(self._expires)
+
+
+denylist = Denylist()
+
+
+# =========================
+# SESSIONS
+# =========================
+def _hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue(db: Session, user_id: int, session_id: str | None = None) -> dict:
+    """New access + refresh token pair (a new session unless given one)."""
+    now = datetime.utcnow()
+    session_id = session_id or uuid.uuid4().hex
+    jti = uuid.uuid4().hex
+    access_expires_at = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    refresh_token = secrets.token_urlsafe(32)
+
+    db.add(models.RefreshToken(
+        user_id=user_id,
+        session_id=session_id,
+        token_hash=_hash(refresh_token),
+        expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        access_jti=jti,
+        access_expires_at=access_expires_at
+    ))
+    db.commit()
+
+    return {
+        "access_token": encode({
+            "sub": str(user_id),
+            "sid": session_id,
+            "jti": jti,
+            "exp": access_expires_at,
+        }),
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": int(ACCESS_TOKEN_EXPIRE_MINUTES * 60),
+    }
+
+
+def rotate(db: Session, refresh_token: str) -> dict:
+    RT = models.RefreshToken
+    now = datetime.utcnow()
+
+    row = db.execute(
+        select(RT.id, RT.user_id, RT.session_id, RT.expires_at)
+        .where(RT.token_hash == _hash(refresh_token))
+    ).first()
+
+    if row is None or row.expires_at <= now:
+        raise InvalidRefreshToken("Invalid or expired refresh token")
+
+    # Claim it: of two concurrent refreshes with the same token only
+    # one gets a new pair
+    claimed = db.execute(
+        update(RT)
+        .where(RT.id == row.id, RT.revoked_at.is_(None))
+        .values(revoked_at=now)
+    ).rowcount
+
+    if not claimed:
+        revoke_session(db, row.session_id)
+        raise InvalidRefreshToken("Refresh token reused, session revoked")
+
+    return issue(db, row.user_id, row.session_id)
+
+
+def _revoke(db: Session, condition):
+    RT, Revoked = models.RefreshToken, models.RevokedToken
+    now = datetime.utcnow()
+
+    # Rotated rows too: their access tokens may still be live
+    entries = dict(db.execute(
+        select(RT.access_jti, RT.access_expires_at)
+        .where(condition, RT.access_expires_at > now)
+    ).all())
+
+    db.execute(
+        update(RT)
+        .where(condition, RT.revoked_at.is_(None))
+        .values(revoked_at=now)
+    )
+
+    if entries:
+        existing = set(db.execute(
+            select(Revoked.jti).where(Revoked.jti.in_(list(entries)))
+        ).scalars())
+        new = [
+            {"jti": jti, "expires_at": expires_at}
+            for jti, expires_at in entries.items()
+            if jti not in existing
+        ]
+        if new:
+            db.execute(insert(Revoked), new)
+            denylist.bump(db)
+
+    db.commit()
+    denylist.add(entries)
+
+
+def revoke_session(db: Session, session_id: str):
+    _revoke(db, models.RefreshToken.session_id == session_id)
+
+
+def revoke_user(db: Session, user_id: int):
+    _revoke(db, models.RefreshToken.user_id == user_id)
+
+
+# =========================
+# STREAM TICKETS
+# =========================
+# EventSource can't send headers, so GET /events takes a ticket in the
+# URL instead of the access token: URLs end up in proxy and access logs.
+# A ticket is only good for opening one stream, within seconds, and
+# carries the access token's jti and exp so the stream ends with it.
+def issue_stream_ticket(access: dict) -> dict:
+    expires_at = min(
+        datetime.utcnow() + timedelta(seconds=STREAM_TICKET_SECONDS),
+        datetime.utcfromtimestamp(access["exp"])
+    )
+    return {
+        "ticket": encode({
+            "typ": "stream",
+            "sub": access["sub"],
+            "jti": uuid.uuid4().hex,
+            "exp": expires_at,
+            "access_jti": access["jti"],
+            "access_exp": access["exp"],
+        }),
+        "expires_in": int(STREAM_TICKET_SECONDS),
+    }
+
+
+def redeem_stream_ticket(db: Session, ticket: str) -> dict:
+    """The access token's claims (sub, jti, exp); each ticket works once."""
+    from jose import JWTError
+
+    try:
+        claims = decode(ticket)
+    except JWTError:
+        raise InvalidStreamTicket("Invalid or expired ticket")
+    if claims.get("typ") != "stream":
+        raise InvalidStreamTicket("Invalid or expired ticket")
+
+    access = {
+        "sub": claims["sub"],
+        "jti": claims["access_jti"],
+        "exp": claims["access_exp"],
+    }
+    if denylist.is_revoked(db, access["jti"]):
+        raise InvalidStreamTicket("Invalid or expired ticket")
+
+    # Claim it: the primary key lets only one redemption through, on
+    # any worker (pruned with the other expired entries)
+    try:
+        db.execute(insert(models.RevokedToken).values(
+            jti=claims["jti"],
+            expires_at=datetime.utcfromtimestamp(claims["exp"])
+        ))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise InvalidStreamTicket("Ticket already used")
+
+    return access
+
+
+def prune_expired(db: Session) -> int:
+    """Drop refresh tokens and denylist entries past their expiry."""
+    now = datetime.utcnow()
+    pruned = db.execute(
+        delete(models.RefreshToken).where(models.RefreshToken.expires_at < now)
+    ).rowcount
+    pruned += db.execute(
+        delete(models.RevokedToken).where(models.RevokedToken.expires_at < now)
+    ).rowcount
+    db.commit()
+    return pruned
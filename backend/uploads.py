@@ -0,0 +1,203 @@
+import json
+import os
+from typing import AsyncIterator
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+from python_multipart.multipart import parse_options_header
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import FormData, UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+from backend.auth import get_current_user
+from backend.database import get_db
+
+
+# =========================
+# UPLOAD LIMITS
+# =========================
+MAX_UPLOAD_FILE_BYTES = int(
+    os.getenv("MAX_UPLOAD_FILE_BYTES", str(10 * 1024 * 1024))
+)
+MAX_UPLOAD_FILES = int(os.getenv("MAX_UPLOAD_FILES", "20"))
+MAX_UPLOAD_TOTAL_BYTES = int(
+    os.getenv("MAX_UPLOAD_TOTAL_BYTES", str(256 * 1024 * 1024))
+)
+
+# Anything bigger than this per file goes to a temp file, not RAM
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(256 * 1024)))
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def _too_large(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=detail
+    )
+
+
+async def _limited_stream(
+    request: Request,
+    boundary: bytes,
+    max_part: int,
+    max_total: int
+):
+    """
+    The body as it arrives, cut off as soon as it, or any one part (the
+    bytes between two boundaries), is over its limit: an oversized
+    upload is rejected before the rest of it is read.
+    """
+    delimiter = b"--" + boundary
+    received = 0
+    part = 0
+    # A delimiter may be split across chunks
+    tail = b""
+
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_total:
+            raise UploadTooLarge(
+                f"Request exceeds {max_total // (1024 * 1024)}MB limit"
+            )
+
+        if boundary:
+            data = tail + chunk
+            segments = data.split(delimiter)
+            # First: the part still open (its tail was counted already)
+            sizes = [part + len(segments[0]) - len(tail)]
+            sizes += [len(segment) for segment in segments[1:]]
+            part = sizes[-1]
+            if max(sizes) > max_part:
+                raise UploadTooLarge(
+                    f"File exceeds {max_part // (1024 * 1024)}MB limit"
+                )
+            tail = data[-(len(delimiter) - 1):]
+
+        yield chunk
+
+
+async def parse_limited_form(
+    request: Request,
+    max_file_size: int = MAX_UPLOAD_FILE_BYTES,
+    max_files: int = MAX_UPLOAD_FILES,
+    max_total: int = MAX_UPLOAD_TOTAL_BYTES
+) -> FormData:
+    content_type = request.headers.get("content-type", "")
+
+    # No files possible → Starlette's form parser (1MB field cap) is fine
+    if content_type.startswith("application/x-www-form-urlencoded"):
+        return await request.form(max_files=0)
+
+    if not content_type.startswith("multipart/form-data"):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Expected multipart/form-data"
+        )
+
+    # Honest clients tell us up front → reject without reading anything
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        if int(content_length) > max_total:
+            raise _too_large(
+                f"Request exceeds {max_total // (1024 * 1024)}MB limit"
+            )
+
+    # No boundary: the parser rejects it (400)
+    _, options = parse_options_header(content_type)
+    boundary = options.get(b"boundary", b"")
+
+    parser = MultiPartParser(
+        request.headers,
+        _limited_stream(request, boundary, max_file_size, max_total),
+        max_files=max_files
+    )
+    parser.spool_max_size = UPLOAD_SPOOL_BYTES
+
+    try:
+        return await parser.parse()
+    except UploadTooLarge as e:
+        raise _too_large(str(e))
+    except MultiPartException as e:
+        if "Too many files" in e.message:
+            raise _too_large(e.message)
+        raise HTTPException(status_code=400, detail=e.message)
+
+
+# =========================
+# DEPENDENCY
+# =========================
+async def quotation_form(
+    request: Request,
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> AsyncIterator[FormData]:
+    """
+    Multipart body for quotation create/update: a `data` JSON field plus
+    optional `images` files, parsed under the upload limits above.
+    Used instead of Form()/File() params so FastAPI doesn't read the
+    whole body before our limits run.
+
+    Runs after authentication, which left a transaction open on the
+    request's session: end it so the connection goes back to the pool
+    while the body streams in (the tenant stays on the session).
+    """
+    await run_in_threadpool(db.commit)
+    form = await parse_limited_form(request)
+    try:
+        yield form
+    finally:
+        await form.close()
+
+
+def form_data_field(form: FormData) -> str:
+    data = form.get("data")
+    if not isinstance(data, str):
+        raise HTTPException(status_code=400, detail="Missing data field")
+    return data
+
+
+def form_payload(form: FormData, schema: type[BaseModel]):
+    """The data field as `schema`: 400 for bad JSON, 422 for bad values."""
+    try:
+        raw = json.loads(form_data_field(form))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid data JSON: {e}")
+
+    try:
+        return schema.model_validate(raw)
+    except ValidationError as e:
+        raise RequestValidationError([
+            {**error, "loc": ("body", "data", *error["loc"])}
+            for error in e.errors(include_url=False)
+        ])
+
+
+def form_images(form: FormData) -> list[UploadFile]:
+    return [f for f in form.getlist("images") if isinstance(f, UploadFile)]
+
+
+QUOTATION_FORM_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["data"],
+                    "properties": {
+                        "data": {"type": "string"},
+                        "images": {
+                            "type": "array",
+                            "items": {"type": "string", "format": "binary"},
+                        },
+                    },
+                }
+            }
+        },
+    }
+}
@@ -0,0 +1,144 @@
+"""
+Per-call cost of the primary key lookups in backend/lookups.py.
+
+    python benchmarks/hot_queries.py
+    HOT_QUERY_DATABASE_URL=postgresql+psycopg2://.../scratch python benchmarks/hot_queries.py
+
+Runs each lookup (user, item, quotation) in a tenant-scoped session,
+the way a request does, through:
+
+- query:    db.query(...).first() with the tenant criteria rebuilt per
+            call (how these lookups worked before backend/lookups.py)
+- cached:   the prebuilt select() and cached tenant criteria
+- prepared: Postgres only, the same through PREPARE / EXECUTE
+
+and prints CPU (process_time) and wall time per call; wall time on
+Postgres includes the round trip. HOT_QUERY_DATABASE_URL must point at
+a scratch database: all tables are dropped and recreated. Defaults to a
+temp SQLite file.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CALLS = int(os.getenv("HOT_QUERY_CALLS", "2000"))
+WARMUP = 200
+
+# Nothing cached in-process or running in the background
+os.environ["ITEM_CACHE_ENABLED"] = "0"
+os.environ["AUDIT_ENABLED"] = "0"
+os.environ["EVENTS_ENABLED"] = "0"
+os.environ["PROFILING_ENABLED"] = "0"
+os.environ["DATABASE_URL"] = os.getenv("HOT_QUERY_DATABASE_URL") or (
+    "sqlite:///" + os.path.join(tempfile.mkdtemp(), "hot.db")
+)
+
+from sqlalchemy import insert  # noqa: E402
+
+from backend import lookups, models, tenancy  # noqa: E402
+from backend.database import Base, SessionLocal, get_engine  # noqa: E402
+
+
+TENANT = 1
+ID = 1
+
+
+def seed(engine):
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"id": ID, "tenant_id": TENANT, "username": "bench", "password": "x"}
+        ])
+        conn.execute(insert(models.ItemMaster), [
+            {"id": ID, "tenant_id": TENANT, "name": "Item", "unit_price": 10}
+        ])
+        conn.execute(insert(models.Quotation), [
+            {
+                "id": ID,
+                "tenant_id": TENANT,
+                "quote_no": "Q-1",
+                "customer_name": "Customer",
+                "salesman_name": "Salesman",
+                "created_at": datetime.utcnow(),
+            }
+        ])
+
+
+def _query(model):
+    return lambda db: db.query(model).filter(model.id == ID).first()
+
+
+LOOKUPS = (
+    ("user", models.User, lookups.user_by_id),
+    ("item", models.ItemMaster, lookups.item_by_id),
+    ("quotation", models.Quotation, lookups.quotation_by_id),
+)
+
+
+def measure(db, fn) -> tuple[float, float]:
+    """(cpu, wall) microseconds per call."""
+    for _ in range(WARMUP):
+        assert fn(db) is not None
+        db.expunge_all()
+
+    cpu, wall = time.process_time(), time.perf_counter()
+    for _ in range(CALLS):
+        fn(db)
+        # Every call builds its object, as in a fresh request session
+        db.expunge_all()
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+
+    return cpu / CALLS * 1e6, wall / CALLS * 1e6
+
+
+def run_variant(variant: str, fn) -> tuple[float, float]:
+    cached_criteria = tenancy._tenant_criteria
+    prepared = lookups.PG_PREPARED_STATEMENTS
+
+    if variant == "query":
+        tenancy._tenant_criteria = cached_criteria.__wrapped__
+    lookups.PG_PREPARED_STATEMENTS = variant == "prepared"
+
+    db = SessionLocal()
+    try:
+        tenancy.set_tenant(db, TENANT)
+        return measure(db, fn)
+    finally:
+        db.close()
+        tenancy._tenant_criteria = cached_criteria
+        lookups.PG_PREPARED_STATEMENTS = prepared
+
+
+def main():
+    engine = get_engine()
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    seed(engine)
+
+    dialect = engine.dialect.name
+    variants = ["query", "cached"]
+    if dialect == "postgresql":
+        variants.append("prepared")
+
+    print(f"{CALLS} calls per variant ({dialect}), microseconds per call")
+    print(f"{'lookup':<10} {'variant':<9} {'cpu':>8} {'wall':>8} {'cpu vs query':>13}")
+    for name, model, lookup in LOOKUPS:
+        baseline = None
+        for variant in variants:
+            fn = _query(model) if variant == "query" else (
+                lambda db, lookup=lookup: lookup(db, ID)
+            )
+            cpu, wall = run_variant(variant, fn)
+            baseline = baseline or cpu
+            print(
+                f"{name:<10} {variant:<9} {cpu:8.1f} {wall:8.1f} "
+                f"{(cpu - baseline) / baseline:+12.0%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,759 @@
+"""
+Query plan regression check for crud.py, auth.py and the other
+request-path queries.
+
+    python benchmarks/query_plans.py             # check against expected
+    python benchmarks/query_plans.py --update    # rewrite expected plans
+    PLAN_DATABASE_URL=postgresql+psycopg2://.../scratch python benchmarks/query_plans.py
+
+Seeds a realistic dataset (two tenants, a few thousand items,
+customers and quotations, archived and soft-deleted rows, audit and
+sync history), runs every case below and captures the plan of each
+statement it executes: EXPLAIN QUERY PLAN on SQLite (the default, a
+temp file), EXPLAIN (FORMAT JSON) on Postgres. PLAN_DATABASE_URL must
+point at a scratch database: all tables are dropped and recreated.
+
+A case fails when
+- a table is scanned in full, or only by tenant_id (the whole tenant),
+  unless the case allows it for that table or the table is small by
+  design (under SMALL_TABLE_ROWS rows: cache_versions, tenants, ...),
+- a Postgres plan costs more than the case budget (PLAN_COST_BUDGET),
+- a plan differs from benchmarks/query_plans/<dialect>.json.
+
+Plans are checked in so changes show up in review: after an intended
+change, run with --update and commit the new file.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PLAN_DIR = os.path.join(ROOT, "benchmarks", "query_plans")
+COST_BUDGET = float(os.getenv("PLAN_COST_BUDGET", "1000"))
+SCALE = int(os.getenv("PLAN_SEED_SCALE", "1"))
+
+# Scanning these is the planner's right call, not a missing index
+SMALL_TABLE_ROWS = 200
+
+# Every lookup must hit the database, and nothing runs in the background
+os.environ["ITEM_CACHE_ENABLED"] = "0"
+os.environ["AUDIT_ENABLED"] = "0"
+os.environ["EVENTS_ENABLED"] = "0"
+# Tokens are signed and checked in-process only
+os.environ.setdefault("ALLOW_DEV_SECRET_KEY", "1")
+os.environ["DATABASE_URL"] = os.getenv("PLAN_DATABASE_URL") or (
+    "sqlite:///" + os.path.join(tempfile.mkdtemp(), "plans.db")
+)
+
+from sqlalchemy import event, insert, text  # noqa: E402
+
+from backend import (  # noqa: E402
+    analytics, audit, auth, crud, models, schemas, search, sync, tokens
+)
+from backend.database import (  # noqa: E402
+    Base, SessionLocal, TENANT_KEY, get_engine
+)
+from backend.tenancy import set_tenant  # noqa: E402
+
+
+TENANT, OTHER_TENANT = 1, 2
+
+
+# =========================
+# SEED
+# =========================
+def seed(engine):
+    users = 1000 * SCALE
+    items = 2000 * SCALE
+    customers = 1000 * SCALE
+    quotations = 5000 * SCALE
+    archived = 1000 * SCALE
+    start = datetime(2025, 1, 1)
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.Tenant), [{"id": OTHER_TENANT, "name": "other"}])
+        conn.execute(insert(models.User), [
+            {
+                "tenant_id": TENANT if i % 2 else OTHER_TENANT,
+                "username": f"user{i}",
+                "password": auth.hash_password("secret") if i == 1 else "x",
+            }
+            for i in range(1, users + 1)
+        ])
+
+        for tenant_id in (TENANT, OTHER_TENANT):
+            base = 0 if tenant_id == TENANT else 10_000_000
+            conn.execute(insert(models.ItemMaster), [
+                {
+                    "id": base + i,
+                    "tenant_id": tenant_id,
+                    "name": f"Item {i:05d}",
+                    "unit_price": 10 + i % 90,
+                    "version": 1,
+                    "change_seq": i,
+                }
+                for i in range(1, items + 1)
+            ])
+            conn.execute(insert(models.Customer), [
+                {
+                    "id": base + i,
+                    "tenant_id": tenant_id,
+                    "name": f"Customer {i}",
+                    "phone": f"98{i:08d}",
+                    "name_key": f"customer {i}",
+                }
+                for i in range(1, customers + 1)
+            ])
+            conn.execute(insert(models.Quotation), [
+                {
+                    "id": base + i,
+                    "tenant_id": tenant_id,
+                    "quote_no": f"Q-{tenant_id}-{i}",
+                    "customer_id": base + 1 + i % customers,
+                    "customer_name": f"Customer {1 + i % customers}",
+                    "customer_phone": f"98{1 + i % customers:08d}",
+                    "salesman_name": f"Salesman {i % 20}",
+                    "tax": 5,
+                    # Spread over most of a year, a few dozen a day
+                    "created_at": start + timedelta(minutes=97 * i),
+                    "version": 1,
+                    "client_id": f"device-{i}",
+                    # A few soft-deleted rows waiting for the purger
+                    "deleted_at": start if i % 50 == 0 else None,
+                    "change_seq": items + i,
+                }
+                for i in range(1, quotations + 1)
+            ])
+            conn.execute(insert(models.QuotationItem), [
+                {
+                    "quotation_id": base + q,
+                    "item_id": base + 1 + (q * 7 + n) % items,
+                    "qty": 1 + n,
+                    "price": 10,
+                    "total": 10 * (1 + n),
+                }
+                for q in range(1, quotations + 1)
+                for n in range(3)
+            ])
+            conn.execute(insert(models.ArchivedQuotation), [
+                {
+                    "id": base + quotations + i,
+                    "tenant_id": tenant_id,
+                    "quote_no": f"QA-{tenant_id}-{i}",
+                    "customer_id": base + 1 + i % customers,
+                    "customer_name": f"Customer {1 + i % customers}",
+                    "salesman_name": "Archived",
+                    "tax": 0,
+                    "created_at": start - timedelta(days=i),
+                    "version": 1,
+                }
+                for i in range(1, archived + 1)
+            ])
+            conn.execute(insert(models.ArchivedQuotationItem), [
+                {
+                    "quotation_id": base + quotations + i,
+                    "item_id": base + 1 + i % items,
+                    "qty": 1,
+                    "price": 10,
+                    "total": 10,
+                }
+                for i in range(1, archived + 1)
+            ])
+            conn.execute(insert(models.AuditLog), [
+                {
+                    "tenant_id": tenant_id,
+                    "entity_type": "quotation",
+                    "entity_id": base + 1 + i % quotations,
+                    "action": "update",
+                    "created_at": start,
+                }
+                for i in range(quotations * 2)
+            ])
+            conn.execute(insert(models.SyncTombstone), [
+                {
+                    "tenant_id": tenant_id,
+                    "entity_type": "quotation",
+                    "entity_id": base + 10 * i,
+                    "change_seq": items + 10 * i,
+                    "deleted_at": start,
+                }
+                for i in range(1, quotations // 10)
+            ])
+
+        # Two refresh tokens (one rotation) per session, some revoked
+        now = datetime.utcnow()
+        conn.execute(insert(models.RefreshToken), [
+            {
+                "user_id": 1 + i % users,
+                "session_id": f"session-{i // 2}",
+                "token_hash": tokens._hash(f"refresh-{i}"),
+                "expires_at": now + timedelta(days=30),
+                "access_jti": f"jti-{i}",
+                "access_expires_at": now + timedelta(minutes=15 - i % 30),
+                "revoked_at": now if i % 2 == 0 else None,
+            }
+            for i in range(1, 2001)
+        ])
+        conn.execute(insert(models.RevokedToken), [
+            {"jti": f"jti-{i}", "expires_at": now + timedelta(minutes=i % 30)}
+            for i in range(1, 400, 4)
+        ])
+
+        # A year of rollups per tenant
+        for tenant_id in (TENANT, OTHER_TENANT):
+            days = [date(2025, 1, 1) + timedelta(days=d) for d in range(365)]
+            conn.execute(insert(models.AnalyticsItemDaily), [
+                {
+                    "tenant_id": tenant_id,
+                    "day": day,
+                    "item_id": 1 + (d * 7 + n) % items,
+                    "quantity": n + 1,
+                    "revenue": 10 * (n + 1),
+                    "quotations": 1,
+                }
+                for d, day in enumerate(days)
+                for n in range(40)
+            ])
+            conn.execute(insert(models.AnalyticsSalesmanDaily), [
+                {
+                    "tenant_id": tenant_id,
+                    "day": day,
+                    "salesman_name": f"Salesman {n}",
+                    "quotations": 5,
+                    "subtotal": 150,
+                    "customers": 4,
+                }
+                for day in days
+                for n in range(20)
+            ])
+
+        conn.execute(
+            text("INSERT INTO cache_versions (name, version) VALUES (:n, :v)"),
+            [
+                row
+                for tenant_id in (TENANT, OTHER_TENANT)
+                for row in (
+                    {
+                        "n": sync.counter_name(sync.SEQ_NAME, tenant_id),
+                        "v": items + quotations + 1,
+                    },
+                    {"n": sync.counter_name(sync.HORIZON_NAME, tenant_id), "v": 0},
+                    # The rollup job is a little behind
+                    {
+                        "n": sync.counter_name(analytics.WATERMARK_NAME, tenant_id),
+                        "v": items + quotations - 20,
+                    },
+                )
+            ]
+        )
+
+        search.index_quotations(
+            SimpleNamespace(
+                flush=lambda: None,
+                get_bind=lambda: engine,
+                execute=conn.execute
+            ),
+            [
+                base + i
+                for base in (0, 10_000_000)
+                for i in range(1, quotations + 1)
+            ]
+        )
+
+    # Rows above were inserted with explicit ids: move the sequences past
+    # them so the cases' own inserts don't collide
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                if "id" in table.c and table.c.id.autoincrement is not False:
+                    conn.execute(text(
+                        f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                        f"(SELECT COALESCE(MAX(id), 0) + 1 FROM {table.name}), false) "
+                        f"WHERE pg_get_serial_sequence('{table.name}', 'id') IS NOT NULL"
+                    ))
+
+    # Planner statistics, as a long-running database would have them.
+    # On Postgres VACUUM also merges the GIN pending list: until then the
+    # search index looks too expensive to use.
+    analyze = "VACUUM ANALYZE" if engine.dialect.name == "postgresql" else "ANALYZE"
+    with engine.connect().execution_options(
+        isolation_level="AUTOCOMMIT"
+    ) as conn:
+        conn.execute(text(analyze))
+
+
+def small_tables(engine) -> set[str]:
+    with engine.connect() as conn:
+        return {
+            table.name
+            for table in Base.metadata.sorted_tables
+            if conn.execute(
+                text(f"SELECT COUNT(*) FROM {table.name}")
+            ).scalar() < SMALL_TABLE_ROWS
+        }
+
+
+# =========================
+# CASES
+# =========================
+def _line(**kw):
+    return schemas.QuotationItemAuto(**{"qty": 1, "price": 10, **kw})
+
+
+def _quotation(**kw):
+    return {
+        "customer_name": "Customer 7",
+        "customer_phone": "9800000007",
+        "salesman_name": "Salesman 1",
+        "tax": 5,
+        **kw,
+    }
+
+
+def _login(db):
+    form = SimpleNamespace(username="user1", password="secret")
+    return auth.login(form, db)
+
+
+def _current_user(db):
+    token = tokens.encode({
+        "sub": "1",
+        "sid": "session-plan",
+        "jti": "jti-plan",
+        "exp": datetime.utcnow() + timedelta(minutes=5),
+    })
+    return auth.get_current_user(token, db)
+
+
+def _update_rollups(db):
+    # The background job has no tenant
+    db.info.pop(TENANT_KEY, None)
+    return analytics.update_rollups(db)
+
+
+class Case:
+    """
+    fn(db) runs with the session scoped to TENANT. `allow` lists tables
+    it may scan (lists by design); `allow_sqlite` the same on SQLite
+    only, where LIKE is case-insensitive and can't use a plain index.
+    """
+
+    def __init__(self, fn, allow=(), allow_sqlite=(), budget=None):
+        self.fn = fn
+        self.allow = set(allow)
+        self.allow_sqlite = set(allow_sqlite)
+        self.budget = budget
+
+    def allowed(self, dialect: str) -> set:
+        if dialect == "sqlite":
+            return self.allow | self.allow_sqlite
+        return self.allow
+
+
+QUOTATIONS = 5000 * SCALE
+
+CASES = {
+    "auth.login": Case(_login),
+    "auth.get_current_user": Case(_current_user),
+    # Lists the tenant's users by design
+    "tokens.rotate": Case(lambda db: tokens.rotate(db, "refresh-101")),
+    "tokens.rotate.reused": Case(
+        lambda db: _ignore_value_error(tokens.rotate, db, "refresh-102")
+    ),
+    "tokens.revoke_user": Case(lambda db: tokens.revoke_user(db, 3)),
+    "auth.get_users": Case(
+        lambda db: auth.get_users(db, None), allow={"users"}
+    ),
+    "crud.get_item_by_id": Case(lambda db: crud.get_item_by_id(db, 42)),
+    "crud.get_item_by_name": Case(
+        lambda db: crud.get_item_by_name(db, "item 00042")
+    ),
+    # Lists the whole catalog by design
+    "crud.get_items": Case(
+        lambda db: crud.get_items(db),
+        allow={"item_master"},
+        budget=COST_BUDGET * 10
+    ),
+    "crud.create_item": Case(
+        lambda db: crud.create_item(db, "Brand new item", 12.5)
+    ),
+    "crud.update_item": Case(
+        lambda db: crud.update_item(
+            db, 43, schemas.ItemUpdate(name="Item 00043 v2", unit_price=11)
+        )
+    ),
+    # Unused item: the in-use checks must be index lookups
+    "crud.delete_item": Case(
+        lambda db: _ignore_value_error(crud.delete_item, db, 1999)
+    ),
+    "crud.get_or_create_customer": Case(
+        lambda db: crud.get_or_create_customer(db, "Customer 9", "9800000009")
+    ),
+    "crud.get_or_create_customer.no_phone": Case(
+        lambda db: crud.get_or_create_customer(db, "Walk-in", None)
+    ),
+    "crud.get_customer_by_id": Case(
+        lambda db: crud.get_customer_by_id(db, 9)
+    ),
+    "crud.get_customer_quotations": Case(
+        lambda db: crud.get_customer_quotations(db, 9)
+    ),
+    "crud.autocomplete_customers.name": Case(
+        lambda db: crud.autocomplete_customers(db, "customer 12"),
+        allow_sqlite={"customers"}
+    ),
+    "crud.autocomplete_customers.phone": Case(
+        lambda db: crud.autocomplete_customers(db, "980000012"),
+        allow_sqlite={"customers"}
+    ),
+    "crud.create_quotation": Case(
+        lambda db: crud.create_quotation(
+            db,
+            schemas.QuotationCreate(**_quotation(items=[
+                _line(item_id=5), _line(item_name="Item 00006")
+            ])),
+            {}
+        )
+    ),
+    "crud.update_quotation": Case(
+        lambda db: crud.update_quotation(
+            db, 11,
+            schemas.QuotationUpdate(tax=6, items=[_line(item_id=5)]),
+            {}
+        )
+    ),
+    "crud.bulk_create_quotations": Case(
+        lambda db: crud.bulk_create_quotations(db, [
+            schemas.QuotationBulkEntry(client_id="device-1", **_quotation(
+                items=[_line(item_id=5)]
+            )),
+            schemas.QuotationBulkEntry(client_id="plan-new", **_quotation(
+                items=[_line(item_id=5), _line(item_name="Bulk new item")]
+            )),
+        ])
+    ),
+    "crud.clone_quotation": Case(
+        lambda db: crud.clone_quotation(
+            db, 12, schemas.QuotationClone(salesman_name="Salesman 2")
+        )
+    ),
+    "crud.clone_quotation.archived": Case(
+        lambda db: crud.clone_quotation(
+            db, QUOTATIONS + 3, schemas.QuotationClone()
+        )
+    ),
+    "crud.reprice_items": Case(
+        lambda db: crud.reprice_items(db, schemas.RepriceRequest(
+            changes=[{"item_id": 8, "new_price": 12}],
+            filter={"created_after": datetime(2025, 1, 2)}
+        ))
+    ),
+    # Lists every live quotation of the tenant by design
+    "crud.get_quotations": Case(
+        lambda db: crud.get_quotations(db),
+        allow={"quotations"},
+        budget=COST_BUDGET * 100
+    ),
+    "crud.get_quotation_by_id": Case(
+        lambda db: crud.get_quotation_by_id(db, 13)
+    ),
+    "crud.get_quotations_by_ids": Case(
+        lambda db: crud.get_quotations_by_ids(db, [14, 15, QUOTATIONS + 4])
+    ),
+    "crud.get_archived_quotation_by_id": Case(
+        lambda db: crud.get_archived_quotation_by_id(db, QUOTATIONS + 5)
+    ),
+    "crud.delete_quotation": Case(
+        lambda db: crud.delete_quotation(db, 16)
+    ),
+    "search.search_quotation_ids": Case(
+        lambda db: search.search_quotation_ids(db, "customer 12")
+    ),
+    # Client a little behind: the last 1000 quotations changed since
+    "sync.get_changes": Case(
+        lambda db: sync.get_changes(db, str(2000 * SCALE + QUOTATIONS - 1000), 100)
+    ),
+    # Reads of a quarter of rollups: range scans of the primary key
+    "analytics.top_items": Case(
+        lambda db: analytics.top_items(
+            db, date(2025, 4, 1), date(2025, 6, 30)
+        )
+    ),
+    "analytics.quotation_value": Case(
+        lambda db: analytics.quotation_value(
+            db, date(2025, 4, 1), date(2025, 6, 30), "week"
+        )
+    ),
+    "analytics.salesman_trends": Case(
+        lambda db: analytics.salesman_trends(
+            db, date(2025, 4, 1), date(2025, 6, 30), "month"
+        )
+    ),
+    # Walks every tenant by design
+    "analytics.update_rollups": Case(_update_rollups, allow={"tenants"}),
+    "audit.get_history": Case(
+        lambda db: audit.get_history(db, "quotation", 17)
+    ),
+}
+
+
+def _ignore_value_error(fn, *args):
+    try:
+        return fn(*args)
+    except ValueError:
+        pass
+
+
+# =========================
+# CAPTURE + EXPLAIN
+# =========================
+# EXECUTE: prepared lookups on Postgres (backend/lookups.py)
+EXPLAINABLE = re.compile(r"^\s*(SELECT|UPDATE|DELETE|WITH|EXECUTE)\b", re.I)
+INSERT_SELECT = re.compile(r"^\s*INSERT\b.*\bSELECT\b", re.I | re.S)
+
+
+def _normalize_sql(statement: str) -> str:
+    return " ".join(statement.split())
+
+
+def _sqlite_plan(cursor, statement, params) -> tuple[list[str], None]:
+    cursor.execute("EXPLAIN QUERY PLAN " + statement, params)
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in cursor.fetchall():
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines, None
+
+
+def _pg_plan(cursor, statement, params) -> tuple[list[str], float]:
+    cursor.execute("EXPLAIN (FORMAT JSON) " + statement, params)
+    root = cursor.fetchone()[0][0]["Plan"]
+    lines = []
+
+    def walk(node, depth):
+        line = node["Node Type"]
+        if "Relation Name" in node:
+            line += f" on {node['Relation Name']}"
+        if "Index Name" in node:
+            line += f" using {node['Index Name']}"
+        if "Index Cond" in node:
+            line += f" ({node['Index Cond']})"
+        lines.append("  " * depth + line)
+        for child in node.get("Plans", []):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return lines, root["Total Cost"]
+
+
+class PlanCapture:
+    def __init__(self, engine):
+        self.dialect = engine.dialect.name
+        self.statements: dict[str, dict] | None = None
+        event.listen(engine, "before_cursor_execute", self._before)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        if self.statements is None:
+            return
+        if not (EXPLAINABLE.match(statement) or INSERT_SELECT.match(statement)):
+            return
+        sql = _normalize_sql(statement)
+        if sql in self.statements:
+            return
+
+        # Batched inserts (insertmanyvalues) arrive as one parameter dict
+        many = executemany and isinstance(parameters, (list, tuple))
+        params = parameters[0] if many else parameters
+        explain = _pg_plan if self.dialect == "postgresql" else _sqlite_plan
+        # Same connection and transaction, right before the real statement
+        explain_cursor = cursor.connection.cursor()
+        try:
+            plan, cost = explain(explain_cursor, statement, params)
+        finally:
+            explain_cursor.close()
+        self.statements[sql] = {"sql": sql, "plan": plan, "cost": cost}
+
+    def run(self, fn, db) -> list[dict]:
+        self.statements = {}
+        try:
+            fn(db)
+        finally:
+            captured, self.statements = self.statements, None
+        return list(captured.values())
+
+
+# =========================
+# CHECKS
+# =========================
+SQLITE_SCAN = re.compile(r"^SCAN (\w+)")
+SQLITE_TENANT_ONLY = re.compile(r"^SEARCH (\w+) .*\(tenant_id=\?\)$")
+PG_SCAN = re.compile(r"^Seq Scan on (\w+)")
+PG_TENANT_ONLY = re.compile(r" on (\w+) using \w+ \(\(tenant_id = [^)]*\)\)$")
+
+
+def problems(statement: dict, allowed: set, budget: float | None) -> list[str]:
+    tables = set(Base.metadata.tables)
+    found = []
+    for line in statement["plan"]:
+        line = line.strip()
+        for pattern, what in (
+            (SQLITE_SCAN, "full scan"),
+            (PG_SCAN, "full scan"),
+            (SQLITE_TENANT_ONLY, "tenant-wide scan"),
+            (PG_TENANT_ONLY, "tenant-wide scan"),
+        ):
+            match = pattern.search(line)
+            if match and match.group(1) in tables and \
+                    match.group(1) not in allowed:
+                found.append(f"{what} of {match.group(1)}: {line}")
+
+    cost = statement["cost"]
+    limit = budget or COST_BUDGET
+    if cost is not None and cost > limit:
+        found.append(f"cost {cost:.0f} over budget {limit:.0f}")
+    return found
+
+
+def _expected_path(dialect: str) -> str:
+    return os.path.join(PLAN_DIR, f"{dialect}.json")
+
+
+def _comparable(statements: list[dict]) -> list[dict]:
+    # Costs drift with statistics; the plan shape is what's reviewed
+    return [{"sql": s["sql"], "plan": s["plan"]} for s in statements]
+
+
+PG_INDEX_CHOICE = re.compile(
+    r"^(\s*(?:Bitmap )?Index (?:Only )?Scan on \w+) using .*$"
+)
+
+
+def _shape(statements: list[dict], dialect: str) -> list[dict]:
+    """
+    What has to match the expected file. Postgres breaks near-ties
+    between equally good indexes (the primary key, or a tenant-led one
+    that also has id) differently from run to run, so only the scan type
+    per table counts there; problems() still sees the index conditions.
+    """
+    if dialect != "postgresql":
+        return statements
+    return [
+        {
+            "sql": s["sql"],
+            "plan": [PG_INDEX_CHOICE.sub(r"\1", line) for line in s["plan"]],
+        }
+        for s in statements
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query plan regression check")
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="write the captured plans as the new expected plans"
+    )
+    parser.add_argument("cases", nargs="*", help="only run these cases")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    seed(engine)
+
+    small = small_tables(engine)
+    capture = PlanCapture(engine)
+    dialect = engine.dialect.name
+
+    actual = {}
+    failures = []
+    for name, case in CASES.items():
+        if args.cases and name not in args.cases:
+            continue
+
+        db = SessionLocal()
+        try:
+            set_tenant(db, TENANT)
+            statements = capture.run(case.fn, db)
+        finally:
+            db.rollback()
+            db.close()
+
+        actual[name] = _comparable(statements)
+        for statement in statements:
+            for problem in problems(
+                statement, case.allowed(dialect) | small, case.budget
+            ):
+                failures.append(f"{name}: {problem}\n    {statement['sql']}")
+
+    path = _expected_path(dialect)
+    if args.update:
+        expected = {}
+        if args.cases and os.path.exists(path):
+            with open(path) as fh:
+                expected = json.load(fh)
+        expected.update(actual)
+        os.makedirs(PLAN_DIR, exist_ok=True)
+        with open(path, "w") as fh:
+            json.dump(expected, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+        print(f"Wrote {len(actual)} cases to {os.path.relpath(path, ROOT)}")
+    elif not os.path.exists(path):
+        failures.append(
+            f"no expected plans for {dialect}: run with --update and commit "
+            f"{os.path.relpath(path, ROOT)}"
+        )
+    else:
+        with open(path) as fh:
+            expected = json.load(fh)
+        for name, statements in actual.items():
+            if _shape(expected.get(name, []), dialect) != _shape(
+                statements, dialect
+            ):
+                failures.append(
+                    f"{name}: plan changed from "
+                    f"{os.path.relpath(path, ROOT)}\n"
+                    + _diff(expected.get(name, []), statements)
+                )
+
+    for name, statements in actual.items():
+        print(f"{name}: {len(statements)} statements")
+
+    if failures:
+        print(f"\n{len(failures)} problem(s):")
+        for failure in failures:
+            print(f"- {failure}")
+        sys.exit(1)
+
+    print(f"\nAll {len(actual)} cases OK ({dialect})")
+
+
+def _diff(expected: list[dict], actual: list[dict]) -> str:
+    import difflib
+
+    def lines(statements):
+        out = []
+        for s in statements:
+            out.append(s["sql"])
+            out.extend("    " + line for line in s["plan"])
+        return out
+
+    return "\n".join(
+        "    " + line
+        for line in difflib.unified_diff(
+            lines(expected), lines(actual),
+            "expected", "actual", lineterm="", n=1
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
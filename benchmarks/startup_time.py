@@ -0,0 +1,75 @@
+"""
+Cold-start import budget for the API process.
+
+    python benchmarks/startup_time.py            # report + budget check
+    STARTUP_IMPORT_BUDGET_MS=500 python benchmarks/startup_time.py
+
+Runs `python -X importtime -c "import backend.main"` in fresh
+interpreters (without DATABASE_URL, which import must not need), takes
+the best of a few runs and exits non-zero if it exceeds the budget.
+Also lists the heaviest imports and any deferred module that crept
+back into the startup path.
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "600"))
+RUNS = int(os.getenv("STARTUP_IMPORT_RUNS", "5"))
+
+# Must only be imported on first use, never by `import backend.main`
+DEFERRED = ["cloudinary", "passlib", "jose", "dotenv", "psycopg2"]
+
+
+def measure():
+    env = {k: v for k, v in os.environ.items() if k != "DATABASE_URL"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.main"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"import backend.main failed:\n{result.stderr[-2000:]}")
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative) / 1000
+    return modules
+
+
+def main():
+    runs = [measure() for _ in range(RUNS)]
+    best = min(runs, key=lambda m: m.get("backend.main", 0))
+    total = best["backend.main"]
+
+    print(f"import backend.main: {total:.1f} ms (best of {RUNS}, budget {BUDGET_MS:.0f} ms)")
+    print("heaviest top-level imports:")
+    top = sorted(
+        ((ms, name) for name, ms in best.items() if "." not in name),
+        reverse=True
+    )[:10]
+    for ms, name in top:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    leaked = [m for m in DEFERRED if m in best]
+    if leaked:
+        print(f"FAIL: deferred modules imported at startup: {', '.join(leaked)}")
+        sys.exit(1)
+
+    if total > BUDGET_MS:
+        print("FAIL: over budget")
+        sys.exit(1)
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
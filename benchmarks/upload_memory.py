@@ -0,0 +1,93 @@
+"""
+Peak Python memory while parsing a 20 x 10MB quotation upload.
+
+    python benchmarks/upload_memory.py
+
+The body is generated and fed in 64KB chunks (like a socket would), so
+the numbers reflect the parser, not the benchmark. Cloudinary is not
+called.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.requests import Request
+
+from backend.uploads import parse_limited_form
+
+
+FILES = 20
+FILE_BYTES = 10 * 1024 * 1024
+CHUNK = 64 * 1024
+BOUNDARY = "benchboundary"
+
+
+def body_chunks():
+    data = json.dumps({"customer_name": "Bench", "salesman_name": "S", "items": []})
+    yield (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="data"\r\n\r\n'
+        f"{data}\r\n"
+    ).encode()
+
+    block = b"\xab" * CHUNK
+    for i in range(FILES):
+        yield (
+            f"--{BOUNDARY}\r\n"
+            f'Content-Disposition: form-data; name="images"; filename="{i}.jpg"\r\n'
+            "Content-Type: image/jpeg\r\n\r\n"
+        ).encode()
+        for _ in range(FILE_BYTES // CHUNK):
+            yield block
+        yield b"\r\n"
+
+    yield f"--{BOUNDARY}--\r\n".encode()
+
+
+def make_request() -> Request:
+    chunks = body_chunks()
+
+    async def receive():
+        try:
+            return {"type": "http.request", "body": next(chunks), "more_body": True}
+        except StopIteration:
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/quotations/",
+        "headers": [
+            (b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())
+        ],
+    }
+    return Request(scope, receive)
+
+
+async def run():
+    tracemalloc.start()
+    started = time.perf_counter()
+
+    form = await parse_limited_form(make_request())
+    files = form.getlist("images")
+
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = FILES * FILE_BYTES
+    print(f"files parsed   : {len(files)}")
+    print(f"bytes streamed : {total / 1024 / 1024:.0f} MB")
+    print(f"peak traced    : {peak / 1024 / 1024:.1f} MB")
+    print(f"elapsed        : {elapsed:.2f} s")
+
+    await form.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
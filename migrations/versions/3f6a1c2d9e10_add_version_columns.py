@@ -0,0 +1,38 @@
+"""add version columns for optimistic locking
+
+Revision ID: 3f6a1c2d9e10
+Revises: bd1bae41b99c
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6a1c2d9e10'
+down_revision: Union[str, Sequence[str], None] = 'bd1bae41b99c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'item_master',
+        sa.Column('version', sa.Integer(), nullable=False, server_default='1')
+    )
+    op.add_column(
+        'quotations',
+        sa.Column('version', sa.Integer(), nullable=False, server_default='1')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('quotations') as batch_op:
+        batch_op.drop_column('version')
+    with op.batch_alter_table('item_master') as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,85 @@
+"""add quotation archive tables and hot-path indexes
+
+Revision ID: a41d9f07c6b2
+Revises: 7c2e5b8a4d31
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41d9f07c6b2'
+down_revision: Union[str, Sequence[str], None] = '7c2e5b8a4d31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Hot tables: archive cutoff scan + per-quotation line lookups
+    op.create_index(
+        'ix_quotations_created_at', 'quotations', ['created_at']
+    )
+    op.create_index(
+        'ix_quotation_items_quotation_id', 'quotation_items', ['quotation_id']
+    )
+
+    op.create_table(
+        'quotations_archive',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('quote_no', sa.String(), nullable=True),
+        sa.Column('customer_name', sa.String(), nullable=False),
+        sa.Column('customer_phone', sa.String(), nullable=True),
+        sa.Column('salesman_name', sa.String(), nullable=False),
+        sa.Column('tax', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column(
+            'archived_at', sa.DateTime(), nullable=True,
+            server_default=sa.func.now()
+        ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_quotations_archive_quote_no', 'quotations_archive',
+        ['quote_no'], unique=True
+    )
+    op.create_index(
+        'ix_quotations_archive_created_at', 'quotations_archive',
+        ['created_at']
+    )
+
+    op.create_table(
+        'quotation_items_archive',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('quotation_id', sa.Integer(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('qty', sa.Integer(), nullable=False),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['quotation_id'], ['quotations_archive.id'], ondelete='CASCADE'
+        ),
+        sa.ForeignKeyConstraint(['item_id'], ['item_master.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_quotation_items_archive_quotation_id', 'quotation_items_archive',
+        ['quotation_id']
+    )
+    op.create_index(
+        'ix_quotation_items_archive_item_id', 'quotation_items_archive',
+        ['item_id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('quotation_items_archive')
+    op.drop_table('quotations_archive')
+    op.drop_index('ix_quotation_items_quotation_id', 'quotation_items')
+    op.drop_index('ix_quotations_created_at', 'quotations')
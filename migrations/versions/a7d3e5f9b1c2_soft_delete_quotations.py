@@ -0,0 +1,57 @@
+"""soft delete for quotations, index quotation_items.item_id
+
+Revision ID: a7d3e5f9b1c2
+Revises: f2a7c9d1e3b4
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e5f9b1c2'
+down_revision: Union[str, Sequence[str], None] = 'f2a7c9d1e3b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'quotations',
+        sa.Column('deleted_at', sa.DateTime(), nullable=True)
+    )
+    op.create_index(
+        'ix_quotations_live_id',
+        'quotations',
+        ['id'],
+        unique=False,
+        postgresql_where=sa.text('deleted_at IS NULL'),
+        sqlite_where=sa.text('deleted_at IS NULL')
+    )
+    op.create_index(
+        'ix_quotations_deleted_at',
+        'quotations',
+        ['deleted_at'],
+        unique=False,
+        postgresql_where=sa.text('deleted_at IS NOT NULL'),
+        sqlite_where=sa.text('deleted_at IS NOT NULL')
+    )
+    op.create_index(
+        op.f('ix_quotation_items_item_id'),
+        'quotation_items',
+        ['item_id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_quotation_items_item_id'), table_name='quotation_items')
+    op.drop_index('ix_quotations_deleted_at', table_name='quotations')
+    op.drop_index('ix_quotations_live_id', table_name='quotations')
+    with op.batch_alter_table('quotations') as batch_op:
+        batch_op.drop_column('deleted_at')
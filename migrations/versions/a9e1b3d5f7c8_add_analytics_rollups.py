@@ -0,0 +1,49 @@
+"""analytics_item_daily and analytics_salesman_daily rollup tables
+
+Revision ID: a9e1b3d5f7c8
+Revises: f8d0a2c4e6b7
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e1b3d5f7c8'
+down_revision: Union[str, Sequence[str], None] = 'f8d0a2c4e6b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'analytics_item_daily',
+        sa.Column('tenant_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.BigInteger(), nullable=False),
+        sa.Column('revenue', sa.Numeric(12, 2), nullable=False),
+        sa.Column('quotations', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('tenant_id', 'day', 'item_id')
+    )
+    op.create_table(
+        'analytics_salesman_daily',
+        sa.Column('tenant_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('salesman_name', sa.String(), nullable=False),
+        sa.Column('quotations', sa.Integer(), nullable=False),
+        sa.Column('subtotal', sa.Numeric(12, 2), nullable=False),
+        sa.Column('customers', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('tenant_id', 'day', 'salesman_name')
+    )
+    # Filled by `python -m backend.analytics rebuild` after upgrading
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('analytics_salesman_daily')
+    op.drop_table('analytics_item_daily')
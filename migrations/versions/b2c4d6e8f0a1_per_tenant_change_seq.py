@@ -0,0 +1,51 @@
+"""per-tenant change_seq, sync_horizon and analytics_rollup counters
+
+Revision ID: b2c4d6e8f0a1
+Revises: a9e1b3d5f7c8
+Create Date: 2026-10-19 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2c4d6e8f0a1'
+down_revision: Union[str, Sequence[str], None] = 'a9e1b3d5f7c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# counter -> aggregate that folds the per-tenant rows back (downgrade)
+COUNTERS = (
+    ('change_seq', 'MAX'),
+    ('sync_horizon', 'MAX'),
+    ('analytics_rollup', 'MIN'),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Every tenant continues from the shared value
+    for name, _ in COUNTERS:
+        op.execute(
+            "INSERT INTO cache_versions (name, version) "
+            f"SELECT '{name}:' || CAST(tenants.id AS VARCHAR(20)), "
+            "cache_versions.version "
+            "FROM tenants, cache_versions "
+            f"WHERE cache_versions.name = '{name}'"
+        )
+        op.execute(f"DELETE FROM cache_versions WHERE name = '{name}'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, aggregate in COUNTERS:
+        op.execute(
+            "INSERT INTO cache_versions (name, version) "
+            f"SELECT '{name}', {aggregate}(version) FROM cache_versions "
+            f"WHERE name LIKE '{name}:%' HAVING COUNT(*) > 0"
+        )
+        op.execute(f"DELETE FROM cache_versions WHERE name LIKE '{name}:%'")
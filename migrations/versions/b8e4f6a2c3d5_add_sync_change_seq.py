@@ -0,0 +1,74 @@
+"""change sequence and tombstones for delta sync
+
+Revision ID: b8e4f6a2c3d5
+Revises: a7d3e5f9b1c2
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4f6a2c3d5'
+down_revision: Union[str, Sequence[str], None] = 'a7d3e5f9b1c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('item_master', 'quotations'):
+        op.add_column(
+            table,
+            sa.Column('change_seq', sa.BigInteger(), nullable=True)
+        )
+        # Existing rows are the first change: a full sync returns them
+        op.execute(f'UPDATE {table} SET change_seq = 1')
+        op.create_index(
+            op.f(f'ix_{table}_change_seq'), table, ['change_seq'], unique=False
+        )
+
+    op.create_table(
+        'sync_tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('entity_type', sa.String(length=32), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('change_seq', sa.BigInteger(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        op.f('ix_sync_tombstones_change_seq'),
+        'sync_tombstones',
+        ['change_seq'],
+        unique=False
+    )
+
+    cache_versions = sa.table(
+        'cache_versions',
+        sa.column('name', sa.String()),
+        sa.column('version', sa.Integer())
+    )
+    op.bulk_insert(cache_versions, [
+        {'name': 'change_seq', 'version': 1},
+        {'name': 'sync_horizon', 'version': 0},
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "DELETE FROM cache_versions WHERE name IN ('change_seq', 'sync_horizon')"
+    )
+    op.drop_index(
+        op.f('ix_sync_tombstones_change_seq'), table_name='sync_tombstones'
+    )
+    op.drop_table('sync_tombstones')
+
+    for table in ('quotations', 'item_master'):
+        op.drop_index(op.f(f'ix_{table}_change_seq'), table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('change_seq')
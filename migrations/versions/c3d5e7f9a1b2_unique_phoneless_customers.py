@@ -0,0 +1,63 @@
+"""unique phone-less customers per tenant and name
+
+Revision ID: c3d5e7f9a1b2
+Revises: b2c4d6e8f0a1
+Create Date: 2026-10-19 23:45:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d5e7f9a1b2'
+down_revision: Union[str, Sequence[str], None] = 'b2c4d6e8f0a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# The oldest phone-less customer with the same tenant and name
+KEEP = (
+    "SELECT MIN(keep.id) FROM customers keep "
+    "WHERE keep.phone IS NULL "
+    "AND keep.tenant_id = customers.tenant_id "
+    "AND keep.name_key = customers.name_key"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Duplicates created by concurrent requests: move their quotations
+    # to the oldest row, then drop them
+    for table in ('quotations', 'quotations_archive'):
+        op.execute(
+            f"UPDATE {table} SET customer_id = ("
+            f"SELECT ({KEEP}) FROM customers "
+            f"WHERE customers.id = {table}.customer_id"
+            ") WHERE customer_id IN ("
+            f"SELECT id FROM customers WHERE phone IS NULL AND id > ({KEEP})"
+            ")"
+        )
+    op.execute(
+        f"DELETE FROM customers WHERE phone IS NULL AND id > ({KEEP})"
+    )
+
+    op.create_index(
+        'uq_customers_tenant_name_key_no_phone',
+        'customers',
+        ['tenant_id', 'name_key'],
+        unique=True,
+        postgresql_where=sa.text('phone IS NULL'),
+        sqlite_where=sa.text('phone IS NULL')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Merged duplicates are not restored
+    op.drop_index(
+        'uq_customers_tenant_name_key_no_phone',
+        table_name='customers'
+    )
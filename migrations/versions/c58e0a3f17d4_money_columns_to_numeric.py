@@ -0,0 +1,54 @@
+"""store money columns as NUMERIC(12, 2)
+
+Revision ID: c58e0a3f17d4
+Revises: a41d9f07c6b2
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c58e0a3f17d4'
+down_revision: Union[str, Sequence[str], None] = 'a41d9f07c6b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MONEY_COLUMNS = {
+    'item_master': ['unit_price'],
+    'quotations': ['tax'],
+    'quotation_items': ['price', 'total'],
+    'quotations_archive': ['tax'],
+    'quotation_items_archive': ['price', 'total'],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, columns in MONEY_COLUMNS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                # Existing float values are rounded to the nearest cent
+                batch_op.alter_column(
+                    column,
+                    existing_type=sa.Float(),
+                    type_=sa.Numeric(12, 2),
+                    postgresql_using=f'round({column}::numeric, 2)'
+                )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, columns in MONEY_COLUMNS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(
+                    column,
+                    existing_type=sa.Numeric(12, 2),
+                    type_=sa.Float(),
+                    postgresql_using=f'{column}::double precision'
+                )
@@ -0,0 +1,36 @@
+"""client-generated id on quotations for idempotent bulk upload
+
+Revision ID: c9f5a7b3d4e6
+Revises: b8e4f6a2c3d5
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9f5a7b3d4e6'
+down_revision: Union[str, Sequence[str], None] = 'b8e4f6a2c3d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('quotations') as batch_op:
+        batch_op.add_column(
+            sa.Column('client_id', sa.String(length=64), nullable=True)
+        )
+        batch_op.create_unique_constraint(
+            'uq_quotations_client_id', ['client_id']
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('quotations') as batch_op:
+        batch_op.drop_constraint('uq_quotations_client_id', type_='unique')
+        batch_op.drop_column('client_id')
@@ -0,0 +1,182 @@
+"""tenants: tenant_id on every tenant-owned table, tenant-led indexes
+
+Revision ID: d4a6b8c0e2f1
+Revises: c9f5a7b3d4e6
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a6b8c0e2f1'
+down_revision: Union[str, Sequence[str], None] = 'c9f5a7b3d4e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Existing rows all belong to the default tenant
+OWNED_TABLES = [
+    'item_master', 'customers', 'quotations', 'quotations_archive', 'users'
+]
+# Bookkeeping tables: tenant_id without a foreign key
+LOG_TABLES = ['sync_tombstones', 'audit_log']
+
+LIVE = {
+    'postgresql_where': sa.text('deleted_at IS NULL'),
+    'sqlite_where': sa.text('deleted_at IS NULL'),
+}
+
+# (name, table, columns, kwargs)
+OLD_INDEXES = [
+    ('ix_item_master_change_seq', 'item_master', ['change_seq'], {}),
+    ('ix_customers_name_key', 'customers', ['name_key'],
+     {'postgresql_ops': {'name_key': 'text_pattern_ops'}}),
+    ('ix_customers_phone_pattern', 'customers', ['phone'],
+     {'postgresql_ops': {'phone': 'text_pattern_ops'}}),
+    ('ix_quotations_quote_no', 'quotations', ['quote_no'], {'unique': True}),
+    ('ix_quotations_created_at', 'quotations', ['created_at'], {}),
+    ('ix_quotations_customer_id_id', 'quotations', ['customer_id', 'id'], {}),
+    ('ix_quotations_live_id', 'quotations', ['id'], LIVE),
+    ('ix_quotations_change_seq', 'quotations', ['change_seq'], {}),
+    ('ix_quotations_archive_quote_no', 'quotations_archive', ['quote_no'],
+     {'unique': True}),
+    ('ix_quotations_archive_created_at', 'quotations_archive',
+     ['created_at'], {}),
+    ('ix_quotations_archive_customer_id', 'quotations_archive',
+     ['customer_id'], {}),
+    ('ix_sync_tombstones_change_seq', 'sync_tombstones', ['change_seq'], {}),
+    ('ix_audit_log_entity', 'audit_log', ['entity_type', 'entity_id', 'id'],
+     {}),
+]
+
+NEW_INDEXES = [
+    ('ix_item_master_tenant_change_seq', 'item_master',
+     ['tenant_id', 'change_seq', 'id'], {}),
+    ('ix_customers_tenant_name_key', 'customers', ['tenant_id', 'name_key'],
+     {'postgresql_ops': {'name_key': 'text_pattern_ops'}}),
+    ('ix_customers_tenant_phone_pattern', 'customers', ['tenant_id', 'phone'],
+     {'postgresql_ops': {'phone': 'text_pattern_ops'}}),
+    ('ix_quotations_tenant_quote_no', 'quotations',
+     ['tenant_id', 'quote_no'], {'unique': True}),
+    ('ix_quotations_tenant_created_at', 'quotations',
+     ['tenant_id', 'created_at'], {}),
+    ('ix_quotations_tenant_customer_id_id', 'quotations',
+     ['tenant_id', 'customer_id', 'id'], {}),
+    ('ix_quotations_tenant_live_id', 'quotations', ['tenant_id', 'id'], LIVE),
+    ('ix_quotations_tenant_change_seq', 'quotations',
+     ['tenant_id', 'change_seq', 'id'], {}),
+    ('ix_quotations_archive_tenant_quote_no', 'quotations_archive',
+     ['tenant_id', 'quote_no'], {'unique': True}),
+    ('ix_quotations_archive_tenant_customer_id', 'quotations_archive',
+     ['tenant_id', 'customer_id'], {}),
+    ('ix_quotations_archive_tenant_created_at', 'quotations_archive',
+     ['tenant_id', 'created_at'], {}),
+    ('ix_users_tenant_id', 'users', ['tenant_id', 'id'], {}),
+    ('ix_sync_tombstones_tenant_change_seq', 'sync_tombstones',
+     ['tenant_id', 'change_seq', 'id'], {}),
+    ('ix_audit_log_tenant_entity', 'audit_log',
+     ['tenant_id', 'entity_type', 'entity_id', 'id'], {}),
+]
+
+# (table, old unique constraint, new tenant-scoped unique constraint, column)
+UNIQUES = [
+    ('item_master', None, 'uq_item_master_tenant_name', 'name'),
+    ('customers', None, 'uq_customers_tenant_phone', 'phone'),
+    ('quotations', 'uq_quotations_client_id',
+     'uq_quotations_tenant_client_id', 'client_id'),
+]
+
+# Lets batch mode (SQLite) address constraints created without a name
+NAMING = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+
+
+def _old_unique(table: str, name: str | None, column: str) -> str:
+    if name:
+        return name
+    # Created unnamed by create_all: Postgres' default name, or the
+    # batch naming convention above on SQLite
+    if op.get_bind().dialect.name == 'postgresql':
+        return f'{table}_{column}_key'
+    return f'uq_{table}_{column}'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'tenants',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.execute("INSERT INTO tenants (name) VALUES ('default')")
+
+    for name, table, _, _ in OLD_INDEXES:
+        op.drop_index(name, table_name=table)
+
+    for table in OWNED_TABLES + LOG_TABLES:
+        op.add_column(table, sa.Column('tenant_id', sa.Integer(), nullable=True))
+        op.execute(
+            f"UPDATE {table} SET tenant_id = "
+            "(SELECT id FROM tenants WHERE name = 'default')"
+        )
+
+    uniques = {table: (old, new, column) for table, old, new, column in UNIQUES}
+
+    for table in OWNED_TABLES:
+        with op.batch_alter_table(table, naming_convention=NAMING) as batch_op:
+            batch_op.alter_column(
+                'tenant_id', existing_type=sa.Integer(), nullable=False
+            )
+            batch_op.create_foreign_key(
+                f'fk_{table}_tenant_id', 'tenants', ['tenant_id'], ['id']
+            )
+            if table in uniques:
+                old, new, column = uniques[table]
+                batch_op.drop_constraint(
+                    _old_unique(table, old, column), type_='unique'
+                )
+                batch_op.create_unique_constraint(new, ['tenant_id', column])
+
+    with op.batch_alter_table('sync_tombstones') as batch_op:
+        batch_op.alter_column(
+            'tenant_id', existing_type=sa.Integer(), nullable=False
+        )
+
+    for name, table, columns, kwargs in NEW_INDEXES:
+        op.create_index(name, table, columns, **kwargs)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _, _ in NEW_INDEXES:
+        op.drop_index(name, table_name=table)
+
+    uniques = {table: (old, new, column) for table, old, new, column in UNIQUES}
+
+    for table in OWNED_TABLES:
+        with op.batch_alter_table(table, naming_convention=NAMING) as batch_op:
+            if table in uniques:
+                old, new, column = uniques[table]
+                batch_op.drop_constraint(new, type_='unique')
+                batch_op.create_unique_constraint(
+                    _old_unique(table, old, column), [column]
+                )
+            batch_op.drop_constraint(
+                f'fk_{table}_tenant_id', type_='foreignkey'
+            )
+            batch_op.drop_column('tenant_id')
+
+    for table in LOG_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('tenant_id')
+
+    for name, table, columns, kwargs in OLD_INDEXES:
+        op.create_index(name, table, columns, **kwargs)
+
+    op.drop_table('tenants')
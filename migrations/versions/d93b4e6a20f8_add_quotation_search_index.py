@@ -0,0 +1,82 @@
+"""add full-text search index for quotations
+
+Revision ID: d93b4e6a20f8
+Revises: c58e0a3f17d4
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd93b4e6a20f8'
+down_revision: Union[str, Sequence[str], None] = 'c58e0a3f17d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute('ALTER TABLE quotations ADD COLUMN search_vector tsvector')
+        op.execute(
+            'CREATE INDEX ix_quotations_search_vector '
+            'ON quotations USING gin (search_vector)'
+        )
+        # Backfill
+        op.execute("""
+            UPDATE quotations AS q SET search_vector =
+                setweight(to_tsvector('simple', coalesce(q.quote_no, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(q.customer_name, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(q.customer_phone, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(q.salesman_name, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce((
+                    SELECT string_agg(im.name, ' ')
+                    FROM quotation_items qi
+                    JOIN item_master im ON im.id = qi.item_id
+                    WHERE qi.quotation_id = q.id
+                ), '')), 'C')
+        """)
+
+    elif dialect == 'sqlite':
+        op.execute(
+            'CREATE VIRTUAL TABLE quotations_fts USING fts5('
+            'quote_no, customer_name, customer_phone, salesman_name, '
+            'item_names)'
+        )
+        # Backfill
+        op.execute("""
+            INSERT INTO quotations_fts (
+                rowid, quote_no, customer_name, customer_phone,
+                salesman_name, item_names
+            )
+            SELECT
+                q.id,
+                coalesce(q.quote_no, ''),
+                q.customer_name,
+                coalesce(q.customer_phone, ''),
+                q.salesman_name,
+                coalesce((
+                    SELECT group_concat(im.name, ' ')
+                    FROM quotation_items qi
+                    JOIN item_master im ON im.id = qi.item_id
+                    WHERE qi.quotation_id = q.id
+                ), '')
+            FROM quotations q
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_quotations_search_vector')
+        op.execute('ALTER TABLE quotations DROP COLUMN IF EXISTS search_vector')
+
+    elif dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS quotations_fts')
@@ -0,0 +1,32 @@
+"""item_master: (tenant_id, lower(name)) index for name lookups
+
+Revision ID: e5b7c9d1f3a2
+Revises: d4a6b8c0e2f1
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b7c9d1f3a2'
+down_revision: Union[str, Sequence[str], None] = 'd4a6b8c0e2f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_item_master_tenant_lower_name',
+        'item_master',
+        ['tenant_id', sa.text('lower(name)')]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_item_master_tenant_lower_name', table_name='item_master')
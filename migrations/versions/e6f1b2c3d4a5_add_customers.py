@@ -0,0 +1,163 @@
+"""add customers table and link quotations to it
+
+Revision ID: e6f1b2c3d4a5
+Revises: d93b4e6a20f8
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+import re
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f1b2c3d4a5'
+down_revision: Union[str, Sequence[str], None] = 'd93b4e6a20f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+QUOTATION_TABLES = ['quotations', 'quotations_archive']
+
+
+def _normalize_phone(phone):
+    if not phone:
+        return None
+    return re.sub(r'\D', '', phone) or None
+
+
+def _name_key(name):
+    return ' '.join(name.lower().split())
+
+
+def _backfill(bind):
+    """One customer per normalized phone (latest name wins), else per name."""
+    rows = []
+    for table in QUOTATION_TABLES:
+        rows.extend(
+            (created_at or datetime.min, table, qid, name, phone)
+            for qid, name, phone, created_at in bind.execute(sa.text(
+                f'SELECT id, customer_name, customer_phone, created_at '
+                f'FROM {table}'
+            ))
+        )
+    rows.sort(key=lambda r: (str(r[0]), r[2]))
+
+    customers = {}      # dedupe key → (name, phone, first seen)
+    assignments = {}    # (table, quotation id) → dedupe key
+
+    for created_at, table, qid, name, phone in rows:
+        phone = _normalize_phone(phone)
+        key = ('phone', phone) if phone else ('name', _name_key(name))
+        first = customers.get(key, (None, None, created_at))[2]
+        customers[key] = (name.strip(), phone, first)
+        assignments[(table, qid)] = key
+
+    customer_ids = {}
+    for key, (name, phone, created_at) in customers.items():
+        customer_ids[key] = bind.execute(
+            sa.text(
+                'INSERT INTO customers (name, phone, name_key, created_at) '
+                'VALUES (:name, :phone, :name_key, :created_at) RETURNING id'
+            ),
+            {
+                'name': name,
+                'phone': phone,
+                'name_key': _name_key(name),
+                'created_at': (
+                    None if created_at == datetime.min else created_at
+                ),
+            }
+        ).scalar()
+
+    for table in QUOTATION_TABLES:
+        params = [
+            {'id': qid, 'customer_id': customer_ids[key]}
+            for (t, qid), key in assignments.items()
+            if t == table
+        ]
+        if params:
+            bind.execute(
+                sa.text(
+                    f'UPDATE {table} SET customer_id = :customer_id '
+                    f'WHERE id = :id'
+                ),
+                params
+            )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'customers',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('phone', sa.String(), nullable=True),
+        sa.Column('name_key', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('phone')
+    )
+    op.create_index(op.f('ix_customers_id'), 'customers', ['id'], unique=False)
+    op.create_index(
+        'ix_customers_name_key',
+        'customers',
+        ['name_key'],
+        unique=False,
+        postgresql_ops={'name_key': 'text_pattern_ops'}
+    )
+    op.create_index(
+        'ix_customers_phone_pattern',
+        'customers',
+        ['phone'],
+        unique=False,
+        postgresql_ops={'phone': 'text_pattern_ops'}
+    )
+
+    with op.batch_alter_table('quotations') as batch_op:
+        batch_op.add_column(sa.Column('customer_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_quotations_customer_id', 'customers', ['customer_id'], ['id']
+        )
+        batch_op.create_index(
+            'ix_quotations_customer_id_id', ['customer_id', 'id'], unique=False
+        )
+
+    with op.batch_alter_table('quotations_archive') as batch_op:
+        batch_op.add_column(sa.Column('customer_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_quotations_archive_customer_id',
+            'customers',
+            ['customer_id'],
+            ['id']
+        )
+        batch_op.create_index(
+            op.f('ix_quotations_archive_customer_id'),
+            ['customer_id'],
+            unique=False
+        )
+
+    _backfill(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('quotations_archive') as batch_op:
+        batch_op.drop_index(op.f('ix_quotations_archive_customer_id'))
+        batch_op.drop_constraint(
+            'fk_quotations_archive_customer_id', type_='foreignkey'
+        )
+        batch_op.drop_column('customer_id')
+
+    with op.batch_alter_table('quotations') as batch_op:
+        batch_op.drop_index('ix_quotations_customer_id_id')
+        batch_op.drop_constraint('fk_quotations_customer_id', type_='foreignkey')
+        batch_op.drop_column('customer_id')
+
+    op.drop_index('ix_customers_phone_pattern', table_name='customers')
+    op.drop_index('ix_customers_name_key', table_name='customers')
+    op.drop_index(op.f('ix_customers_id'), table_name='customers')
+    op.drop_table('customers')